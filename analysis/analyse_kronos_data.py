@@ -15,8 +15,12 @@ import logging
 # Configure logging to suppress matplotlib font manager debug messages
 logging.getLogger("matplotlib.font_manager").setLevel(logging.WARNING)
 
-# Configure matplotlib to use Qt backend
-plt.switch_backend("Qt5Agg")
+from analysis.ingest_kronos_data import (
+    ensure_kronos_dataset,
+    read_kronos_dataset,
+)
+
+# The matplotlib backend is left to the environment (set MPLBACKEND=Agg to run headless)
 
 from fluvius_captar import (
     calculate_current_month_captar_cost,
@@ -43,15 +47,13 @@ cmap_entras = matplotlib.colors.LinearSegmentedColormap.from_list(
 file_path = os.path.join("data", "2022-2023 KRONOS data analyse.xlsx")
 # os.chdir("C:/github_projects/Kronos")
 # os.getcwd()
-# Read Excel file
-df = pd.read_excel(file_path, sheet_name="SRC DATA", skiprows=18)
 
-# Convert all columns except DatumTijd to numeric, replacing any non-numeric values with NaN
-for column in df.columns:
-    if column != "DatumTijd":
-        df[column] = pd.to_numeric(df[column], errors="coerce")
+# Ingest the Excel file into a columnar dataset (numeric columns already coerced),
+# again only when the workbook has changed since the last ingest
+ensure_kronos_dataset(file_path)
 
-df.set_index("DatumTijd", inplace=True)
+# Read the dataset, indexed by DatumTijd
+df = read_kronos_dataset()
 
 # Print data types to verify conversion
 print("Data types after conversion:")
@@ -0,0 +1,245 @@
+"""
+Streaming ingest of the KRONOS Excel historian into a partitioned columnar dataset.
+
+The `SRC DATA` sheet is read in row chunks with openpyxl in read-only mode, so the
+whole workbook is never held in memory as cell objects. Each chunk is coerced to
+numeric in a single vectorized call and appended to a Parquet dataset partitioned
+by year and month. Analysis scripts then read only the columns they need from the
+dataset, without Excel parsing and without a GUI backend.
+
+A JSON file in the dataset directory records the workbook's mtime, size and SHA-256,
+so `ensure_kronos_dataset` re-ingests only when the workbook has changed.
+
+Usage:
+    python -m analysis.ingest_kronos_data
+    python -m analysis.ingest_kronos_data --source "data/2022-2023 KRONOS data analyse.xlsx"
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from openpyxl import load_workbook
+
+from core.data_generator import _file_sha256
+
+KRONOS_EXCEL_FILE = os.path.join("data", "2022-2023 KRONOS data analyse.xlsx")
+KRONOS_DATASET_DIR = os.path.join("data", "kronos_dataset")
+KRONOS_SHEET = "SRC DATA"
+KRONOS_HEADER_ROW = 19  # 1-based, equivalent to pd.read_excel(..., skiprows=18)
+TIMESTAMP_COLUMN = "DatumTijd"
+# Leading underscore: pyarrow skips the file when discovering the dataset
+KRONOS_DATASET_META = "_source.json"
+KRONOS_DATASET_VERSION = 1
+
+
+def _chunk_to_frame(rows: list, header: List[str]) -> pd.DataFrame:
+    """Convert a chunk of raw rows to a typed DataFrame."""
+    block = np.array(rows, dtype=object)
+
+    df = pd.DataFrame({TIMESTAMP_COLUMN: pd.to_datetime(block[:, 0], errors="coerce")})
+
+    # Coerce all value columns in one call instead of column by column
+    values = pd.to_numeric(pd.Series(block[:, 1:].ravel()), errors="coerce")
+    values = values.to_numpy(dtype=np.float64).reshape(block.shape[0], -1)
+    df = pd.concat([df, pd.DataFrame(values, columns=header[1:])], axis=1)
+
+    df = df.dropna(subset=[TIMESTAMP_COLUMN])
+    df["year"] = df[TIMESTAMP_COLUMN].dt.year.astype("int32")
+    df["month"] = df[TIMESTAMP_COLUMN].dt.month.astype("int32")
+    return df
+
+
+def ingest_kronos_excel(
+    source: str = KRONOS_EXCEL_FILE,
+    output_dir: str = KRONOS_DATASET_DIR,
+    sheet_name: str = KRONOS_SHEET,
+    header_row: int = KRONOS_HEADER_ROW,
+    chunk_size: int = 5000,
+) -> int:
+    """
+    Stream the historian sheet into a Parquet dataset partitioned by year and month.
+
+    An existing dataset in `output_dir` is replaced. The source file's mtime, size and
+    SHA-256 are stored next to it once all rows are written.
+
+    Args:
+        source (str, optional): Path to the Excel workbook. Defaults to KRONOS_EXCEL_FILE.
+        output_dir (str, optional): Dataset directory. Defaults to KRONOS_DATASET_DIR.
+        sheet_name (str, optional): Sheet to read. Defaults to "SRC DATA".
+        header_row (int, optional): 1-based row holding the column names. Defaults to 19.
+        chunk_size (int, optional): Number of rows per chunk. Defaults to 5000.
+
+    Returns:
+        int: Number of rows written
+    """
+    start = time.perf_counter()
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    rows = workbook[sheet_name].iter_rows(min_row=header_row, values_only=True)
+
+    header = [str(name) for name in next(rows)]
+    n_columns = len(header)
+    schema = None
+    n_rows = 0
+    chunk_id = 0
+    chunk = []
+
+    def write_chunk(chunk: list, chunk_id: int):
+        nonlocal schema
+        df = _chunk_to_frame(chunk, header)
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        schema = table.schema
+        ds.write_dataset(
+            table,
+            output_dir,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([("year", pa.int32()), ("month", pa.int32())]),
+                flavor="hive",
+            ),
+            basename_template=f"chunk{chunk_id:05d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return len(df)
+
+    for row in rows:
+        # Skip fully empty rows at the end of the sheet
+        if row[0] is None:
+            continue
+        chunk.append(tuple(row[:n_columns]) + (None,) * (n_columns - len(row)))
+        if len(chunk) == chunk_size:
+            n_rows += write_chunk(chunk, chunk_id)
+            chunk_id += 1
+            chunk = []
+    if chunk:
+        n_rows += write_chunk(chunk, chunk_id)
+
+    workbook.close()
+
+    stat = os.stat(source)
+    with open(os.path.join(output_dir, KRONOS_DATASET_META), "w") as f:
+        json.dump(
+            {
+                "version": KRONOS_DATASET_VERSION,
+                "source": source,
+                "source_mtime": stat.st_mtime,
+                "source_size": stat.st_size,
+                "source_sha256": _file_sha256(source),
+            },
+            f,
+            indent=2,
+        )
+    print(
+        f"Ingested {n_rows} rows from {source} into {output_dir} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    return n_rows
+
+
+def _kronos_dataset_is_valid(source: str, output_dir: str) -> bool:
+    """
+    Check whether the dataset still matches the source workbook.
+
+    The cheap mtime/size check is tried first. If it fails, the content hash decides,
+    so touching the workbook without changing it does not force a re-ingest.
+    """
+    meta_path = os.path.join(output_dir, KRONOS_DATASET_META)
+    if not os.path.exists(meta_path):
+        return False
+
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    if meta.get("version") != KRONOS_DATASET_VERSION:
+        return False
+
+    stat = os.stat(source)
+    if (
+        meta.get("source_mtime") == stat.st_mtime
+        and meta.get("source_size") == stat.st_size
+    ):
+        return True
+
+    if meta.get("source_sha256") != _file_sha256(source):
+        return False
+
+    # Same content, new mtime: refresh the metadata so the next check is cheap again
+    meta["source_mtime"] = stat.st_mtime
+    meta["source_size"] = stat.st_size
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return True
+
+
+def ensure_kronos_dataset(
+    source: str = KRONOS_EXCEL_FILE, output_dir: str = KRONOS_DATASET_DIR
+) -> bool:
+    """
+    Ingest the workbook unless the dataset already matches it.
+
+    A dataset without source metadata (e.g. from an older ingest) is rebuilt.
+
+    Args:
+        source (str, optional): Path to the Excel workbook. Defaults to KRONOS_EXCEL_FILE.
+        output_dir (str, optional): Dataset directory. Defaults to KRONOS_DATASET_DIR.
+
+    Returns:
+        bool: True if the workbook was (re-)ingested
+    """
+    if _kronos_dataset_is_valid(source, output_dir):
+        return False
+    ingest_kronos_excel(source, output_dir)
+    return True
+
+
+def read_kronos_dataset(
+    columns: Optional[List[str]] = None,
+    dataset_dir: str = KRONOS_DATASET_DIR,
+    filters=None,
+) -> pd.DataFrame:
+    """
+    Read the ingested historian dataset.
+
+    Args:
+        columns (List[str], optional): Value columns to load. Defaults to None (all columns).
+        dataset_dir (str, optional): Dataset directory. Defaults to KRONOS_DATASET_DIR.
+        filters (optional): pyarrow filter expression, e.g. ds.field("year") == 2022.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: Historian data indexed by DatumTijd
+    """
+    dataset = ds.dataset(dataset_dir, format="parquet", partitioning="hive")
+    read_columns = None if columns is None else [TIMESTAMP_COLUMN] + list(columns)
+    df = dataset.to_table(columns=read_columns, filter=filters).to_pandas()
+    df = df.drop(columns=["year", "month"], errors="ignore")
+    return df.sort_values(TIMESTAMP_COLUMN, kind="stable").set_index(TIMESTAMP_COLUMN)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Ingest the KRONOS Excel historian into a Parquet dataset"
+    )
+    parser.add_argument("--source", type=str, default=KRONOS_EXCEL_FILE)
+    parser.add_argument("--output", type=str, default=KRONOS_DATASET_DIR)
+    parser.add_argument("--sheet", type=str, default=KRONOS_SHEET)
+    parser.add_argument("--header-row", type=int, default=KRONOS_HEADER_ROW)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    ingest_kronos_excel(
+        source=args.source,
+        output_dir=args.output,
+        sheet_name=args.sheet,
+        header_row=args.header_row,
+        chunk_size=args.chunk_size,
+    )
@@ -21,14 +21,34 @@ Example:
 
 import pandas as pd
 import os
+import json
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import pytz
-import requests
-from io import StringIO
 from datetime import timedelta
-from entras_data.spot_price import get_spot_price
-from entras_data.gas_price import get_ttf_price
-from entras_data.market_data import get_market_data
 import numpy as np
+from pandas.tseries.frequencies import to_offset
+from core.market_data import get_market_data_cache
+from core.temperature_store import get_temperature_store
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+
+# KRONOS historian export and its columnar cache
+KRONOS_DATA_FILE = "data/2022-2023 KRONOS data analyse.csv"
+KRONOS_CACHE_DIR = "data/cache"
+KRONOS_CACHE_VERSION = 1
+
+# Historian columns used as demand inputs
+HEAT_DEMAND_COLUMN = "STOOM_21 barg_21 barg TOT_ton/hr"
+ELECTRICITY_DEMAND_COLUMN = "ELEC_verbruik_kWh"
 
 
 def get_prices(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
@@ -36,7 +56,8 @@ def get_prices(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
     Get price data for energy system modeling.
 
     Retrieves and processes price data for electricity (EPEX spot), gas, and CO2 emissions.
-    All timestamps are converted to CET timezone.
+    Series are requested through the market data cache, so repeated windows do not hit
+    the data source again. All timestamps are converted to CET timezone.
 
     Args:
         starttime (str): Start date for the time series (format: 'YYYY-MM-DD')
@@ -55,26 +76,13 @@ def get_prices(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
     end = pd.Timestamp(endtime).tz_localize("CET")
     date_range = pd.date_range(start=start, end=end, freq=freq, tz="CET")[:-1]
 
-    # Get market data
-    epexspot_df = get_spot_price(
-        starttime=starttime,
-        endtime=endtime,
-        select={"timestamp": "timestamp", "da_price": "price"},
-    )
+    # Get market data (memoized per series and window, see core.market_data)
+    market_data = get_market_data_cache()
+    epexspot_df = market_data.get("da_price", starttime, endtime)
     # epexspot_df["injection_price"] = 10 - epexspot_df["offtake_price"]
 
-    gas_prices_df = get_market_data(
-        "ttf_da_eod",
-        starttime=starttime,
-        endtime=endtime,
-        select={"timestamp": "timestamp", "gas_price": "price"},
-    )
-    co2_prices_df = get_market_data(
-        "eua_spot_realto",
-        starttime=starttime,
-        endtime=endtime,
-        select={"timestamp": "datetime", "co2_price": "price"},
-    )
+    gas_prices_df = market_data.get("gas_price", starttime, endtime)
+    co2_prices_df = market_data.get("co2_price", starttime, endtime)
 
     # Create empty DataFrame with date_range index
     result_df = pd.DataFrame(index=date_range)
@@ -98,10 +106,245 @@ def get_prices(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
     return result_df
 
 
-get_prices("2024-01-01", "2024-01-02", "h")
+def fix_out_of_order_timestamps(
+    timestamps: pd.DatetimeIndex, step: pd.Timedelta = pd.Timedelta(hours=1)
+) -> pd.DatetimeIndex:
+    """
+    Repair timestamps that jump back in time.
+
+    Every timestamp that is earlier than its (already repaired) predecessor is
+    replaced by the predecessor plus `step`. Violations are detected in one
+    vectorized pass; only the flagged positions (and the positions a repair
+    cascades into) are visited afterwards.
+
+    Args:
+        timestamps (pd.DatetimeIndex): Timestamps in file order
+        step (pd.Timedelta, optional): Offset applied to out-of-order timestamps.
+            Defaults to one hour.
+
+    Returns:
+        pd.DatetimeIndex: Repaired timestamps, same length and timezone as the input
+    """
+    values = timestamps.asi8.copy()
+    step_ns = step.value
+
+    # Positions that are earlier than their predecessor
+    candidates = list(np.flatnonzero(values[1:] < values[:-1]) + 1)
+
+    # A repair only increases values[i], so it can only break order at i + 1
+    while candidates:
+        i = candidates.pop(0)
+        if values[i] < values[i - 1]:
+            values[i] = values[i - 1] + step_ns
+            if i + 1 < len(values) and (not candidates or candidates[0] != i + 1):
+                candidates.insert(0, i + 1)
+
+    return pd.DatetimeIndex(values, tz="UTC").tz_convert(timestamps.tz)
+
+
+def align_to_range(
+    df: pd.DataFrame,
+    date_range: pd.DatetimeIndex,
+    timestamp_column: str = "process_timestamp",
+    tolerance: str = None,
+) -> pd.DataFrame:
+    """
+    Align a timestamped DataFrame onto a target date range in one pass.
+
+    Duplicate timestamps are resolved by keeping the last occurrence, the rows are
+    sorted by timestamp and then reindexed onto `date_range`.
+
+    Args:
+        df (pd.DataFrame): Data with a timestamp column
+        date_range (pd.DatetimeIndex): Target index
+        timestamp_column (str, optional): Name of the timestamp column.
+            Defaults to "process_timestamp".
+        tolerance (str, optional): If given (e.g. "30min"), each target timestamp takes
+            the nearest source row within this distance instead of requiring an exact
+            match. Useful for sub-hourly frequencies. Defaults to None (exact match).
+
+    Returns:
+        pd.DataFrame: DataFrame indexed by `date_range` with the remaining columns.
+            Timestamps without a match are NaN.
+    """
+    aligned = (
+        df.drop_duplicates(subset=[timestamp_column], keep="last")
+        .set_index(timestamp_column)
+        .sort_index()
+    )
+
+    if tolerance is None:
+        return aligned.reindex(date_range)
+    return aligned.reindex(
+        date_range, method="nearest", tolerance=pd.Timedelta(tolerance)
+    )
+
+
+def _file_sha256(path: str) -> str:
+    """Return the SHA-256 hex digest of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_kronos_csv(source: str, columns: list = None) -> pd.DataFrame:
+    """
+    Parse the KRONOS historian CSV export into a typed DataFrame.
+
+    Args:
+        source (str): Path to the CSV export
+        columns (list, optional): Historian columns to keep. Defaults to None (all columns).
+
+    Returns:
+        pd.DataFrame: DataFrame with a UTC `process_timestamp` column (out-of-order
+            timestamps repaired) followed by the historian columns
+    """
+    usecols = None if columns is None else ["DatumTijd"] + list(columns)
+    df = pd.read_csv(source, encoding="latin-1", usecols=usecols)
+
+    # Adjust timestamps if they're out of order
+    timestamps = pd.to_datetime(df.pop("DatumTijd").values, utc=True)
+    df.insert(0, "process_timestamp", fix_out_of_order_timestamps(timestamps))
+
+    # Keep column order of the request
+    if columns is not None:
+        df = df[["process_timestamp"] + list(columns)]
+    return df
+
+
+def _kronos_cache_paths(source: str, cache_dir: str):
+    """Return the (data, metadata) paths of the columnar cache for `source`."""
+    stem = os.path.splitext(os.path.basename(source))[0].replace(" ", "_")
+    return (
+        os.path.join(cache_dir, f"{stem}.feather"),
+        os.path.join(cache_dir, f"{stem}.json"),
+    )
 
 
-def get_demands(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
+def _kronos_cache_is_valid(source: str, data_path: str, meta_path: str) -> bool:
+    """
+    Check whether the cache still matches the source file.
+
+    The cheap mtime/size check is tried first. If it fails, the content hash decides,
+    so touching the source without changing it does not force a rebuild.
+    """
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return False
+
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    if meta.get("version") != KRONOS_CACHE_VERSION:
+        return False
+
+    stat = os.stat(source)
+    if (
+        meta.get("source_mtime") == stat.st_mtime
+        and meta.get("source_size") == stat.st_size
+    ):
+        return True
+
+    if meta.get("source_sha256") != _file_sha256(source):
+        return False
+
+    # Same content, new mtime: refresh the metadata so the next check is cheap again
+    meta["source_mtime"] = stat.st_mtime
+    meta["source_size"] = stat.st_size
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return True
+
+
+def build_kronos_cache(
+    source: str = KRONOS_DATA_FILE, cache_dir: str = KRONOS_CACHE_DIR
+) -> str:
+    """
+    Convert the KRONOS historian CSV to a Feather (Arrow IPC) file.
+
+    The file is written uncompressed so it can be memory-mapped on later reads.
+    A JSON sidecar stores the source mtime, size and SHA-256 used for invalidation.
+
+    Args:
+        source (str, optional): Path to the CSV export. Defaults to KRONOS_DATA_FILE.
+        cache_dir (str, optional): Directory for the cache files. Defaults to KRONOS_CACHE_DIR.
+
+    Returns:
+        str: Path to the Feather file
+    """
+    if feather is None:
+        raise ImportError("pyarrow is required to build the KRONOS cache")
+
+    data_path, meta_path = _kronos_cache_paths(source, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    df = _parse_kronos_csv(source)
+
+    # Write to a temporary file first so a crash never leaves a half-written cache
+    tmp_path = f"{data_path}.tmp"
+    feather.write_feather(
+        pa.Table.from_pandas(df, preserve_index=False),
+        tmp_path,
+        compression="uncompressed",
+    )
+    os.replace(tmp_path, data_path)
+
+    stat = os.stat(source)
+    with open(meta_path, "w") as f:
+        json.dump(
+            {
+                "version": KRONOS_CACHE_VERSION,
+                "source": source,
+                "source_mtime": stat.st_mtime,
+                "source_size": stat.st_size,
+                "source_sha256": _file_sha256(source),
+            },
+            f,
+            indent=2,
+        )
+
+    print(f"KRONOS cache written to {data_path}")
+    return data_path
+
+
+def load_kronos_data(
+    columns: list = None,
+    source: str = KRONOS_DATA_FILE,
+    cache_dir: str = KRONOS_CACHE_DIR,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """
+    Load the KRONOS historian data through the columnar cache.
+
+    On first use (or when the source changed) the CSV is converted to Feather.
+    Later reads memory-map that file and load only the requested columns.
+    Without pyarrow the CSV is parsed directly.
+
+    Args:
+        columns (list, optional): Historian columns to load. Defaults to None (all columns).
+        source (str, optional): Path to the CSV export. Defaults to KRONOS_DATA_FILE.
+        cache_dir (str, optional): Directory for the cache files. Defaults to KRONOS_CACHE_DIR.
+        use_cache (bool, optional): Whether to use the cache. Defaults to True.
+
+    Returns:
+        pd.DataFrame: DataFrame with a UTC `process_timestamp` column followed by
+            the requested columns
+    """
+    if not use_cache or feather is None:
+        return _parse_kronos_csv(source, columns)
+
+    data_path, meta_path = _kronos_cache_paths(source, cache_dir)
+    if not _kronos_cache_is_valid(source, data_path, meta_path):
+        build_kronos_cache(source, cache_dir)
+
+    read_columns = None if columns is None else ["process_timestamp"] + list(columns)
+    table = feather.read_table(data_path, columns=read_columns, memory_map=True)
+    return table.to_pandas()
+
+
+def get_demands(
+    starttime: str, endtime: str, freq: str = "h", tolerance: str = None
+) -> pd.DataFrame:
     """
     Get demand data for energy system modeling.
 
@@ -113,6 +356,9 @@ def get_demands(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
         endtime (str): End date for the time series (format: 'YYYY-MM-DD')
         freq (str, optional): Frequency of the time series. Defaults to "h" (hourly).
             Other options: "D" (daily), "15T" (15 minutes), etc.
+        tolerance (str, optional): Match each timestamp to the nearest demand record
+            within this distance (e.g. "30min") instead of requiring an exact match.
+            Defaults to None (exact match).
 
     Returns:
         pd.DataFrame: DataFrame with datetime index in CET containing:
@@ -120,6 +366,7 @@ def get_demands(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
             - electricity_demand: Electricity consumption (kWh)
 
     Note:
+        - Reads the historian export through the columnar cache (see load_kronos_data)
         - Handles duplicate timestamps by taking the last value
         - Fills missing values using forward and backward fill
         - Adjusts out-of-order timestamps
@@ -130,28 +377,13 @@ def get_demands(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
     end = pd.Timestamp(endtime).tz_localize("CET")
     date_range = pd.date_range(start=start, end=end, freq=freq, tz="CET")[:-1]
 
-    # Read demand data from CSV
-    demand_df = pd.read_csv(
-        "data/2022-2023 KRONOS data analyse.csv", encoding="latin-1"
+    # Read only the steam and electricity columns from the historian cache
+    demand_df = load_kronos_data(
+        columns=[HEAT_DEMAND_COLUMN, ELECTRICITY_DEMAND_COLUMN]
     )
 
-    # Convert timestamps to datetime and handle timezone
-    # Adjust timestamps if they're out of order
-    timestamps_list = pd.to_datetime(demand_df["DatumTijd"].values, utc=True).tolist()
-    for i in range(1, len(timestamps_list)):
-        if timestamps_list[i] < timestamps_list[i - 1]:
-            timestamps_list[i] = timestamps_list[i - 1] + pd.Timedelta(hours=1)
-
-    # Convert list back to DatetimeIndex
-    timestamps = pd.DatetimeIndex(timestamps_list).tz_convert("CET")
-
-    # Assign to DataFrame
-    demand_df["process_timestamp"] = timestamps
-
-    # Select only the required columns
-    demand_df = demand_df[
-        ["process_timestamp", "STOOM_21 barg_21 barg TOT_ton/hr", "ELEC_verbruik_kWh"]
-    ]
+    # Timestamps are stored in UTC (out-of-order timestamps already adjusted)
+    demand_df["process_timestamp"] = demand_df["process_timestamp"].dt.tz_convert("CET")
 
     # Rename columns to match the expected output
     demand_df.columns = ["process_timestamp", "heat_demand", "electricity_demand"]
@@ -169,17 +401,8 @@ def get_demands(starttime: str, endtime: str, freq: str = "h") -> pd.DataFrame:
         print("\nDuplicate timestamps found:")
         print(duplicates.sort_values("process_timestamp"))
 
-    # Create a new DataFrame with date_range as index
-    result_df = pd.DataFrame(index=date_range)
-
-    # For each timestamp in date_range, find matching values in demand_df
-    for idx in date_range:
-        matching_rows = demand_df[demand_df["process_timestamp"] == idx]
-        if not matching_rows.empty:
-            result_df.loc[idx, "heat_demand"] = matching_rows["heat_demand"].iloc[-1]
-            result_df.loc[idx, "electricity_demand"] = matching_rows[
-                "electricity_demand"
-            ].iloc[-1]
+    # Dedupe (keep last), sort and reindex onto date_range in one pass
+    result_df = align_to_range(demand_df, date_range, tolerance=tolerance)
 
     # Fill NaN values
     result_df = result_df.ffill().bfill()
@@ -202,19 +425,20 @@ def get_temperature(
         freq (str, optional): Frequency of the time series. Defaults to "h" (hourly).
             Other options: "D" (daily), "15T" (15 minutes), etc.
         use_local_data (bool, optional): Whether to use locally saved data instead of API.
-            Defaults to False. If True, reads from 'data/open-meteo-51.07N3.71E13m.csv'.
+            Defaults to False. If True, only the local Open-Meteo files in 'data/' are used.
 
     Returns:
         pd.DataFrame: DataFrame with datetime index in CET containing:
             - temperature: Air temperature at 2m height (°C)
 
     Note:
-        - If use_local_data=True, data is read from local CSV file
-        - If use_local_data=False, data is fetched from Open-Meteo's historical API
+        - Data is served from the persistent temperature store (see core.temperature_store),
+          which merges all local Open-Meteo exports in 'data/'
+        - If use_local_data=True, only local data is used; missing hours stay missing
+        - If use_local_data=False, only the hours missing from the store are fetched
+          from Open-Meteo's historical API and merged into the store
         - Missing values are interpolated linearly
         - All timestamps are in CET timezone
-        - Local data covers 2022-01-01 to 2022-12-31
-        - Fetched data is automatically saved to 'data/open-meteo-51.07N3.71E13m.csv' in the same format
     """
     # Define timezone
     tz = pytz.timezone("Europe/Brussels")
@@ -227,60 +451,13 @@ def get_temperature(
     if start_date >= end_date:
         raise ValueError(f"starttime ({starttime}) must be before endtime ({endtime})")
 
-    if use_local_data:
-        # Read from local CSV file
-        local_file_path = "data/open-meteo-51.07N3.71E13m_2024.csv"
-
-        if not os.path.exists(local_file_path):
-            raise FileNotFoundError(
-                f"Local temperature data file not found: {local_file_path}"
-            )
-
-        # Read the CSV file, skipping the header rows
-        temp = pd.read_csv(local_file_path, skiprows=2, encoding="latin1")
-
-        # Process temperature data
-        temp["time"] = (
-            pd.to_datetime(temp["time"]).dt.tz_localize("UTC").dt.tz_convert(tz)
-        )
-        temp_series = pd.Series(temp["temperature_2m (°C)"].values, index=temp["time"])
-
-        # Filter to requested date range
-        temp_filtered = temp_series[
-            (temp_series.index >= start_date) & (temp_series.index < end_date)
-        ]
-
-        # Resample to requested frequency
-        temp_resampled = temp_filtered.resample(freq).interpolate(method="linear")
-
-    else:
-        # Get timeseries and calculate UTC date range for API
-        ts = pd.date_range(start=start_date, end=end_date, freq="15min", tz=tz)
-        start_date_utc = ts.min().tz_convert("UTC").strftime("%Y-%m-%d")
-        end_date_utc = ts.max().tz_convert("UTC").strftime("%Y-%m-%d")
-
-        # Fetch temperature data
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": 51.07,
-            "longitude": 3.71,
-            "start_date": start_date_utc,
-            "end_date": end_date_utc,
-            "hourly": "temperature_2m",
-            "format": "csv",
-        }
-        response = requests.get(url, params=params)
-        temp = pd.read_csv(StringIO(response.text), skiprows=2)
-
-        # Process temperature data
-        temp["time"] = (
-            pd.to_datetime(temp["time"]).dt.tz_localize("UTC").dt.tz_convert(tz)
-        )
-        temp_series = pd.Series(temp["temperature_2m (°C)"].values, index=temp["time"])
-        temp_resampled = temp_series.resample(freq).interpolate(method="linear")
+    # Slice the hourly store (backfilling missing hours unless local data is requested)
+    temp_series = get_temperature_store().get(
+        start_date, end_date, fetch=not use_local_data
+    )
 
-        # Save the fetched data to CSV in the same format as the original file
-        save_temperature_to_csv(temp_resampled, start_date_utc, end_date_utc)
+    # Resample to requested frequency
+    temp_resampled = temp_series.resample(freq).interpolate(method="linear")
 
     # Create DataFrame with temperature data
     df = pd.DataFrame({"temperature": temp_resampled})
@@ -291,47 +468,298 @@ def get_temperature(
 
 def save_temperature_to_csv(temp_series: pd.Series, start_date: str, end_date: str):
     """
-    Save temperature data to CSV file in the same format as open-meteo-51.07N3.71E13m.csv
+    Merge temperature data into the temperature store file (see
+    core.temperature_store.STORE_FILE; the Open-Meteo exports in 'data/' are not
+    modified)
+
+    Existing data in the store is kept; hours present in `temp_series` replace the
+    stored values. Only values on whole hours are stored.
 
     Args:
         temp_series (pd.Series): Temperature data series with datetime index
         start_date (str): Start date in YYYY-MM-DD format
         end_date (str): End date in YYYY-MM-DD format
     """
-    # Create the output file path
-    output_file = "data/open-meteo-51.07N3.71E13m.csv"
+    store = get_temperature_store()
+    store.get(temp_series.index.min(), temp_series.index.max(), fetch=False)
 
-    # Ensure the data directory exists
-    os.makedirs("data", exist_ok=True)
-
-    # Prepare the data for saving
-    # Convert to UTC for saving (same as original format)
+    # Keep whole hours only, the store is hourly
     temp_utc = temp_series.tz_convert("UTC")
+    temp_utc = temp_utc[temp_utc.index == temp_utc.index.floor("h")]
 
-    # Create DataFrame with the same format as the original file
-    df_to_save = pd.DataFrame(
-        {
-            "time": temp_utc.index.strftime("%Y-%m-%dT%H:%M"),
-            "temperature_2m (°C)": temp_utc.values,
-        }
+    merged = pd.concat([store.series, temp_utc.rename(store.series.name)])
+    store.series = merged[~merged.index.duplicated(keep="last")].sort_index().dropna()
+    store.save()
+
+    print(
+        f"Temperature data saved to {store.store_file} (period: {start_date} to {end_date})"
     )
 
-    # Write the file with the same format as the original
-    with open(output_file, "w", newline="") as f:
-        # Write header metadata (same as original)
-        f.write(
-            "latitude,longitude,elevation,utc_offset_seconds,timezone,timezone_abbreviation\n"
+
+def _timed(func, *args):
+    """Call func(*args) and return (result, elapsed seconds)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def load_sources(tasks: dict, max_workers: int = 3):
+    """
+    Load independent data sources concurrently.
+
+    Args:
+        tasks (dict): Mapping of source name to (function, args) tuples
+        max_workers (int, optional): Maximum number of sources loaded at the same time.
+            Defaults to 3. Use 1 to load the sources one after another.
+
+    Returns:
+        tuple: (results, timings) dicts keyed by source name. `timings` holds the wall
+            time per source in seconds plus the overall wall time under "total".
+    """
+    start = time.perf_counter()
+    results, timings = {}, {}
+
+    if max_workers <= 1:
+        for name, (func, args) in tasks.items():
+            results[name], timings[name] = _timed(func, *args)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                name: executor.submit(_timed, func, *args)
+                for name, (func, args) in tasks.items()
+            }
+            # Collect in task order so the merge does not depend on completion order
+            for name, future in futures.items():
+                results[name], timings[name] = future.result()
+
+    timings["total"] = time.perf_counter() - start
+    return results, timings
+
+
+# Base resolution of all sources; other frequencies are derived from it
+BASE_FREQ = "h"
+
+# Per-column resampling rules: (upsampling method, downsampling aggregation)
+RESAMPLE_RULES = {
+    "process_timestamp": ("shift", "first"),
+    "heat_demand": ("ffill", "mean"),
+    "electricity_demand": ("ffill", "mean"),
+    "da_price": ("ffill", "mean"),
+    "gas_price": ("ffill", "mean"),
+    "co2_price": ("ffill", "mean"),
+    "temperature": ("interpolate", "mean"),
+}
+DEFAULT_RESAMPLE_RULE = ("ffill", "mean")
+
+# In-memory caches of hourly base frames and their per-frequency derivatives
+DATA_CACHE_SIZE = 8
+_base_cache = OrderedDict()
+_derived_cache = OrderedDict()
+
+
+def _cache_get(cache: OrderedDict, key):
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    return None
+
+
+def _cache_put(cache: OrderedDict, key, value):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > DATA_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def clear_data_cache():
+    """Drop all cached base frames and resampled derivatives"""
+    _base_cache.clear()
+    _derived_cache.clear()
+
+
+def resample_frame(
+    df: pd.DataFrame, freq: str, rules: dict = RESAMPLE_RULES
+) -> pd.DataFrame:
+    """
+    Resample a time series frame with per-column rules.
+
+    Upsampling fills every sub-period of a base period: step-wise quantities (prices,
+    demands) are forward filled, temperature is interpolated linearly and timestamps
+    are shifted by the sub-period offset. Downsampling aggregates each target period
+    (mean for power and prices, first for timestamps).
+
+    Args:
+        df (pd.DataFrame): Frame with a regular DatetimeIndex (freq must be set or inferable)
+        freq (str): Target frequency (e.g. "15min", "h", "D")
+        rules (dict, optional): Column to (upsampling method, downsampling aggregation).
+            Defaults to RESAMPLE_RULES; other columns use DEFAULT_RESAMPLE_RULE.
+
+    Returns:
+        pd.DataFrame: Resampled frame with the same columns
+    """
+    source_step = to_offset(df.index.freq or pd.infer_freq(df.index))
+    target_step = to_offset(freq)
+    if source_step == target_step:
+        return df
+
+    source_delta = pd.Timedelta(source_step)
+    try:
+        upsampling = pd.Timedelta(target_step) < source_delta
+    except ValueError:
+        # Calendar frequencies (e.g. "MS") are always coarser than the base
+        upsampling = False
+
+    if upsampling:
+        # Cover the full last base period, not just its first sub-period
+        index = pd.date_range(
+            start=df.index[0],
+            end=df.index[-1] + source_delta - pd.Timedelta(target_step),
+            freq=target_step,
         )
-        f.write("51.072056,3.7096772,13.0,0,GMT,GMT\n")
-        f.write("\n")  # Empty line
+        result = df.reindex(index)
+
+        # Offset of each sub-period from the start of its base period
+        anchor = pd.Series(df.index, index=df.index).reindex(index).ffill()
+        offset = index - pd.DatetimeIndex(anchor)
+
+        for column in df.columns:
+            method = rules.get(column, DEFAULT_RESAMPLE_RULE)[0]
+            if method == "interpolate":
+                result[column] = result[column].interpolate(method="linear").ffill()
+            elif method == "shift":
+                result[column] = result[column].ffill() + offset
+            else:
+                result[column] = result[column].ffill()
+        return result
+
+    aggregations = {
+        column: rules.get(column, DEFAULT_RESAMPLE_RULE)[1] for column in df.columns
+    }
+    return df.resample(target_step).agg(aggregations)
+
+
+# Columns converted to int64 epoch nanoseconds (UTC) in compact mode
+TIMESTAMP_COLUMNS = ("process_timestamp",)
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a time series frame to compact dtypes.
+
+    - float64 value columns become float32
+    - timestamp columns (TIMESTAMP_COLUMNS) become int64 epoch nanoseconds (UTC)
+    - boolean flag columns (e.g. low_demand) become categoricals
+
+    float32 keeps about 7 significant digits, so values in the range of the model
+    inputs (prices up to ~1000 €/MWh, demands up to ~100 MW) are represented to within
+    ~1e-4 absolute. Use compare_precision to check a frame against its float64 source.
+
+    Args:
+        df (pd.DataFrame): Frame as returned by get_data or dispatch
+
+    Returns:
+        pd.DataFrame: New frame with compact dtypes (the index is left unchanged)
+    """
+    compact = df.copy()
+    for column in compact.columns:
+        series = compact[column]
+        if column in TIMESTAMP_COLUMNS and isinstance(series.dtype, pd.DatetimeTZDtype):
+            compact[column] = pd.DatetimeIndex(series).asi8
+        elif pd.api.types.is_bool_dtype(series.dtype):
+            compact[column] = series.astype("category")
+        elif pd.api.types.is_float_dtype(series.dtype):
+            compact[column] = series.astype(np.float32)
+    return compact
+
+
+def compare_precision(reference: pd.DataFrame, compact: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare a compact frame against its float64 reference.
+
+    Args:
+        reference (pd.DataFrame): float64 frame
+        compact (pd.DataFrame): Frame produced by compact_frame (or a result computed
+            from compact inputs)
+
+    Returns:
+        pd.DataFrame: Per numeric column the maximum absolute error, the maximum relative
+            error (relative to the column's largest absolute value) and the float64 sum
+            and its deviation in the compact frame
+    """
+    rows = {}
+    for column in reference.select_dtypes(include=[np.floating]).columns:
+        if column not in compact.columns:
+            continue
+        ref = reference[column].to_numpy(dtype=np.float64)
+        cmp = compact[column].to_numpy(dtype=np.float64)
+        scale = np.nanmax(np.abs(ref)) if np.isfinite(ref).any() else 0.0
+        abs_error = np.nanmax(np.abs(ref - cmp)) if len(ref) else 0.0
+        rows[column] = {
+            "max_abs_error": abs_error,
+            "max_rel_error": abs_error / scale if scale > 0 else 0.0,
+            "sum": np.nansum(ref),
+            "sum_error": np.nansum(cmp) - np.nansum(ref),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def _build_base_frame(
+    price_starttime: str,
+    demand_starttime: str,
+    n_periods: int,
+    use_local_data: bool,
+    max_workers: int,
+) -> pd.DataFrame:
+    """Load and merge all sources at BASE_FREQ for `n_periods` base periods."""
+    freq = BASE_FREQ
 
-        # Write the data
-        df_to_save.to_csv(f, index=False)
+    # Sources are requested per day, so round the end up to a whole day
+    span = pd.Timedelta(to_offset(freq)) * n_periods
+    price_endtime = (
+        (pd.Timestamp(price_starttime) + span).ceil("D").strftime("%Y-%m-%d")
+    )
+    demand_endtime = (
+        (pd.Timestamp(demand_starttime) + span).ceil("D").strftime("%Y-%m-%d")
+    )
 
+    # Get price, demand, and temperature data (independent sources, loaded concurrently)
+    sources, timings = load_sources(
+        {
+            "prices": (get_prices, (price_starttime, price_endtime, freq)),
+            "demands": (get_demands, (demand_starttime, demand_endtime, freq)),
+            "temperature": (
+                get_temperature,
+                (price_starttime, price_endtime, freq, use_local_data),
+            ),
+        },
+        max_workers=max_workers,
+    )
+    prices_df = sources["prices"]
+    demands_df = sources["demands"]
+    temperature_df = sources["temperature"]
     print(
-        f"Temperature data saved to {output_file} (period: {start_date} to {end_date})"
+        "Data sources loaded in "
+        + ", ".join(f"{name}: {seconds:.2f}s" for name, seconds in timings.items())
     )
 
+    # Combine price and temperature data
+    market_data = pd.concat([prices_df, temperature_df], axis=1)
+
+    # Reset index of demands_df to make process_timestamp a column
+    demands_df["timestamp"] = market_data.index
+    demands_df = demands_df.reset_index()
+    demands_df = demands_df.rename(columns={"index": "process_timestamp"})
+    demands_df = demands_df.set_index("timestamp")
+
+    # Combine all data
+    df = pd.concat([demands_df, market_data], axis=1)
+
+    # Trim to the requested number of base periods
+    df = df.iloc[:n_periods]
+    df.index.freq = to_offset(freq)
+    df.attrs["source_timings"] = timings
+    return df
+
 
 def get_data(
     price_starttime: str,
@@ -341,6 +769,8 @@ def get_data(
     save_to_csv: bool = False,
     filename: str = "time_series_data.csv",
     use_local_data: bool = False,
+    max_workers: int = 3,
+    compact: bool = False,
 ) -> pd.DataFrame:
     """
     Generate time series data for energy system modeling.
@@ -352,14 +782,18 @@ def get_data(
     Args:
         price_starttime (str): Start date for price data (format: 'YYYY-MM-DD')
         demand_starttime (str): Start date for demand data (format: 'YYYY-MM-DD')
-        length (int): Number of periods to generate
+        length (int): Number of periods (of `freq`) to generate
         freq (str, optional): Frequency of the time series. Defaults to "h" (hourly).
-            Other options: "D" (daily), "15T" (15 minutes), etc.
+            Other options: "D" (daily), "15min" (15 minutes), etc.
         save_to_csv (bool, optional): Whether to save the data to a CSV file. Defaults to False.
         filename (str, optional): Name of the CSV file to save to. Defaults to "time_series_data.csv".
             If file exists, a number will be appended to the filename.
         use_local_data (bool, optional): Whether to use locally saved temperature data instead of API.
-            Defaults to False. If True, reads from 'data/open-meteo-51.07N3.71E13m.csv'.
+            Defaults to False. If True, only the local Open-Meteo files in 'data/' are used.
+        max_workers (int, optional): Number of sources (prices, demands, temperature) loaded
+            concurrently. Defaults to 3. Use 1 to load them one after another.
+        compact (bool, optional): Return compact dtypes (float32 values, int64 epoch
+            process_timestamp), see compact_frame. Defaults to False.
 
     Returns:
         pd.DataFrame: DataFrame with datetime index (timestamp) containing:
@@ -379,41 +813,43 @@ def get_data(
         - Demand data maintains its original timestamps
         - DataFrame has timestamp as index and process_timestamp as column
         - If use_local_data=True, temperature data is read from local file instead of API
+        - Sources are loaded once at hourly resolution (BASE_FREQ); other frequencies are
+          derived with the per-column RESAMPLE_RULES and cached per frequency
+        - Load time per source (seconds) is stored in df.attrs["source_timings"]
     """
-    # Calculate endtimes based on length
-    price_endtime = (
-        pd.Timestamp(price_starttime) + pd.Timedelta(hours=length)
-    ).strftime("%Y-%m-%d")
-    demand_endtime = (
-        pd.Timestamp(demand_starttime) + pd.Timedelta(hours=length)
-    ).strftime("%Y-%m-%d")
-
-    # Get price, demand, and temperature data
-    prices_df = get_prices(price_starttime, price_endtime, freq)
-    demands_df = get_demands(demand_starttime, demand_endtime, freq)
-    temperature_df = get_temperature(
-        price_starttime, price_endtime, freq, use_local_data
-    )
-
-    # Create a common date range for price and temperature data
-    date_range = pd.date_range(
-        start=pd.Timestamp(price_starttime).tz_localize("CET"),
-        end=pd.Timestamp(price_endtime).tz_localize("CET"),
-        freq=freq,
-        tz="CET",
-    )
-
-    # Combine price and temperature data
-    market_data = pd.concat([prices_df, temperature_df], axis=1)
-
-    # Reset index of demands_df to make process_timestamp a column
-    demands_df["timestamp"] = market_data.index
-    demands_df = demands_df.reset_index()
-    demands_df = demands_df.rename(columns={"index": "process_timestamp"})
-    demands_df = demands_df.set_index("timestamp")
+    start = pd.Timestamp(price_starttime).tz_localize("CET")
+    target_index = pd.date_range(start=start, periods=length, freq=freq, tz="CET")
+
+    # Number of base (hourly) periods covering the requested window
+    end = target_index[-1] + to_offset(freq)
+    base_delta = pd.Timedelta(to_offset(BASE_FREQ))
+    n_base = int(np.ceil((end - start) / base_delta))
+
+    # Hourly base frame, built once per window
+    base_key = (price_starttime, demand_starttime, n_base, use_local_data)
+    base = _cache_get(_base_cache, base_key)
+    if base is None:
+        base = _build_base_frame(
+            price_starttime, demand_starttime, n_base, use_local_data, max_workers
+        )
+        _cache_put(_base_cache, base_key, base)
 
-    # Combine all data
-    df = pd.concat([demands_df, market_data], axis=1)
+    # Derived frequency, resampled once per window and frequency
+    if to_offset(freq) == to_offset(BASE_FREQ):
+        derived = base
+    else:
+        derived_key = base_key + (to_offset(freq).freqstr,)
+        derived = _cache_get(_derived_cache, derived_key)
+        if derived is None:
+            derived = resample_frame(base, freq)
+            derived.attrs = dict(base.attrs)
+            _cache_put(_derived_cache, derived_key, derived)
+
+    # Callers add and modify columns, so never hand out the cached frame itself
+    if compact:
+        df = compact_frame(derived.iloc[:length])
+    else:
+        df = derived.iloc[:length].copy()
 
     # Save to CSV if requested
     if save_to_csv:
@@ -0,0 +1,647 @@
+"""
+Dispatch of a presolved plant with the builder chosen in the scenario.
+
+`BuilderType.PYOMO` hands the plant's model_to_flex model to the model_to_flex
+dispatch. `BuilderType.SPARSE` builds each dispatch window as a sparse matrix
+(`core.sparse_builder`) and solves it in-process with HiGHS; storage state of
+charge and CHP on/off state are carried from one window to the next.
+"""
+
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from model_to_flex.core import enums as flex_enums
+from model_to_flex.core.dispatch import dispatch as flex_dispatch
+
+from core.enums import BuilderType, to_flex_enum
+from core.infeasibility import WindowDiagnosis, elastic_solve, slack_columns
+from core.merit_order import MeritOrderError, merit_order_start, merit_order_values
+from core.precheck import check_inputs, shorten_windows
+from core.presolve import PresolvedPlant
+from core.scaling import conditioning, scale_problem
+from core.solver_session import SolverSession, get_solver_session
+from core.sparse_builder import SolveResult, SparseBuilder, shift_solution, solve
+
+# Input pre-check modes of `dispatch`
+PRECHECK_MODES = ("off", "flag", "shorten")
+
+# Options of `dispatch` the Pyomo builder does not support, with their defaults
+SPARSE_ONLY_OPTIONS = {
+    "persistent_solver": False,
+    "warm_start": True,
+    "compare_cold": False,
+    "heuristic_start": False,
+    "workers": 1,
+    "scaling": False,
+    "elastic": False,
+    "iis": False,
+}
+
+
+@dataclass
+class DispatchResult:
+    """Results of a dispatch, with the attributes of a solved model_to_flex model"""
+
+    results: pd.DataFrame
+    KPIs: Dict[str, Any] = field(default_factory=dict)
+
+
+def dispatch_windows(
+    index: pd.Index, dispatch_type, pred_hor: Optional[int], contr_hor: Optional[int]
+) -> List[tuple]:
+    """
+    Split the horizon into dispatch windows.
+
+    Args:
+        index (pd.Index): Index of the input data
+        dispatch_type: DispatchType (or its value); "monthly" solves calendar months
+        pred_hor (int, optional): Periods optimized per window (rolling horizon)
+        contr_hor (int, optional): Periods kept per window (rolling horizon)
+
+    Returns:
+        List[tuple]: (optimized slice, number of periods kept) per window
+    """
+    n = len(index)
+    if getattr(dispatch_type, "value", dispatch_type) in ("monthly", "MONTHLY"):
+        if not isinstance(index, pd.DatetimeIndex):
+            index = pd.DatetimeIndex(index)
+        months = index.year * 12 + index.month
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+        ends = np.r_[starts[1:], n]
+        return [(slice(s, e), e - s) for s, e in zip(starts, ends)]
+
+    if not pred_hor or pred_hor >= n:
+        return [(slice(0, n), n)]
+    contr_hor = contr_hor or pred_hor
+    windows = []
+    for start in range(0, n, contr_hor):
+        stop = min(start + pred_hor, n)
+        windows.append((slice(start, stop), min(contr_hor, n - start)))
+    return windows
+
+
+def kept_objective(problem, x: np.ndarray, n_keep: int) -> Tuple[float, float]:
+    """
+    Objective of the first `n_keep` periods of a window (plus its per-window terms).
+
+    Returns:
+        Tuple[float, float]: Objective without the elastic slack penalties, and
+            those penalties (0 unless the window was solved elastic)
+    """
+    kept = np.unique(
+        np.concatenate(
+            [
+                columns[:n_keep] if len(columns) == problem.n_periods else columns
+                for columns in problem.columns.values()
+            ]
+        )
+    )
+    slack = np.isin(kept, slack_columns(problem))
+    penalty = float(problem.c[kept[slack]] @ x[kept[slack]])
+    return float(problem.c[kept] @ x[kept]) - penalty, penalty
+
+
+def solve_window(
+    builder: SparseBuilder,
+    problem,
+    window: slice,
+    state: Dict[tuple, float],
+    start: Optional[np.ndarray] = None,
+    solver_options: Optional[Dict[str, Any]] = None,
+    session: Optional[SolverSession] = None,
+    heuristic_start: bool = False,
+    heuristic_only: bool = False,
+    scaling: bool = False,
+) -> SolveResult:
+    """
+    Solve the problem of one window (or dispatch it by merit order).
+
+    Args:
+        builder (SparseBuilder): Builder of the plant
+        problem (SparseProblem): Problem of the window
+        window (slice): Periods of the window
+        state (Dict[tuple, float]): State before the window
+        start (np.ndarray, optional): MIP start. Defaults to None.
+        solver_options (Dict[str, Any], optional): HiGHS options. Defaults to None.
+        session (SolverSession, optional): Solver session. Defaults to None.
+        heuristic_start (bool, optional): Merit-order MIP start if `start` is None.
+            Defaults to False.
+        heuristic_only (bool, optional): Merit-order dispatch without solving.
+            Defaults to False.
+        scaling (bool, optional): Solve the geometrically scaled problem and map
+            the solution back (`core.scaling`). Defaults to False.
+
+    Returns:
+        SolveResult: Solution of the window
+
+    Raises:
+        RuntimeError: If the window has no feasible solution
+    """
+    if heuristic_only:
+        started = time.perf_counter()
+        x = merit_order_start(builder, problem, window, state)
+        return SolveResult(
+            status="Merit order",
+            x=x,
+            objective=float(problem.c @ x),
+            solve_time=time.perf_counter() - started,
+        )
+
+    if start is None and heuristic_start:
+        try:
+            start = merit_order_start(builder, problem, window, state)
+        except MeritOrderError:
+            start = None  # plant or period not covered by the heuristic
+    scaled = scale_problem(problem) if scaling else None
+    if scaled is not None:
+        problem, start = scaled.problem, scaled.scale(start)
+    if session is None:
+        solution = solve(problem, solver_options, start)
+    else:
+        solution = session.solve(problem, solver_options, start)
+    if scaled is not None:
+        solution = scaled.unscale(solution)
+    if solution.x is None:
+        raise RuntimeError(
+            f"No solution for periods {window.start}-{window.stop}: {solution.status}"
+        )
+    return solution
+
+
+def _solve_or_diagnose(
+    builder: SparseBuilder,
+    problem,
+    window: slice,
+    state: Dict[tuple, float],
+    start: Optional[np.ndarray] = None,
+    session: Optional[SolverSession] = None,
+    elastic: bool = False,
+    iis: bool = False,
+    **options,
+) -> Tuple[Any, SolveResult, Optional[WindowDiagnosis]]:
+    """
+    `solve_window`, falling back to an elastic solve if the window is infeasible.
+
+    Returns:
+        Tuple: Problem solved (the elastic one after a fallback), its solution and
+            the diagnosis of the window (None if it solved as is)
+    """
+    try:
+        solution = solve_window(
+            builder, problem, window, state, start, session=session, **options
+        )
+        return problem, solution, None
+    except RuntimeError as error:
+        if not elastic:
+            raise
+        return elastic_solve(
+            builder,
+            window,
+            state,
+            options.get("solver_options"),
+            iis=iis,
+            status=str(error),
+        )
+
+
+def _carried_state(topology) -> List[tuple]:
+    """Variables whose last value is the initial state of the next window"""
+    return [
+        (spec.name, var)
+        for spec in topology.components
+        for var, kind in (("soc", "Storage"), ("is_on", "CHP"))
+        if spec.type == kind
+    ]
+
+
+def _end_state(results: pd.DataFrame, carried: List[tuple]) -> Dict[tuple, float]:
+    return {node: results[f"{node[0]}_{node[1]}"].iloc[-1] for node in carried}
+
+
+def _new_kpis() -> Dict[str, Any]:
+    # Objective of the kept periods (elastic slack penalties apart), solve time,
+    # windows solved again without presolve and the largest window size
+    return {
+        "objective": 0.0,
+        "slack_penalty": 0.0,
+        "solve_time": 0.0,
+        "windows": 0,
+        "presolve_retries": 0,
+        "rows": 0,
+        "columns": 0,
+    }
+
+
+def _add_diagnosis(kpis, diagnosis: Optional[WindowDiagnosis]):
+    if diagnosis is not None:
+        kpis.setdefault("diagnoses", []).append(diagnosis)
+        print(diagnosis.summary())
+
+
+def _add_kpis(kpis, problem, solution: SolveResult, n_keep: int, scaling=False):
+    objective, penalty = kept_objective(problem, solution.x, n_keep)
+    kpis["objective"] += objective
+    kpis["slack_penalty"] += penalty
+    kpis["solve_time"] += solution.solve_time
+    kpis["windows"] += 1
+    kpis["presolve_retries"] += solution.presolve_retry
+    kpis["rows"] = max(kpis["rows"], problem.A.shape[0])
+    kpis["columns"] = max(kpis["columns"], problem.A.shape[1])
+
+    # Conditioning of the worst window, as built and as solved
+    report = conditioning(problem).to_dict()
+    worst = kpis.get("conditioning")
+    if worst is None or report["matrix_orders"] > worst["matrix_orders"]:
+        kpis["conditioning"] = report
+        if scaling:
+            kpis["scaled_conditioning"] = conditioning(
+                scale_problem(problem).problem
+            ).to_dict()
+
+
+def dispatch_sparse(
+    plant: PresolvedPlant,
+    dispatch_type,
+    pred_hor: Optional[int] = None,
+    contr_hor: Optional[int] = None,
+    solver_options: Optional[Dict[str, Any]] = None,
+    session: Optional[SolverSession] = None,
+    warm_start: bool = True,
+    compare_cold: bool = False,
+    heuristic_start: bool = False,
+    heuristic_only: bool = False,
+    workers: int = 1,
+    windows: Optional[List[tuple]] = None,
+    carry_state: bool = True,
+    scaling: bool = False,
+    elastic: bool = False,
+    iis: bool = False,
+) -> DispatchResult:
+    """
+    Dispatch a presolved plant with the sparse builder and HiGHS.
+
+    Args:
+        plant (PresolvedPlant): Presolved run
+        dispatch_type: DispatchType of the scenario
+        pred_hor (int, optional): Prediction horizon of a rolling dispatch. Defaults to None.
+        contr_hor (int, optional): Control horizon of a rolling dispatch. Defaults to None.
+        solver_options (Dict[str, Any], optional): HiGHS options. Defaults to None.
+        session (SolverSession, optional): Session that keeps the HiGHS instances
+            between windows and runs. Defaults to None (one-off solves).
+        warm_start (bool, optional): Start each overlapping rolling window from the
+            shifted solution of the previous one. Defaults to True.
+        compare_cold (bool, optional): Also solve every window cold and report the
+            speedup of the warm start per window. Defaults to False.
+        heuristic_start (bool, optional): Offer the merit-order dispatch as MIP start
+            to windows without a shifted start. Defaults to False.
+        heuristic_only (bool, optional): Return the merit-order dispatch without
+            solving the MILP (screening). Defaults to False.
+        workers (int, optional): Processes solving non-overlapping windows (e.g.
+            monthly) in parallel, see `dispatch_parallel`. Defaults to 1.
+        windows (List[tuple], optional): (slice, periods kept) per window. Defaults to
+            the windows of `dispatch_type`, `pred_hor` and `contr_hor`.
+        carry_state (bool, optional): Start each window from the end state of the
+            previous one; off for independent windows such as representative
+            periods. Defaults to True.
+        scaling (bool, optional): Scale each window before solving, see
+            `core.scaling`. Defaults to False.
+        elastic (bool, optional): Solve an infeasible window again with penalized
+            slacks on its data bounds instead of failing, see `core.infeasibility`.
+            Defaults to False.
+        iis (bool, optional): Also extract an IIS of every infeasible window.
+            Defaults to False.
+
+    Returns:
+        DispatchResult: Results of all windows and KPIs, with per-window statistics
+            in KPIs["window_stats"], the coefficient ranges of the worst window
+            in KPIs["conditioning"] (and KPIs["scaled_conditioning"] if scaled),
+            a `WindowDiagnosis` per infeasible window in KPIs["diagnoses"] and
+            their slack penalties in KPIs["slack_penalty"] (not in the objective)
+
+    Raises:
+        RuntimeError: If a window has no feasible solution (and `elastic` is off)
+        MeritOrderError: If `heuristic_only` is set and the heuristic does not apply
+    """
+    builder = SparseBuilder(
+        plant.topology,
+        plant.data_bindings,
+        plant.parameter_bindings,
+        plant.params,
+        plant.data,
+    )
+    if windows is None:
+        windows = dispatch_windows(plant.data.index, dispatch_type, pred_hor, contr_hor)
+    options = dict(
+        solver_options=solver_options,
+        heuristic_start=heuristic_start,
+        heuristic_only=heuristic_only,
+        scaling=scaling,
+        elastic=elastic,
+        iis=iis,
+    )
+    if workers > 1 and len(windows) > 1:
+        return dispatch_parallel(
+            builder, windows, workers, session is not None, **options
+        )
+
+    carried = _carried_state(plant.topology)
+    state: Dict[tuple, float] = {}
+    frames = []
+    kpis = _new_kpis()
+    window_stats = []
+    previous = None
+    for window, n_keep in windows:
+        problem = builder.build(window, state)
+
+        # Overlapping rolling windows start from the shifted previous solution
+        start = None
+        if warm_start and previous is not None and previous[0].stop > window.start:
+            last_window, last_problem, last_x = previous
+            start = shift_solution(
+                last_problem, last_x, window.start - last_window.start, problem
+            )
+
+        problem, solution, diagnosis = _solve_or_diagnose(
+            builder, problem, window, state, start, session=session, **options
+        )
+        _add_diagnosis(kpis, diagnosis)
+        results = builder.results(problem, solution.x, window).iloc[:n_keep]
+        frames.append(results)
+        state = _end_state(results, carried) if carry_state else {}
+        previous = (window, problem, solution.x)
+
+        stats = {
+            "start": window.start,
+            "periods": window.stop - window.start,
+            "solve_time": solution.solve_time,
+            "warm_started": start is not None,
+        }
+        if compare_cold and not heuristic_only:
+            stats["cold_time"] = solve(problem, solver_options).solve_time
+            stats["speedup"] = stats["cold_time"] / max(solution.solve_time, 1e-9)
+        window_stats.append(stats)
+        _add_kpis(kpis, problem, solution, n_keep, scaling)
+    kpis["window_stats"] = window_stats
+    return DispatchResult(results=pd.concat(frames), KPIs=kpis)
+
+
+# Builder of the plant in a worker process of `dispatch_parallel`
+_worker_builder: Optional[SparseBuilder] = None
+
+
+def _init_worker(builder: SparseBuilder):
+    global _worker_builder
+    _worker_builder = builder
+
+
+def _solve_window_task(task):
+    """Solve one window in a worker process"""
+    window, state, persistent, options = task
+    builder = _worker_builder
+    problem = builder.build(window, state)
+    session = get_solver_session() if persistent else None
+    return _solve_or_diagnose(
+        builder, problem, window, state, session=session, **options
+    )
+
+
+def _guess_states(builder, windows, carried) -> List[Dict[tuple, float]]:
+    """
+    Initial states assumed for parallel windows.
+
+    The first window starts from the default state; every later window from the
+    end state of the merit-order dispatch of the window before, or the default
+    state (CHP off, storage empty) where the heuristic does not apply.
+    """
+    guesses = [{}]
+    state: Dict[tuple, float] = {}
+    for window, _ in windows[:-1]:
+        try:
+            values = merit_order_values(builder, window, state)
+            state = {
+                node: float(values[node][-1]) for node in carried if node in values
+            }
+        except MeritOrderError:
+            state = {}
+        guesses.append(state)
+    return guesses
+
+
+def dispatch_parallel(
+    builder: SparseBuilder,
+    windows: List[tuple],
+    workers: int,
+    persistent: bool = False,
+    **options,
+) -> DispatchResult:
+    """
+    Solve non-overlapping windows across a process pool and stitch the results.
+
+    Windows only depend on each other through the carried state (CHP on/off,
+    storage state of charge). Each window is solved in parallel from an assumed
+    initial state (see `_guess_states`). The results are then stitched in order:
+    a window whose assumed state differs from the end state of the window before
+    is solved again with the actual state, so the stitched dispatch equals the
+    sequential one.
+
+    Args:
+        builder (SparseBuilder): Builder of the plant
+        windows (List[tuple]): Windows from `dispatch_windows`; must not overlap
+        workers (int): Number of processes
+        persistent (bool, optional): Use a solver session per worker. Defaults to False.
+        **options: Options of `solve_window`
+
+    Returns:
+        DispatchResult: Results and KPIs, with the number of windows solved again
+            in KPIs["resolved_windows"]
+    """
+    if any(n_keep != window.stop - window.start for window, n_keep in windows):
+        raise ValueError("Parallel dispatch needs non-overlapping windows")
+
+    carried = _carried_state(builder.topology)
+    guesses = _guess_states(builder, windows, carried)
+    tasks = [
+        (window, guess, persistent, options)
+        for (window, _), guess in zip(windows, guesses)
+    ]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(builder,)
+    ) as executor:
+        outcomes = list(executor.map(_solve_window_task, tasks))
+    parallel_time = time.perf_counter() - started
+
+    frames = []
+    kpis = _new_kpis()
+    window_stats = []
+    state: Dict[tuple, float] = {}
+    resolved = 0
+    for (window, n_keep), guess, outcome in zip(windows, guesses, outcomes):
+        problem, solution, diagnosis = outcome
+        mismatch = any(
+            abs(state.get(node, 0.0) - guess.get(node, 0.0)) > 1e-6 for node in carried
+        )
+        if mismatch:
+            problem, solution, diagnosis = _solve_or_diagnose(
+                builder, builder.build(window, state), window, state, **options
+            )
+            resolved += 1
+        _add_diagnosis(kpis, diagnosis)
+        results = builder.results(problem, solution.x, window)
+        frames.append(results)
+        state = _end_state(results, carried)
+        window_stats.append(
+            {
+                "start": window.start,
+                "periods": window.stop - window.start,
+                "solve_time": solution.solve_time,
+                "resolved": mismatch,
+            }
+        )
+        _add_kpis(kpis, problem, solution, n_keep, options.get("scaling", False))
+
+    kpis["window_stats"] = window_stats
+    kpis["workers"] = workers
+    kpis["parallel_time"] = parallel_time
+    kpis["resolved_windows"] = resolved
+    return DispatchResult(results=pd.concat(frames), KPIs=kpis)
+
+
+def dispatch(
+    plant: PresolvedPlant,
+    optimizer_type: str = "default",
+    builder_type: BuilderType = BuilderType.PYOMO,
+    solver=None,
+    dispatch_type=None,
+    pred_hor: Optional[int] = None,
+    contr_hor: Optional[int] = None,
+    solver_options: Optional[Dict[str, Any]] = None,
+    persistent_solver: bool = False,
+    warm_start: bool = True,
+    compare_cold: bool = False,
+    heuristic_start: bool = False,
+    workers: int = 1,
+    scaling: bool = False,
+    elastic: bool = False,
+    iis: bool = False,
+    precheck: str = "off",
+):
+    """
+    Dispatch a presolved plant.
+
+    Args:
+        plant (PresolvedPlant): Presolved run
+        optimizer_type (str, optional): Optimizer type of model_to_flex. Defaults to "default".
+        builder_type (BuilderType, optional): Builder. Defaults to BuilderType.PYOMO.
+        solver (SolverType, optional): Solver of the Pyomo builder; the sparse builder
+            always uses HiGHS. Defaults to None.
+        dispatch_type (DispatchType, optional): Dispatch type. Defaults to None.
+        pred_hor (int, optional): Prediction horizon. Defaults to None.
+        contr_hor (int, optional): Control horizon. Defaults to None.
+        solver_options (Dict[str, Any], optional): HiGHS options of the sparse builder,
+            or the solver options passed to model_to_flex. Defaults to None.
+        persistent_solver (bool, optional): Reuse the HiGHS instances of the
+            process-wide solver session (sparse builder only). Defaults to False.
+        warm_start (bool, optional): Warm-start overlapping rolling windows (sparse
+            builder only). Defaults to True.
+        compare_cold (bool, optional): Report the warm-start speedup per window
+            (sparse builder only). Defaults to False.
+        heuristic_start (bool, optional): Use the merit-order dispatch as MIP start
+            (sparse builder only). Defaults to False.
+        workers (int, optional): Processes solving monthly windows in parallel
+            (sparse builder only). Defaults to 1.
+        scaling (bool, optional): Geometric scaling of each window before solving
+            (sparse builder only). Defaults to False.
+        elastic (bool, optional): Diagnose infeasible windows with an elastic
+            re-solve instead of failing (sparse builder only). Defaults to False.
+        iis (bool, optional): Extract an IIS of every infeasible window (sparse
+            builder only). Defaults to False.
+        precheck (str, optional): Check the input data for periods that cannot be
+            dispatched before building any model, see `core.precheck`: "off",
+            "flag" (report them) or "shorten" (also leave them out of the dispatch
+            windows; sparse builder only). Defaults to "off".
+
+    Returns:
+        Solved model (or DispatchResult) with `results` and `KPIs`, and the
+            `PrecheckReport` in KPIs["precheck"] (sparse builder only)
+
+    Raises:
+        ValueError: If `precheck` is unknown, or the solver is not available in
+            model_to_flex (HiGHS with the Pyomo builder)
+    """
+    if precheck not in PRECHECK_MODES:
+        raise ValueError(f"Unknown precheck mode '{precheck}'")
+    builder_type = BuilderType(getattr(builder_type, "value", builder_type))
+    report = None
+    if precheck != "off":
+        report = check_inputs(plant)
+        if not report.feasible:
+            print(report.summary())
+
+    if builder_type in (BuilderType.SPARSE, BuilderType.MERIT_ORDER):
+        session = get_solver_session() if persistent_solver else None
+        windows = None
+        if precheck == "shorten" and not report.feasible:
+            windows = shorten_windows(
+                dispatch_windows(plant.data.index, dispatch_type, pred_hor, contr_hor),
+                report.infeasible,
+            )
+        result = dispatch_sparse(
+            plant,
+            dispatch_type,
+            pred_hor,
+            contr_hor,
+            solver_options,
+            session,
+            warm_start,
+            compare_cold,
+            heuristic_start,
+            heuristic_only=builder_type == BuilderType.MERIT_ORDER,
+            workers=workers,
+            scaling=scaling,
+            elastic=elastic,
+            iis=iis,
+            windows=windows,
+        )
+        if report is not None:
+            result.KPIs["precheck"] = report
+        return result
+
+    ignored = [
+        name
+        for name, value in {
+            "persistent_solver": persistent_solver,
+            "warm_start": warm_start,
+            "compare_cold": compare_cold,
+            "heuristic_start": heuristic_start,
+            "workers": workers,
+            "scaling": scaling,
+            "elastic": elastic,
+            "iis": iis,
+        }.items()
+        if value != SPARSE_ONLY_OPTIONS[name]
+    ]
+    if precheck == "shorten":
+        ignored.append("precheck='shorten'")
+    if ignored:
+        warnings.warn(
+            f"Ignored by the Pyomo builder (sparse builder only): {', '.join(ignored)}"
+        )
+
+    return flex_dispatch(
+        plant.build(),
+        plant.params,
+        plant.data,
+        optimizer_type=optimizer_type,
+        builder_type=to_flex_enum(builder_type, flex_enums.BuilderType),
+        solver=to_flex_enum(solver, flex_enums.SolverType),
+        dispatch_type=dispatch_type,
+        pred_hor=pred_hor,
+        contr_hor=contr_hor,
+        **({} if solver_options is None else {"solver_options": solver_options}),
+    )
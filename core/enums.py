@@ -0,0 +1,48 @@
+"""
+Builder and solver options of the Kronos dispatch.
+
+These extend the model_to_flex enums with the in-repo sparse builder, the
+merit-order heuristic and the HiGHS solver. Members shared with model_to_flex have
+the same values, so scenarios stored with the model_to_flex enums load unchanged.
+"""
+
+from enum import Enum
+
+
+class BuilderType(Enum):
+    """How the optimization problem is built"""
+
+    PYOMO = "pyomo"  # model_to_flex Pyomo builder
+    SPARSE = "sparse"  # core.sparse_builder: SciPy sparse matrices, solved in-process
+    MERIT_ORDER = "merit_order"  # core.merit_order: heuristic, no solver (screening)
+
+
+class SolverType(Enum):
+    """Solver used by the builder"""
+
+    CBC = "cbc"
+    HIGHS = "highs"
+
+
+def to_flex_enum(value, flex_enum):
+    """
+    Convert a Kronos enum member (or its string value) to the model_to_flex enum.
+
+    Args:
+        value: Enum member or string value
+        flex_enum: model_to_flex enum class, e.g. model_to_flex.core.enums.BuilderType
+
+    Returns:
+        Member of `flex_enum` with the same value
+
+    Raises:
+        ValueError: If model_to_flex has no such member, e.g. SolverType.HIGHS,
+            which only the sparse builder supports
+    """
+    try:
+        return flex_enum(getattr(value, "value", value))
+    except ValueError:
+        raise ValueError(
+            f"{value} is not available in model_to_flex.{flex_enum.__name__}; "
+            "use it with BuilderType.SPARSE"
+        ) from None
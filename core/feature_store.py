@@ -0,0 +1,296 @@
+"""
+Feature store for scenario input data.
+
+All Flex scenarios share the same price and demand windows, yet every scenario run
+rebuilt the same aligned input frame. The feature store builds the aligned price,
+demand and temperature matrix once per (price_starttime, demand_starttime, freq,
+use_local_data), persists it as a float64 `.npy` array plus a JSON sidecar, and
+memory-maps it on later use. Scenario windows are returned as zero-copy slices of
+that matrix.
+
+The sidecar records the local source files (historian export, temperature store,
+recorded market data) with their mtime, size and SHA-256, and the market data
+provider. A matrix whose sources changed is rebuilt; as for the historian cache, the
+cheap mtime/size check is tried first and the content hash decides.
+
+Example:
+    >>> store = get_feature_store()
+    >>> data = store.get_window("2024-01-01", "2022-01-01", length=8760, freq="h")
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.data_generator import (
+    KRONOS_DATA_FILE,
+    _file_sha256,
+    clear_data_cache,
+    get_data,
+)
+from core.market_data import get_market_data_cache
+from core.temperature_store import get_temperature_store
+
+FEATURE_STORE_DIR = "data/cache/features"
+FEATURE_STORE_VERSION = 2
+
+# Gas turbine capacity dependence on temperature: Capacity ~ 6.55 - 0.045 * T
+TURBINE_CAPACITY_AT_0C = 6.550
+TURBINE_CAPACITY_SLOPE = 0.045
+
+
+def temperature_scaling(temperature):
+    """Relative gas turbine capacity as a function of the air temperature (°C)"""
+    return (
+        TURBINE_CAPACITY_AT_0C - TURBINE_CAPACITY_SLOPE * temperature
+    ) / TURBINE_CAPACITY_AT_0C
+
+
+def source_files() -> List[str]:
+    """Local files a feature matrix is built from"""
+    files = (
+        [KRONOS_DATA_FILE]
+        + get_temperature_store().source_files()
+        + get_market_data_cache().provider.source_files()
+    )
+    return [path for path in files if os.path.exists(path)]
+
+
+def source_fingerprints() -> Dict[str, dict]:
+    """mtime, size and SHA-256 of every source file"""
+    fingerprints = {}
+    for path in source_files():
+        stat = os.stat(path)
+        fingerprints[path] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": _file_sha256(path),
+        }
+    return fingerprints
+
+
+def market_data_provider() -> str:
+    """Name of the market data provider in use"""
+    return type(get_market_data_cache().provider).__name__
+
+
+def sources_unchanged(meta: dict) -> bool:
+    """
+    Check the sources recorded in a matrix's metadata against the current files.
+
+    Files with a new mtime or size but the same content hash count as unchanged;
+    their recorded mtime and size are updated in `meta`.
+
+    Args:
+        meta (dict): Metadata of a stored matrix
+
+    Returns:
+        bool: True if the matrix was built from the current sources
+    """
+    sources = meta.get("sources", {})
+    if meta.get("market_data_provider") != market_data_provider():
+        return False
+    if set(sources) != set(source_files()):
+        return False
+    for path, recorded in sources.items():
+        stat = os.stat(path)
+        if recorded["mtime"] == stat.st_mtime and recorded["size"] == stat.st_size:
+            continue
+        if recorded["sha256"] != _file_sha256(path):
+            return False
+        recorded["mtime"], recorded["size"] = stat.st_mtime, stat.st_size
+    return True
+
+
+class FeatureStore:
+    """Memory-mapped store of aligned input matrices, one per data window"""
+
+    def __init__(self, cache_dir: str = FEATURE_STORE_DIR):
+        self.cache_dir = cache_dir
+        self._loaded: Dict[tuple, Tuple[np.ndarray, np.ndarray, dict]] = {}
+
+    def _paths(self, key: tuple) -> Tuple[str, str, str]:
+        digest = hashlib.sha1("|".join(map(str, key)).encode("utf-8")).hexdigest()[:16]
+        base = os.path.join(self.cache_dir, f"features_{digest}")
+        return f"{base}.npy", f"{base}_process_timestamp.npy", f"{base}.json"
+
+    def build(
+        self,
+        price_starttime: str,
+        demand_starttime: str,
+        length: int,
+        freq: str = "h",
+        use_local_data: bool = True,
+    ) -> dict:
+        """
+        Build and persist the feature matrix of one data window.
+
+        Args:
+            price_starttime (str): Start date for price data (format: 'YYYY-MM-DD')
+            demand_starttime (str): Start date for demand data (format: 'YYYY-MM-DD')
+            length (int): Number of periods to build
+            freq (str, optional): Frequency of the time series. Defaults to "h".
+            use_local_data (bool, optional): Passed to get_data. Defaults to True.
+
+        Returns:
+            dict: Metadata of the stored matrix
+        """
+        key = (price_starttime, demand_starttime, freq, use_local_data)
+        values_path, timestamps_path, meta_path = self._paths(key)
+
+        df = get_data(
+            price_starttime=price_starttime,
+            demand_starttime=demand_starttime,
+            length=length,
+            freq=freq,
+            save_to_csv=False,
+            use_local_data=use_local_data,
+        )
+        df["temperature_scaling"] = temperature_scaling(df["temperature"])
+
+        process_timestamps = pd.DatetimeIndex(df.pop("process_timestamp"))
+        values = np.ascontiguousarray(df.to_numpy(dtype=np.float64))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.save(values_path, values)
+        np.save(timestamps_path, process_timestamps.tz_convert("UTC").asi8)
+
+        meta = {
+            "version": FEATURE_STORE_VERSION,
+            "price_starttime": price_starttime,
+            "demand_starttime": demand_starttime,
+            "freq": freq,
+            "use_local_data": use_local_data,
+            "length": len(df),
+            "start": df.index[0].isoformat(),
+            "columns": list(df.columns),
+            # Taken after get_data, which may have backfilled the temperature store
+            "market_data_provider": market_data_provider(),
+            "sources": source_fingerprints(),
+        }
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+
+        self._loaded.pop(key, None)
+        print(f"Feature matrix {key} stored with shape {values.shape}")
+        return meta
+
+    def _is_current(self, key: tuple, meta: dict) -> bool:
+        """Check the sources of a matrix, refreshing its sidecar if only mtimes moved"""
+        recorded = json.dumps(meta.get("sources"), sort_keys=True)
+        if not sources_unchanged(meta):
+            return False
+        if json.dumps(meta["sources"], sort_keys=True) != recorded:
+            # Same content, new mtime: refresh the metadata so the next check is cheap
+            with open(self._paths(key)[2], "w") as f:
+                json.dump(meta, f, indent=2)
+        return True
+
+    def _load(self, key: tuple) -> Optional[Tuple[np.ndarray, np.ndarray, dict]]:
+        """Memory-map a stored matrix, or return None if it is missing or stale"""
+        if key in self._loaded:
+            if self._is_current(key, self._loaded[key][2]):
+                return self._loaded[key]
+            del self._loaded[key]
+            return None
+
+        values_path, timestamps_path, meta_path = self._paths(key)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("version") != FEATURE_STORE_VERSION or not self._is_current(
+            key, meta
+        ):
+            return None
+
+        values = np.load(values_path, mmap_mode="r")
+        timestamps = np.load(timestamps_path, mmap_mode="r")
+        self._loaded[key] = (values, timestamps, meta)
+        return self._loaded[key]
+
+    def get_window(
+        self,
+        price_starttime: str,
+        demand_starttime: str,
+        length: int,
+        freq: str = "h",
+        offset: int = 0,
+        use_local_data: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Return a window of the feature matrix, building it on first use.
+
+        The value columns of the returned DataFrame are a read-only, zero-copy view on
+        the memory-mapped matrix. Assigning columns creates new columns as usual;
+        modify existing columns by assignment rather than in place.
+
+        Args:
+            price_starttime (str): Start date for price data (format: 'YYYY-MM-DD')
+            demand_starttime (str): Start date for demand data (format: 'YYYY-MM-DD')
+            length (int): Number of periods in the window
+            freq (str, optional): Frequency of the time series. Defaults to "h".
+            offset (int, optional): First period of the window. Defaults to 0.
+            use_local_data (bool, optional): Passed to get_data when building; part
+                of the key. Defaults to True.
+
+        Returns:
+            pd.DataFrame: Same layout as get_data, plus a `temperature_scaling` column
+        """
+        key = (price_starttime, demand_starttime, freq, use_local_data)
+        loaded = self._load(key)
+        if loaded is None and os.path.exists(self._paths(key)[2]):
+            # Stale matrix: the in-process source caches may be stale as well
+            clear_data_cache()
+            get_temperature_store().load()
+        if loaded is None or loaded[2]["length"] < offset + length:
+            self.build(
+                price_starttime,
+                demand_starttime,
+                offset + length,
+                freq,
+                use_local_data,
+            )
+            loaded = self._load(key)
+
+        values, timestamps, meta = loaded
+        window = slice(offset, offset + length)
+
+        index = pd.date_range(
+            start=pd.Timestamp(meta["start"]).tz_convert("CET"),
+            periods=meta["length"],
+            freq=freq,
+        )[window]
+
+        df = pd.DataFrame(
+            values[window], index=index, columns=meta["columns"], copy=False
+        )
+        process_timestamp = (
+            pd.DatetimeIndex(np.asarray(timestamps[window]).view("M8[ns]"))
+            .tz_localize("UTC")
+            .tz_convert("CET")
+        )
+        df.insert(0, "process_timestamp", process_timestamp)
+        return df
+
+    def clear(self):
+        """Remove all stored matrices"""
+        self._loaded.clear()
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+_default_store: Optional[FeatureStore] = None
+
+
+def get_feature_store() -> FeatureStore:
+    """Return the process-wide feature store"""
+    global _default_store
+    if _default_store is None:
+        _default_store = FeatureStore()
+    return _default_store
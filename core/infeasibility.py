@@ -0,0 +1,335 @@
+"""
+Infeasibility triage of dispatch windows.
+
+A window without a feasible solution is solved again in elastic mode
+(`SparseBuilder.build(..., elastic_penalty=...)`): every bound that comes from the
+data (demands, capacities, policy fixings, contract bounds) may be violated at a
+high price. The slacks of that solution tell which components and timesteps could
+not be served, e.g. heat demand above the boiler and CHP capacities, or CHP
+minimum load above electricity demand without an injection route.
+
+If the elastic solve needs no slack at all, the hard window was not infeasible
+after all (typically a presolve or tolerance artefact): it is solved again with
+presolve off and no diagnosis is recorded if that succeeds.
+
+Optionally an irreducible infeasible subsystem (IIS) of the original window is
+extracted (for a MILP the IIS of its LP relaxation): a minimal set of rows and
+column bounds that is infeasible on its own, labelled with component and timestep.
+HiGHS (`Highs.getIis`, highspy >= 1.8) proposes an infeasible subsystem, which
+`reduce_iis` shrinks with a deletion filter until every member is needed.
+
+Example:
+    >>> problem, solution, diagnosis = elastic_solve(builder, window, state)
+    >>> print(diagnosis.summary())
+    >>> diagnosis.slacks.groupby(["component", "variable"])["amount"].sum()
+"""
+
+import warnings
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.sparse_builder import (
+    INF,
+    SolveResult,
+    SparseBuilder,
+    SparseProblem,
+    solve,
+    to_highs,
+)
+
+# Price of one unit of slack in elastic mode
+ELASTIC_PENALTY = 1e6
+
+# Slack amounts below this are ignored in the report
+SLACK_TOLERANCE = 1e-6
+
+SLACK_KINDS = ("shortfall", "excess")
+
+# Statuses of an infeasible subsystem in `reduce_iis` (zero objective: never unbounded)
+INFEASIBLE_STATUSES = ("Infeasible", "Primal infeasible or unbounded")
+
+# HiGHS `iis_strategy`: IIS from the dual ray of the infeasible LP, row priority.
+# The light default (0) only finds rows that are infeasible by their own bounds.
+IIS_STRATEGY = 2
+
+
+@dataclass
+class WindowDiagnosis:
+    """
+    Diagnosis of an infeasible window.
+
+    Attributes:
+        start (Any): First timestamp of the window
+        status (str): Solver status of the original (hard) solve
+        slacks (pd.DataFrame): Slack needed by the elastic solve, one row per
+            timestep, component and variable: "time", "component", "variable",
+            "kind" ("shortfall": below its lower bound, "excess": above its upper
+            bound) and "amount"
+        iis (pd.DataFrame, optional): IIS of the original window: "kind" ("row" or
+            "column"), "component", "variable" (column name, empty for rows),
+            "time". None if not requested or not available.
+    """
+
+    start: Any
+    status: str
+    slacks: pd.DataFrame
+    iis: Optional[pd.DataFrame] = None
+
+    def summary(self) -> str:
+        if self.slacks.empty:
+            text = f"Window {self.start}: {self.status}, no slack needed"
+        else:
+            totals = self.slacks.groupby(["component", "variable", "kind"])
+            parts = [
+                f"{component}.{variable} {kind} {group['amount'].sum():.3g} "
+                f"in {len(group)} steps (first {group['time'].iloc[0]})"
+                for (component, variable, kind), group in totals
+            ]
+            text = f"Window {self.start}: {self.status}; " + "; ".join(parts)
+        if self.iis is not None:
+            text += f"; IIS of {len(self.iis)} rows/bounds"
+        return text
+
+
+def slack_report(
+    problem: SparseProblem, x: np.ndarray, index: pd.Index
+) -> pd.DataFrame:
+    """
+    Non-zero slacks of a solved elastic problem.
+
+    Args:
+        problem (SparseProblem): Elastic problem
+        x (np.ndarray): Its solution
+        index (pd.Index): Timestamps of the window
+
+    Returns:
+        pd.DataFrame: One row per timestep, component and variable with slack
+    """
+    frames = []
+    for (component, name), columns in problem.columns.items():
+        variable, _, kind = name.rpartition("_")
+        if kind not in SLACK_KINDS:
+            continue
+        amount = x[columns]
+        needed = np.flatnonzero(amount > SLACK_TOLERANCE)
+        if len(needed):
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "time": index[needed],
+                        "component": component,
+                        "variable": variable,
+                        "kind": kind,
+                        "amount": amount[needed],
+                    }
+                )
+            )
+    if not frames:
+        return pd.DataFrame(columns=["time", "component", "variable", "kind", "amount"])
+    return pd.concat(frames, ignore_index=True).sort_values("time", kind="stable")
+
+
+def slack_columns(problem: SparseProblem) -> np.ndarray:
+    """Columns of the elastic slacks of a problem (empty unless built elastic)"""
+    columns = [
+        columns
+        for (_, name), columns in problem.columns.items()
+        if name.rpartition("_")[2] in SLACK_KINDS
+    ]
+    return np.concatenate(columns) if columns else np.array([], dtype=int)
+
+
+def _infeasible(h) -> bool:
+    h.run()
+    return h.modelStatusToString(h.getModelStatus()) in INFEASIBLE_STATUSES
+
+
+def reduce_iis(
+    problem: SparseProblem,
+    rows: np.ndarray,
+    columns: np.ndarray,
+    options: Optional[Dict[str, Any]] = None,
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Reduce an infeasible subsystem of an LP to an irreducible one.
+
+    Deletion filter: all rows and column bounds outside the subsystem are dropped,
+    then members are dropped as long as the rest stays infeasible. Members are
+    tried in groups, halving a group whose removal makes the rest feasible, so a
+    large subsystem with a small core takes few LP solves.
+
+    Args:
+        problem (SparseProblem): LP the subsystem belongs to
+        rows (np.ndarray): Rows of the subsystem
+        columns (np.ndarray): Columns whose bounds are in the subsystem
+        options (Dict[str, Any], optional): HiGHS options. Defaults to None.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Rows and columns of the IIS, or None if the
+            given subsystem is not infeasible on its own
+    """
+    in_rows = np.zeros(problem.A.shape[0], dtype=bool)
+    in_rows[rows] = True
+    in_columns = np.zeros(problem.A.shape[1], dtype=bool)
+    in_columns[columns] = True
+    subsystem = replace(
+        problem,
+        c=np.zeros_like(problem.c),
+        integrality=np.zeros_like(problem.integrality),
+        row_lower=np.where(in_rows, problem.row_lower, -INF),
+        row_upper=np.where(in_rows, problem.row_upper, INF),
+        col_lower=np.where(in_columns, problem.col_lower, -INF),
+        col_upper=np.where(in_columns, problem.col_upper, INF),
+    )
+    h = to_highs(subsystem, {**(options or {}), "presolve": "off"})
+    if not _infeasible(h):
+        return None
+
+    def relax(group, drop: bool):
+        for kind, k in group:
+            if kind == "row":
+                lower, upper = subsystem.row_lower[k], subsystem.row_upper[k]
+                h.changeRowBounds(k, -INF if drop else lower, INF if drop else upper)
+            else:
+                lower, upper = subsystem.col_lower[k], subsystem.col_upper[k]
+                h.changeColBounds(k, -INF if drop else lower, INF if drop else upper)
+
+    members = [("row", int(k)) for k in rows] + [("column", int(k)) for k in columns]
+    kept: List[Tuple[str, int]] = []
+    pending = [members]
+    while pending:
+        group = pending.pop()
+        relax(group, drop=True)
+        if _infeasible(h):
+            continue  # not needed: stays dropped
+        relax(group, drop=False)
+        if len(group) == 1:
+            kept.append(group[0])
+        else:
+            pending += [group[len(group) // 2 :], group[: len(group) // 2]]
+    return (
+        np.array(sorted(k for kind, k in kept if kind == "row"), dtype=int),
+        np.array(sorted(k for kind, k in kept if kind == "column"), dtype=int),
+    )
+
+
+def extract_iis(
+    problem: SparseProblem,
+    index: pd.Index,
+    options: Optional[Dict[str, Any]] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    IIS of an infeasible problem (of its LP relaxation for a MILP), labelled with
+    components and timesteps.
+
+    Args:
+        problem (SparseProblem): Infeasible problem
+        index (pd.Index): Timestamps of the window
+        options (Dict[str, Any], optional): HiGHS options. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Rows and column bounds of the IIS, or None if highspy is
+            missing (warned), too old (warned) or finds no infeasible subsystem
+    """
+    relaxation = replace(problem, integrality=np.zeros_like(problem.integrality))
+    try:
+        h = to_highs(relaxation, options)
+    except ImportError:
+        warnings.warn("No IIS extracted: highspy is not installed")
+        return None
+    if not hasattr(h, "getIis"):
+        warnings.warn("No IIS extracted: Highs.getIis needs highspy >= 1.8")
+        return None
+    h.setOptionValue("iis_strategy", IIS_STRATEGY)
+    h.run()
+    _, iis = h.getIis()
+    if not iis.valid_:
+        return None
+    reduced = reduce_iis(
+        relaxation,
+        np.asarray(iis.row_index_, dtype=int),
+        np.asarray(iis.col_index_, dtype=int),
+        options,
+    )
+    if reduced is None:
+        return None
+    iis_rows, iis_columns = reduced
+
+    names = {}
+    for (component, variable), columns in problem.columns.items():
+        for t, column in enumerate(columns):
+            names.setdefault(int(column), (component, variable, t))
+    rows = []
+    for row in iis_rows:
+        period = int(problem.row_period[row]) if problem.row_period is not None else 0
+        component = (
+            problem.row_component[row] if problem.row_component is not None else ""
+        )
+        rows.append(("row", component, "", index[min(period, len(index) - 1)]))
+    for column in iis_columns:
+        component, variable, t = names.get(int(column), ("", "", 0))
+        rows.append(("column", component, variable, index[min(t, len(index) - 1)]))
+    return pd.DataFrame(rows, columns=["kind", "component", "variable", "time"])
+
+
+def elastic_solve(
+    builder: SparseBuilder,
+    window: slice,
+    initial_state: Optional[Dict[Tuple[str, str], float]] = None,
+    solver_options: Optional[Dict[str, Any]] = None,
+    penalty: float = ELASTIC_PENALTY,
+    iis: bool = False,
+    status: str = "Infeasible",
+) -> Tuple[SparseProblem, SolveResult, Optional[WindowDiagnosis]]:
+    """
+    Solve a window in elastic mode and diagnose why the hard window failed.
+
+    Args:
+        builder (SparseBuilder): Builder of the plant
+        window (slice): Periods of the window
+        initial_state (Dict[Tuple[str, str], float], optional): State before the
+            window. Defaults to None.
+        solver_options (Dict[str, Any], optional): HiGHS options. Defaults to None.
+        penalty (float, optional): Price per unit of slack. Defaults to
+            ELASTIC_PENALTY.
+        iis (bool, optional): Also extract an IIS of the hard window. Defaults to
+            False.
+        status (str, optional): Status of the failed hard solve, for the report.
+            Defaults to "Infeasible".
+
+    Returns:
+        Tuple[SparseProblem, SolveResult, WindowDiagnosis]: Elastic problem, its
+            solution and the diagnosis; or the hard problem, its solution and None
+            if it solves without presolve after all
+
+    Raises:
+        RuntimeError: If even the elastic window has no solution
+    """
+    index = builder.data.index[window]
+    problem = builder.build(window, initial_state, elastic_penalty=penalty)
+    solution = solve(problem, solver_options)
+    if solution.x is None:
+        raise RuntimeError(
+            f"No elastic solution for periods {window.start}-{window.stop}: "
+            f"{solution.status}"
+        )
+    slacks = slack_report(problem, solution.x, index)
+
+    hard = builder.build(window, initial_state)
+    if slacks.empty:
+        # Feasible without slack: retry the hard window without presolve
+        retry = solve(hard, {**(solver_options or {}), "presolve": "off"})
+        if retry.x is not None:
+            return hard, replace(retry, presolve_retry=True), None
+        status = f"{status}; without presolve: {retry.status}"
+
+    diagnosis = WindowDiagnosis(
+        start=index[0],
+        status=status,
+        slacks=slacks,
+        iis=extract_iis(hard, index, solver_options) if iis else None,
+    )
+    return problem, solution, diagnosis
@@ -0,0 +1,323 @@
+"""
+Market data layer for energy system modeling.
+
+Price series (EPEX spot, TTF gas, EUA CO2) are requested through a provider and
+memoized by a cache keyed by the provider's identity and (series, starttime, endtime).
+The cache keeps recent entries in memory and on disk, both with least-recently-used
+eviction, so scenarios that share a price window only hit the market data source once.
+
+Recorded files are identified by their path, mtime and size, so a changed recording
+is read again. Live data has no such fingerprint and expires after the provider's
+`max_age` instead.
+
+Providers:
+    - EntrasProvider: live data from the `entras_data` package (imported lazily)
+    - RecordedFileProvider: offline replay of series recorded to CSV files
+
+Example:
+    >>> configure_market_data(provider=RecordedFileProvider("data/market_data"))
+    >>> spot = get_market_data_cache().get("da_price", "2024-01-01", "2024-02-01")
+"""
+
+import glob
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Series served by the market data layer
+MARKET_SERIES = ("da_price", "gas_price", "co2_price")
+
+MARKET_DATA_CACHE_DIR = "data/cache/market_data"
+# Bumped when the on-disk entry format changes, so older files are never read
+MARKET_DATA_CACHE_VERSION = 2
+
+# Age after which live market data is fetched again (late publications, corrections)
+LIVE_MARKET_DATA_MAX_AGE = pd.Timedelta(days=1)
+
+
+class MarketDataProvider(ABC):
+    """Source of market price series"""
+
+    # Age after which cached series are fetched again, None to keep them until evicted
+    max_age: Optional[pd.Timedelta] = None
+
+    @abstractmethod
+    def fetch(self, series: str, starttime: str, endtime: str) -> pd.DataFrame:
+        """
+        Fetch one price series.
+
+        Args:
+            series (str): One of MARKET_SERIES
+            starttime (str): Start date (format: 'YYYY-MM-DD')
+            endtime (str): End date (format: 'YYYY-MM-DD')
+
+        Returns:
+            pd.DataFrame: DataFrame with a `timestamp` column and a column named `series`
+        """
+
+    def source_files(self) -> List[str]:
+        """Local files the series are read from (none for live providers)"""
+        return []
+
+    def cache_identity(self, series: str) -> str:
+        """Identity of the source a series is fetched from, part of the cache key"""
+        return type(self).__name__
+
+
+class EntrasProvider(MarketDataProvider):
+    """Live market data from the entras_data package"""
+
+    max_age = LIVE_MARKET_DATA_MAX_AGE
+
+    def fetch(self, series: str, starttime: str, endtime: str) -> pd.DataFrame:
+        # Imported here so that importing the data layer never requires entras_data
+        if series == "da_price":
+            from entras_data.spot_price import get_spot_price
+
+            return get_spot_price(
+                starttime=starttime,
+                endtime=endtime,
+                select={"timestamp": "timestamp", "da_price": "price"},
+            )
+
+        from entras_data.market_data import get_market_data
+
+        if series == "gas_price":
+            return get_market_data(
+                "ttf_da_eod",
+                starttime=starttime,
+                endtime=endtime,
+                select={"timestamp": "timestamp", "gas_price": "price"},
+            )
+        if series == "co2_price":
+            return get_market_data(
+                "eua_spot_realto",
+                starttime=starttime,
+                endtime=endtime,
+                select={"timestamp": "datetime", "co2_price": "price"},
+            )
+        raise ValueError(f"Unknown market series: {series}")
+
+
+class RecordedFileProvider(MarketDataProvider):
+    """
+    Offline market data replayed from recorded CSV files.
+
+    Each series is stored as `<directory>/<series>.csv` with a `timestamp` column and
+    a value column named after the series. Files can be created with `record_market_data`.
+    """
+
+    def __init__(self, directory: str = "data/market_data"):
+        self.directory = directory
+        self._frames: Dict[str, Tuple[str, pd.DataFrame]] = {}
+
+    def _path(self, series: str) -> str:
+        return os.path.join(self.directory, f"{series}.csv")
+
+    def _load(self, series: str) -> pd.DataFrame:
+        path = self._path(series)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No recorded market data for {series}: {path}")
+        identity = self.cache_identity(series)
+        if self._frames.get(series, (None,))[0] != identity:
+            df = pd.read_csv(path)
+            df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+            df = df.sort_values("timestamp").reset_index(drop=True)
+            self._frames[series] = (identity, df)
+        return self._frames[series][1]
+
+    def source_files(self) -> List[str]:
+        paths = [self._path(s) for s in MARKET_SERIES]
+        return [path for path in paths if os.path.exists(path)]
+
+    def cache_identity(self, series: str) -> str:
+        # Directory and file state, so other recordings or a re-recording never hit
+        path = os.path.abspath(self._path(series))
+        if not os.path.exists(path):
+            return f"{type(self).__name__}|{path}"
+        stat = os.stat(path)
+        return f"{type(self).__name__}|{path}|{stat.st_mtime_ns}|{stat.st_size}"
+
+    def fetch(self, series: str, starttime: str, endtime: str) -> pd.DataFrame:
+        df = self._load(series)
+        start = pd.Timestamp(starttime).tz_localize("CET")
+        end = pd.Timestamp(endtime).tz_localize("CET")
+        mask = (df["timestamp"] >= start) & (df["timestamp"] < end)
+        return df.loc[mask].reset_index(drop=True)
+
+
+def record_market_data(
+    provider: MarketDataProvider,
+    starttime: str,
+    endtime: str,
+    directory: str = "data/market_data",
+):
+    """
+    Record all market series from a provider to CSV files for offline replay.
+
+    Existing recordings are merged with the new data.
+
+    Args:
+        provider (MarketDataProvider): Provider to record from (e.g. EntrasProvider())
+        starttime (str): Start date (format: 'YYYY-MM-DD')
+        endtime (str): End date (format: 'YYYY-MM-DD')
+        directory (str, optional): Output directory. Defaults to "data/market_data".
+    """
+    os.makedirs(directory, exist_ok=True)
+    for series in MARKET_SERIES:
+        df = provider.fetch(series, starttime, endtime)[["timestamp", series]].copy()
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+
+        path = os.path.join(directory, f"{series}.csv")
+        if os.path.exists(path):
+            existing = pd.read_csv(path)
+            existing["timestamp"] = pd.to_datetime(existing["timestamp"], utc=True)
+            df = pd.concat([existing, df])
+
+        df = df.drop_duplicates(subset=["timestamp"], keep="last")
+        df.sort_values("timestamp").to_csv(path, index=False)
+        print(f"Recorded {series} to {path}")
+
+
+class MarketDataCache:
+    """
+    Memoizing cache in front of a market data provider.
+
+    Entries are keyed by the provider's `cache_identity` and (series, starttime,
+    endtime), and expire after the provider's `max_age`. The in-memory layer holds at
+    most `max_entries` frames and the on-disk layer at most `max_disk_entries` files;
+    both evict the least recently used entry first.
+    """
+
+    def __init__(
+        self,
+        provider: MarketDataProvider = None,
+        cache_dir: Optional[str] = MARKET_DATA_CACHE_DIR,
+        max_entries: int = 32,
+        max_disk_entries: int = 256,
+    ):
+        self.provider = provider if provider is not None else EntrasProvider()
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        # key -> (time fetched, frame)
+        self._memory: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key: tuple) -> str:
+        # Keys include the provider identity so different sources never mix
+        raw = "|".join(map(str, (MARKET_DATA_CACHE_VERSION, *key)))
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key[1]}_{digest}.pkl")
+
+    def _expired(self, fetched_at: pd.Timestamp) -> bool:
+        max_age = self.provider.max_age
+        return max_age is not None and pd.Timestamp.now(tz="UTC") - fetched_at > max_age
+
+    def _remember(self, key: tuple, fetched_at: pd.Timestamp, df: pd.DataFrame):
+        self._memory[key] = (fetched_at, df)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        files = glob.glob(os.path.join(self.cache_dir, "*.pkl"))
+        if len(files) <= self.max_disk_entries:
+            return
+        # Reads refresh the file mtime, so the oldest mtime is the least recently used entry
+        files.sort(key=os.path.getmtime)
+        for path in files[: len(files) - self.max_disk_entries]:
+            os.remove(path)
+
+    def get(self, series: str, starttime: str, endtime: str) -> pd.DataFrame:
+        """
+        Return a price series, fetching it from the provider on a cache miss.
+
+        Args:
+            series (str): One of MARKET_SERIES
+            starttime (str): Start date (format: 'YYYY-MM-DD')
+            endtime (str): End date (format: 'YYYY-MM-DD')
+
+        Returns:
+            pd.DataFrame: Copy of the cached provider frame
+        """
+        key = (
+            self.provider.cache_identity(series),
+            series,
+            str(starttime),
+            str(endtime),
+        )
+
+        if key in self._memory and not self._expired(self._memory[key][0]):
+            self.hits += 1
+            self._memory.move_to_end(key)
+            return self._memory[key][1].copy()
+
+        path = self._disk_path(key) if self.cache_dir else None
+        entry = None
+        if path is not None and os.path.exists(path):
+            entry = pd.read_pickle(path)
+            if self._expired(entry["fetched_at"]):
+                entry = None
+        if entry is not None:
+            self.disk_hits += 1
+            fetched_at, df = entry["fetched_at"], entry["frame"]
+            os.utime(path)
+        else:
+            self.misses += 1
+            fetched_at = pd.Timestamp.now(tz="UTC")
+            df = self.provider.fetch(series, starttime, endtime)
+            if path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                pd.to_pickle({"fetched_at": fetched_at, "frame": df}, path)
+                self._evict_disk()
+
+        self._remember(key, fetched_at, df)
+        return df.copy()
+
+    def clear(self, disk: bool = False):
+        """Drop the in-memory entries, and the on-disk entries if `disk` is True"""
+        self._memory.clear()
+        if disk and self.cache_dir:
+            for path in glob.glob(os.path.join(self.cache_dir, "*.pkl")):
+                os.remove(path)
+
+
+_default_cache: Optional[MarketDataCache] = None
+
+
+def configure_market_data(
+    provider: MarketDataProvider = None,
+    cache_dir: Optional[str] = MARKET_DATA_CACHE_DIR,
+    max_entries: int = 32,
+    max_disk_entries: int = 256,
+) -> MarketDataCache:
+    """
+    Replace the process-wide market data cache.
+
+    Args:
+        provider (MarketDataProvider, optional): Data provider. Defaults to EntrasProvider.
+        cache_dir (str, optional): On-disk cache directory, None to disable the disk layer.
+            Defaults to MARKET_DATA_CACHE_DIR.
+        max_entries (int, optional): Maximum in-memory entries. Defaults to 32.
+        max_disk_entries (int, optional): Maximum on-disk entries. Defaults to 256.
+
+    Returns:
+        MarketDataCache: The new default cache
+    """
+    global _default_cache
+    _default_cache = MarketDataCache(provider, cache_dir, max_entries, max_disk_entries)
+    return _default_cache
+
+
+def get_market_data_cache() -> MarketDataCache:
+    """Return the process-wide market data cache, creating it on first use"""
+    if _default_cache is None:
+        configure_market_data()
+    return _default_cache
@@ -0,0 +1,309 @@
+"""
+Merit-order heuristic dispatch of the CHP / gas boiler / e-boiler / grid plant.
+
+For every period independently (vectorized over the window), the CHP is evaluated
+off, at minimum load and at maximum load. For each option the remaining heat
+demand is covered by the cheapest sources first: gas boiler, aux firing, e-boiler
+on surplus CHP electricity (valued at the injection price) and e-boiler on grid
+electricity (offtake price). The option with the lowest cost of gas, CO2 and
+electricity is kept. CHP policies (fixed or bounded is_on / electricity_output)
+restrict the options; start-up costs and the grid capacity tariff are only
+accounted for afterwards, not in the choice.
+
+The result is a feasible dispatch in the sparse builder's variables. It is used
+standalone for screening (`BuilderType.MERIT_ORDER`) and as MIP start of the
+sparse MILP (`heuristic_start`).
+
+Expects the components of `core/topologies/model_bis.json`; boilers removed by the
+presolve are treated as absent.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from core.sparse_builder import (
+    SparseBuilder,
+    SparseProblem,
+    calendar_months,
+    window_values,
+)
+
+# Components the heuristic needs
+REQUIRED_COMPONENTS = (
+    "chp",
+    "heat_demand",
+    "electricity_demand",
+    "Gas offtake",
+    "Electricity offtake",
+    "Electricity injection",
+)
+
+TOLERANCE = 1e-6
+
+
+class MeritOrderError(ValueError):
+    """Raised when the plant is not supported or no option covers the demand"""
+
+
+def _values(builder, window, T, component, key, default=None, kind="params"):
+    """Window values of a component attribute, `default` if absent"""
+    data = builder.component_data.get(component)
+    source = getattr(data, kind, {}) if data is not None else {}
+    if key not in source:
+        return None if default is None else np.full(T, float(default))
+    return window_values(source[key], window, T)
+
+
+def merit_order_values(
+    builder: SparseBuilder,
+    window: slice,
+    initial_state: Optional[Dict[Tuple[str, str], float]] = None,
+) -> Dict[Tuple[str, str], np.ndarray]:
+    """
+    Merit-order dispatch of one window.
+
+    Args:
+        builder (SparseBuilder): Builder of the presolved plant
+        window (slice): Periods of the window
+        initial_state (Dict[Tuple[str, str], float], optional): State before the
+            window, as for `SparseBuilder.build`. Defaults to a CHP that is off.
+
+    Returns:
+        Dict[Tuple[str, str], np.ndarray]: Values per (component, variable)
+
+    Raises:
+        MeritOrderError: If the plant lacks a required component or a period
+            cannot be covered
+    """
+    missing = [c for c in REQUIRED_COMPONENTS if c not in builder.component_data]
+    if missing:
+        raise MeritOrderError(f"Merit order needs components {', '.join(missing)}")
+    initial_state = initial_state or {}
+    T = len(range(*window.indices(len(builder.data))))
+
+    def get(component, key, default=None, kind="params"):
+        return _values(builder, window, T, component, key, default, kind)
+
+    heat = get("heat_demand", "demand", 0.0)
+    electricity = get("electricity_demand", "demand", 0.0)
+    price_buy = get("Electricity offtake", "prices", 0.0)
+    price_injection = get("Electricity injection", "prices", 0.0)
+    co2_factor = get("CO2_emission", "conversion_factor", 0.0)
+    price_gas = get("Gas offtake", "prices", 0.0) + co2_factor * get(
+        "CO2 allowance", "prices", 0.0
+    )
+
+    def boiler(name):
+        """Efficiency and heat capacity of a boiler (capacity 0 if absent)"""
+        if name not in builder.component_data:
+            return np.ones(T), np.zeros(T)
+        capacity = get(name, "output", np.inf, kind="ubound")
+        return get(name, "conversion_factor", 1.0), capacity
+
+    eta_gas_boiler, cap_gas_boiler = boiler("gas_boiler")
+    eta_e_boiler, cap_e_boiler = boiler("e_boiler")
+
+    p_min = get("chp", "min_electricity_output", 0.0)
+    p_max = np.maximum(get("chp", "max_electricity_output", 0.0), p_min)
+    eff_min = get("chp", "min_electrical_efficiency")
+    if eff_min is None:
+        eff_min = get("chp", "electricity_efficiency", 1.0)
+    eff_max = get("chp", "max_electrical_efficiency")
+    eff_max = eff_min if eff_max is None else eff_max
+    thermal_eff = get("chp", "thermal_efficiency", 0.0)
+    aux_eff = get("chp", "aux_firing_efficiency", 0.0)
+    aux_gas_max = get("chp", "gas_to_aux_firing", np.inf, kind="ubound")
+
+    # CHP options: off, minimum load, maximum load, or what the policy fixes
+    fixed_on = get("chp", "is_on", kind="values")
+    fixed_output = get("chp", "electricity_output", kind="values")
+    options = np.stack([np.zeros(T), p_min, p_max])
+    allowed = np.ones_like(options, dtype=bool)
+    if fixed_on is not None:
+        allowed[0] &= fixed_on < 0.5
+        allowed[1:] &= fixed_on[None, :] >= 0.5
+    if fixed_output is not None:
+        options = np.stack([fixed_output] * 3)
+        allowed[0] &= fixed_output <= TOLERANCE
+        allowed[1:] &= fixed_output[None, :] > TOLERANCE
+    min_on = get("chp", "is_on", kind="lbound")
+    if min_on is not None:
+        allowed[0] &= min_on < 0.5
+    min_output = get("chp", "electricity_output", kind="lbound")
+    if min_output is not None:
+        allowed &= options >= min_output[None, :] - TOLERANCE
+
+    rows = np.arange(T)
+    best_cost = np.full(T, np.inf)
+    best = None
+    for k, output in enumerate(options):
+        on = (output > TOLERANCE).astype(float)
+        increment = np.maximum(output - p_min * on, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gas_turbine = np.where(eff_min > 0, p_min / eff_min, 0.0) * on + np.where(
+                eff_max > 0, increment / eff_max, 0.0
+            )
+        thermal = thermal_eff * gas_turbine
+        residual = heat - thermal
+        surplus = np.maximum(output - electricity, 0.0)
+
+        # Heat sources: gas boiler, aux firing, e-boiler on surplus, e-boiler on grid
+        with np.errstate(divide="ignore", invalid="ignore"):
+            costs = np.stack(
+                [
+                    np.where(eta_gas_boiler > 0, price_gas / eta_gas_boiler, np.inf),
+                    np.where(aux_eff > 0, price_gas / aux_eff, np.inf),
+                    np.where(eta_e_boiler > 0, -price_injection / eta_e_boiler, np.inf),
+                    np.where(eta_e_boiler > 0, price_buy / eta_e_boiler, np.inf),
+                ],
+                axis=1,
+            )
+        surplus_heat = np.minimum(cap_e_boiler, surplus * eta_e_boiler)
+        caps = np.stack(
+            [
+                cap_gas_boiler,
+                aux_eff * aux_gas_max,
+                surplus_heat,
+                np.maximum(cap_e_boiler - surplus_heat, 0.0),
+            ],
+            axis=1,
+        )
+        caps = np.where(np.isfinite(costs), np.nan_to_num(caps, posinf=1e12), 0.0)
+        allocation = np.zeros_like(caps)
+        remaining = np.maximum(residual, 0.0)
+        for source in np.argsort(costs, axis=1).T:
+            amount = np.minimum(remaining, caps[rows, source])
+            allocation[rows, source] += amount
+            remaining = remaining - amount
+
+        feasible = allowed[k] & (residual >= -TOLERANCE) & (remaining <= TOLERANCE)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            boiler_gas = np.where(
+                eta_gas_boiler > 0, allocation[:, 0] / eta_gas_boiler, 0.0
+            )
+            aux_gas = np.where(aux_eff > 0, allocation[:, 1] / aux_eff, 0.0)
+            e_boiler_electricity = np.where(
+                eta_e_boiler > 0, allocation[:, 2:].sum(axis=1) / eta_e_boiler, 0.0
+            )
+        net = electricity + e_boiler_electricity - output
+        offtake, injection = np.maximum(net, 0.0), np.maximum(-net, 0.0)
+        gas = gas_turbine + aux_gas + boiler_gas
+        cost = price_gas * gas + price_buy * offtake + price_injection * injection
+        cost = np.where(feasible, cost, np.inf)
+
+        option = {
+            ("chp", "electricity_output"): output,
+            ("chp", "electricity_increment"): increment,
+            ("chp", "is_on"): on,
+            ("chp", "gas_to_turbine"): gas_turbine,
+            ("chp", "gas_to_aux_firing"): aux_gas,
+            ("chp", "gas_in"): gas_turbine + aux_gas,
+            ("chp", "thermal_output"): thermal + aux_eff * aux_gas,
+            ("gas_boiler", "input"): boiler_gas,
+            ("gas_boiler", "output"): allocation[:, 0],
+            ("e_boiler", "input"): e_boiler_electricity,
+            ("e_boiler", "output"): allocation[:, 2:].sum(axis=1),
+            ("Gas offtake", "quantities"): gas,
+            ("CO2_emission", "output"): co2_factor * gas,
+            ("Electricity offtake", "quantities"): offtake,
+            ("Electricity injection", "quantities"): injection,
+            ("heat_demand", "supply"): heat,
+            ("electricity_demand", "supply"): electricity,
+        }
+        if best is None:
+            best = option
+        else:
+            better = cost < best_cost
+            best = {key: np.where(better, option[key], best[key]) for key in best}
+        best_cost = np.minimum(best_cost, cost)
+
+    uncovered = np.flatnonzero(~np.isfinite(best_cost))
+    if len(uncovered):
+        raise MeritOrderError(
+            f"No merit-order option covers the demand in {len(uncovered)} periods "
+            f"(first: {builder.data.index[window][uncovered[0]]})"
+        )
+
+    on = best[("chp", "is_on")]
+    previous = np.r_[initial_state.get(("chp", "is_on"), 0.0), on[:-1]]
+    best[("chp", "is_off")] = 1.0 - on
+    best[("chp", "is_starting_up")] = np.maximum(on - previous, 0.0)
+    best[("chp", "is_shutting_down")] = np.maximum(previous - on, 0.0)
+    return _complete(builder, best, T)
+
+
+def _complete(builder, values, T):
+    """Extend values over connections, summations and splitters to all variables"""
+    values = {key: v for key, v in values.items() if key[0] in builder.component_data}
+    names = [spec.name for spec in builder.topology.components]
+    changed = True
+    while changed:
+        changed = False
+        for (
+            source_index,
+            source_var,
+            target_index,
+            target_var,
+        ) in builder.topology.connections:
+            a = (names[source_index], source_var)
+            b = (names[target_index], target_var)
+            if (a in values) != (b in values):
+                known, unknown = (a, b) if a in values else (b, a)
+                values[unknown] = values[known]
+                changed = True
+        for spec in builder.topology.components:
+            if spec.type not in ("Summation", "Splitter"):
+                continue
+            total, prefix = (
+                ("output", "input") if spec.type == "Summation" else ("input", "output")
+            )
+            parts = [(spec.name, f"{prefix}{i}") for i in range(spec.args[0])]
+            unknown = [p for p in parts if p not in values]
+            if (spec.name, total) not in values and not unknown:
+                values[(spec.name, total)] = sum(values[p] for p in parts)
+                changed = True
+            elif (spec.name, total) in values and len(unknown) == 1:
+                rest = sum((values[p] for p in parts if p != unknown[0]), np.zeros(T))
+                values[unknown[0]] = np.maximum(values[(spec.name, total)] - rest, 0.0)
+                changed = True
+    return values
+
+
+def merit_order_start(
+    builder: SparseBuilder,
+    problem: SparseProblem,
+    window: slice,
+    initial_state: Optional[Dict[Tuple[str, str], float]] = None,
+) -> np.ndarray:
+    """
+    Merit-order dispatch of a window as solution vector of its sparse problem.
+
+    Variables the heuristic leaves open are 0; peaks are the maxima per calendar
+    month of the window.
+
+    Args:
+        builder (SparseBuilder): Builder of the presolved plant
+        problem (SparseProblem): Problem of the window
+        window (slice): Periods of the window
+        initial_state (Dict[Tuple[str, str], float], optional): State before the
+            window. Defaults to None.
+
+    Returns:
+        np.ndarray: Solution vector, usable as MIP start
+    """
+    values = merit_order_values(builder, window, initial_state)
+    x = np.zeros(problem.A.shape[1])
+    for node, columns in problem.columns.items():
+        if node in values:
+            x[columns] = values[node]
+    for spec in builder.topology.components:
+        if spec.type == "PeakMarket" and (spec.name, "quantities") in values:
+            base = _values(
+                builder, window, problem.n_periods, spec.name, "base quantities", 0.0
+            )
+            month = calendar_months(builder.data.index[window])
+            peak = np.zeros(month[-1] + 1)
+            np.maximum.at(peak, month, values[(spec.name, "quantities")] - base)
+            x[problem.columns[(spec.name, "peak")]] = peak
+    return x
@@ -1,218 +1,169 @@
 import pandas as pd
-import model_to_flex.component_library as components
 from model_to_flex.core.Model import model
-from model_to_flex.core.enums import VariableType
 from typing import Dict, Any
 
-# gas turbine in min load is always running
-chp = components.CHP("chp")
-gas_boiler = components.Conversion("gas_boiler", conversion_factor=1.0)
-e_boiler = components.Conversion("e_boiler", conversion_factor=1.0)
-# hrsg = components.Conversion("hrsg", conversion_factor=1.0)
+from core.binding import Binding, bind_data, bind_parameters
+from core.model_factory import get_model_factory
+from core.topology import build_model_from_topology, load_topology
 
-electricity_offtake = components.Market(
-    "Electricity offtake", quantities_lbounds=0, quantities_ubounds=10000
-)
-electricity_offtake.vars["quantities"].type = VariableType.VARIABLE
-electricity_injection = components.Market("Electricity injection", quantities_lbounds=0)
-electricity_injection.vars["quantities"].type = VariableType.VARIABLE
+TOPOLOGY_FILE = "model_bis.json"
 
-gas_offtake = components.Market("Gas offtake", quantities_lbounds=0)
-gas_offtake.vars["quantities"].type = VariableType.VARIABLE
 
-start_up_cost = components.Market("start_up_cost")
+def build_model() -> model.Model:
+    """Build the topology from `core/topologies/model_bis.json` and bind the data/parameter methods"""
+    m = build_model_from_topology(load_topology(TOPOLOGY_FILE))
 
-CO2_allowance = components.Market("CO2 allowance", quantities_lbounds=0)
-CO2_allowance.vars["quantities"].type = VariableType.VARIABLE
-
-CO2_emission = components.Conversion("CO2_emission", conversion_factor=0.1824)
-
-heat_demand = components.Demand("heat_demand")
-electricity_demand = components.Demand("electricity_demand")
-
-heat_supply = components.Summation("heat_supply", 3)
-electricity_consumption = components.Summation("electricity_consumption", 2)
-gas_consumption = components.Splitter("gas_consumption", 2)
-electricity_supply = components.Splitter("electricity_supply", 3)
-
-penalty_for_gas_to_turbine = components.Market("penalty_for_gas_to_turbine")
-penalty_turbine_no_shutdown = components.Market("penalty_turbine_no_shutdown")
-
-captar = components.PeakMarket("captar")
-captar.set_values("base quantities", 0)
-
-# Adding the components to the model
-m = model.Model()
-m.add(gas_boiler)
-m.add(chp)
-m.add(e_boiler)
-m.add(electricity_offtake)
-m.add(electricity_injection)
-m.add(gas_offtake)
-m.add(heat_demand)
-m.add(electricity_demand)
-m.add(heat_supply)
-m.add(electricity_consumption)
-m.add(gas_consumption)
-m.add(electricity_supply)
-m.add(CO2_allowance)
-m.add(CO2_emission)
-m.add(start_up_cost)
-
-m.add(penalty_for_gas_to_turbine)
-m.add(penalty_turbine_no_shutdown)
-m.add(captar)
-
-
-# Defining the relations between the components
-m.connect(gas_offtake.vars["quantities"], CO2_emission.vars["input"])
-m.connect(CO2_emission.vars["output"], CO2_allowance.vars["quantities"])
-
-m.connect(gas_offtake.vars["quantities"], gas_consumption.vars["input"])
-m.connect(gas_consumption.vars["output0"], gas_boiler.vars["input"])
-m.connect(gas_consumption.vars["output1"], chp.vars["gas_in"])
-
-m.connect(chp.vars["thermal_output"], heat_supply.vars["input0"])
-m.connect(gas_boiler.vars["output"], heat_supply.vars["input1"])
-m.connect(e_boiler.vars["output"], heat_supply.vars["input2"])
-
-m.connect(heat_supply.vars["output"], heat_demand.vars["supply"])
-
-m.connect(chp.vars["electricity_output"], electricity_consumption.vars["input0"])
-m.connect(
-    electricity_offtake.vars["quantities"], electricity_consumption.vars["input1"]
-)
-
-m.connect(electricity_consumption.vars["output"], electricity_supply.vars["input"])
-m.connect(electricity_supply.vars["output0"], electricity_demand.vars["supply"])
-m.connect(electricity_supply.vars["output1"], e_boiler.vars["input"])
-m.connect(electricity_supply.vars["output2"], electricity_injection.vars["quantities"])
-
-m.connect(chp.vars["is_starting_up"], start_up_cost.vars["quantities"])
+    # Bind methods to the model instance
+    m.set_set_data_method(set_data)
+    m.set_set_parameters_method(set_parameters)
+    return m
 
-m.connect(chp.vars["gas_to_turbine"], penalty_for_gas_to_turbine.vars["quantities"])
-m.connect(chp.vars["is_on"], penalty_turbine_no_shutdown.vars["quantities"])
 
-m.connect(electricity_offtake.vars["quantities"], captar.vars["quantities"])
+DATA_BINDINGS = [
+    Binding("electricity_offtake_price", "Electricity offtake", "prices"),
+    Binding("electricity_injection_price", "Electricity injection", "prices"),
+    Binding("gas_price", "Gas offtake", "prices"),
+    Binding("gas_price", "start_up_cost", "prices", scale=0.0001),
+    Binding("co2_price", "CO2 allowance", "prices"),
+    Binding("heat_demand", "heat_demand", "demand"),
+    Binding("electricity_demand", "electricity_demand", "demand"),
+    # chp
+    Binding(
+        "gas_turbine_minload_electricity_capacity",
+        "chp",
+        "min_electricity_output",
+        target="value",
+    ),
+    Binding(
+        (
+            "gas_turbine_minload_electricity_capacity",
+            "gas_turbine_maxload_electricity_capacity",
+        ),
+        "chp",
+        "max_electricity_output",
+        target="value",
+    ),
+    Binding("pc_max_gas", "chp", "gas_to_aux_firing", target="ubound"),
+    # Temperature dependent efficiencies
+    Binding(
+        "gas_turbine_minload_electricity_efficiency",
+        "chp",
+        "min_electrical_efficiency",
+        target="value",
+    ),
+    Binding(
+        "gas_turbine_maxload_electricity_efficiency",
+        "chp",
+        "max_electrical_efficiency",
+        target="value",
+    ),
+]
+
+PARAMETER_BINDINGS = [
+    Binding(
+        "gas_turbine_minload_heat_efficiency",
+        "chp",
+        "thermal_efficiency",
+        target="value",
+    ),
+    Binding("hrsg_efficiency", "chp", "aux_firing_efficiency", target="value"),
+    # gas boiler
+    Binding("gas_boiler_efficiency", "gas_boiler", target="conversion_factor"),
+    Binding("gas_boiler_capacity", "gas_boiler", "output", target="ubound", lbound=0),
+    # e-boiler
+    Binding("e_boiler_efficiency", "e_boiler", target="conversion_factor"),
+    Binding("e_boiler_capacity", "e_boiler", "output", target="ubound", lbound=0),
+    # penalties and grid tariff
+    Binding(
+        "penalty_for_gas_to_turbine",
+        "penalty_for_gas_to_turbine",
+        "prices",
+        target="value",
+    ),
+    Binding(
+        "penalty_turbine_no_shutdown",
+        "penalty_turbine_no_shutdown",
+        "prices",
+        target="value",
+    ),
+    Binding("elec_grid_cost_power_peak", "captar", "prices", target="value"),
+]
+
+# Operating policies of the CHP (Scenario.chp_policy), enforced by fixing variables.
+# must_run and full_load only bind in periods where the CHP's heat fits within the
+# heat demand (see `policy_data`); in the other periods there is no route for the
+# heat and the CHP has to be off.
+POLICY_CONSTANTS = {"policy_off": 0.0, "policy_on": 1.0}
+POLICY_BINDINGS = {
+    # economic dispatch, no restrictions
+    "economic": [],
+    # CHP never used
+    "off": [
+        Binding("policy_off", "chp", "is_on", target="param"),
+        Binding("policy_off", "chp", "is_starting_up", target="param"),
+        Binding("policy_off", "chp", "gas_to_turbine", target="param"),
+    ],
+    # CHP on whenever its minimum-load heat fits; only modulation possible
+    "must_run": [
+        Binding("policy_chp_on", "chp", "is_on", target="lbound"),
+    ],
+    # CHP at nominal capacity whenever its full-load heat fits, else as must_run
+    "full_load": [
+        Binding("policy_chp_on", "chp", "is_on", target="lbound"),
+        Binding(
+            "policy_chp_full_load_output", "chp", "electricity_output", target="lbound"
+        ),
+    ],
+}
+
+# Heat below the demand by less than this still fits
+POLICY_HEAT_TOLERANCE = 1e-6
+
+
+def policy_data(
+    policy: str, params: Dict[str, Any], data: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Add the columns the CHP policies bind to.
+
+    `policy_chp_on` is 1 where the CHP's heat at minimum load fits within the heat
+    demand, `policy_chp_full_load_output` the nominal electricity output where its
+    heat at full load fits (else 0).
+
+    Args:
+        policy (str): Policy of the run
+        params (Dict[str, Any]): Parameters of the run
+        data (pd.DataFrame): Input data of the run
+
+    Returns:
+        pd.DataFrame: The data, with the policy columns if the policy needs them
+    """
+    if policy not in ("must_run", "full_load"):
+        return data
+    p_min = data["gas_turbine_minload_electricity_capacity"]
+    increment = data["gas_turbine_maxload_electricity_capacity"]
+    gas_min_load = p_min / data["gas_turbine_minload_electricity_efficiency"]
+    gas_full_load = gas_min_load + increment / data.get(
+        "gas_turbine_maxload_electricity_efficiency",
+        data["gas_turbine_minload_electricity_efficiency"],
+    )
+    thermal = params["gas_turbine_minload_heat_efficiency"]
+    heat_room = data["heat_demand"] + POLICY_HEAT_TOLERANCE
+    return data.assign(
+        policy_chp_on=(thermal * gas_min_load <= heat_room).astype(float),
+        policy_chp_full_load_output=(p_min + increment)
+        * (thermal * gas_full_load <= heat_room),
+    )
 
 
 def set_data(model: model.Model, df: pd.DataFrame):
-    if "electricity_offtake_price" in df.columns:
-        model.get_component("Electricity offtake").vars["prices"].set_values(
-            df["electricity_offtake_price"].to_list()
-        )
-    if "electricity_injection_price" in df.columns:
-        model.get_component("Electricity injection").vars["prices"].set_values(
-            df["electricity_injection_price"].to_list()
-        )
-    if "gas_price" in df.columns:
-        model.get_component("Gas offtake").vars["prices"].set_values(
-            df["gas_price"].to_list()
-        )
-        model.get_component("start_up_cost").vars["prices"].set_values(
-            (df["gas_price"] * 0.0001).to_list()
-        )
-    if "co2_price" in df.columns:
-        model.get_component("CO2 allowance").vars["prices"].set_values(
-            df["co2_price"].to_list()
-        )
-    if "heat_demand" in df.columns:
-        model.get_component("heat_demand").vars["demand"].set_values(
-            df["heat_demand"].to_list()
-        )
-    if "electricity_demand" in df.columns:
-        model.get_component("electricity_demand").vars["demand"].set_values(
-            df["electricity_demand"].to_list()
-        )
-
-    # chp
-    if "gas_turbine_minload_electricity_capacity" in df.columns:
-        model.get_component("chp").set_values(
-            "min_electricity_output",
-            df["gas_turbine_minload_electricity_capacity"].to_list(),
-        )
-        if "gas_turbine_maxload_electricity_capacity" in df.columns:
-            model.get_component("chp").set_values(
-                "max_electricity_output",
-                (
-                    df["gas_turbine_minload_electricity_capacity"]
-                    + df["gas_turbine_maxload_electricity_capacity"]
-                ).to_list(),
-            )
-
-    if "pc_max_gas" in df.columns:
-        model.get_component("chp").set_bounds(
-            "gas_to_aux_firing", ubound=df["pc_max_gas"].to_list()
-        )
-
-    # Temperature dependent efficiencies
-    if "gas_turbine_minload_electricity_efficiency" in df.columns:
-        model.get_component("chp").set_values(
-            "min_electrical_efficiency",
-            (df["gas_turbine_minload_electricity_efficiency"].to_list()),
-        )
-    if "gas_turbine_maxload_electricity_efficiency" in df.columns:
-        model.get_component("chp").set_values(
-            "max_electrical_efficiency",
-            (df["gas_turbine_maxload_electricity_efficiency"].to_list()),
-        )
+    bind_data(model, df, DATA_BINDINGS)
 
 
 def set_parameters(model: model.Model, params: Dict[str, Any]):
-    if "gas_turbine_minload_heat_efficiency" in params:
-        model.get_component("chp").set_values(
-            "thermal_efficiency", params["gas_turbine_minload_heat_efficiency"]
-        )
+    bind_parameters(model, params, PARAMETER_BINDINGS)
 
-    if "hrsg_efficiency" in params:
-        model.get_component("chp").set_values(
-            "aux_firing_efficiency", params["hrsg_efficiency"]
-        )
 
-    # gas boiler
-    if "gas_boiler_efficiency" in params:
-        model.get_component("gas_boiler").set_conversion_factor(
-            params["gas_boiler_efficiency"]
-        )
-    if "gas_boiler_capacity" in params:
-        model.get_component("gas_boiler").set_bounds(
-            "output",
-            lbound=0,
-            ubound=params["gas_boiler_capacity"],
-        )
-
-    # e-boiler
-    if "e_boiler_efficiency" in params:
-        model.get_component("e_boiler").set_conversion_factor(
-            params["e_boiler_efficiency"]
-        )
-    if "e_boiler_capacity" in params:
-        model.get_component("e_boiler").set_bounds(
-            "output",
-            lbound=0,
-            ubound=params["e_boiler_capacity"],
-        )
-
-    if "penalty_for_gas_to_turbine" in params:
-        model.get_component("penalty_for_gas_to_turbine").set_values(
-            "prices", params["penalty_for_gas_to_turbine"]
-        )
-
-    if "penalty_turbine_no_shutdown" in params:
-        model.get_component("penalty_turbine_no_shutdown").set_values(
-            "prices", params["penalty_turbine_no_shutdown"]
-        )
-
-    if "elec_grid_cost_power_peak" in params:
-        model.get_component("captar").set_values(
-            "prices", params["elec_grid_cost_power_peak"]
-        )
-
-
-# Bind methods to the model instance
-m.set_set_data_method(set_data)
-m.set_set_parameters_method(set_parameters)
-
-
-def get_model():
-    return m
+def get_model() -> model.Model:
+    """Return a fresh, independent model instance"""
+    return get_model_factory(__name__).create()
@@ -0,0 +1,117 @@
+"""
+Model factory for the model_to_flex topologies.
+
+The model modules (`core.model`, `core.model_bis`, `core.model_biogas`) used to build
+a single global model at import time, which `set_data`/`set_parameters` then mutated
+for every scenario. The factory builds the topology (components and connections)
+once per process and hands out independent deep copies of it, so scenarios can run
+concurrently in threads or reuse a worker process without sharing state.
+
+A factory can also hold a reduced topology of the module, e.g. the one a presolved
+plant dispatches (`core.presolve.PresolvedPlant.build`); there is one factory per
+module and topology digest.
+
+Factories pickle by module name (and topology) only. Sending a factory to a process
+pool therefore costs little, and each worker builds its own template on first use.
+
+Example:
+    >>> factory = get_model_factory("core.model_bis")
+    >>> model = factory.create(params={"hrsg_efficiency": 1.0})
+"""
+
+import copy
+import importlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from core.topology import Topology, build_model_from_topology
+
+
+class ModelFactory:
+    """
+    Cached model template with cheap, independent instances.
+
+    Args:
+        module_name (str): Module defining `build_model()` and `set_parameters(model, params)`
+        topology (Topology, optional): Topology to build instead of the module's own,
+            e.g. a presolved one. Defaults to None (`build_model()`).
+    """
+
+    def __init__(self, module_name: str, topology: Optional[Topology] = None):
+        self.module_name = module_name
+        self.topology = topology
+        self._template = None
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Pickle by reference: workers resolve their own (cached) factory
+        return (get_model_factory, (self.module_name, self.topology))
+
+    @property
+    def module(self):
+        return importlib.import_module(self.module_name)
+
+    @property
+    def template(self):
+        """The immutable topology, built on first access. Never dispatch it directly."""
+        if self._template is None:
+            with self._lock:
+                if self._template is None:
+                    self._template = self.build()
+        return self._template
+
+    def build(self):
+        """Build a new model from scratch, bypassing the template"""
+        if self.topology is None:
+            return self.module.build_model()
+        return build_model_from_topology(self.topology)
+
+    def create(self, params: Optional[Dict[str, Any]] = None):
+        """
+        Return a fresh model instance.
+
+        Args:
+            params (Dict[str, Any], optional): Parameters applied to the new instance
+                with the module's `set_parameters`. Defaults to None.
+
+        Returns:
+            model.Model: Deep copy of the template, independent of all other instances
+        """
+        instance = copy.deepcopy(self.template)
+
+        # Re-bind the data/parameter methods so they never refer to the template
+        instance.set_set_data_method(self.module.set_data)
+        instance.set_set_parameters_method(self.module.set_parameters)
+        if params:
+            self.module.set_parameters(instance, params)
+        return instance
+
+    def clear(self):
+        """Drop the cached template, e.g. after editing the model module"""
+        with self._lock:
+            self._template = None
+
+
+_factories: Dict[Tuple[str, Optional[str]], ModelFactory] = {}
+_factories_lock = threading.Lock()
+
+
+def get_model_factory(
+    module_name: str, topology: Optional[Topology] = None
+) -> ModelFactory:
+    """
+    Return the process-wide factory of a model module.
+
+    Args:
+        module_name (str): Module defining the topology, e.g. "core.model_bis"
+        topology (Topology, optional): Reduced topology of the module, cached by its
+            digest. Defaults to None (the module's own topology).
+
+    Returns:
+        ModelFactory: The cached factory
+    """
+    key = (module_name, None if topology is None else topology.digest)
+    with _factories_lock:
+        if key not in _factories:
+            _factories[key] = ModelFactory(module_name, topology)
+        return _factories[key]
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
-from model_biogas import get_model
-from model_to_flex.core.dispatch import dispatch
-from model_to_flex.core.enums import BuilderType, SolverType, DispatchType
-from data_generator import get_data
+from core.dispatch import dispatch
+from core.enums import BuilderType, SolverType
+from core.presolve import presolve_plant
+from core.data_generator import get_data
+from model_to_flex.core.enums import DispatchType
 from model_to_flex.core.io_utils.save_results import save_results
 from model_to_flex.core.io_utils.plot_timeseries import main as plot_timeseries
 from datetime import datetime
@@ -17,24 +18,24 @@ import matplotlib.pyplot as plt
 # price_starttime='2025-01-16', demand_starttime='2022-01-17', length=48: calculation fails
 # price_starttime='2025-01-17', demand_starttime='2022-01-17', length=48: calculation succeeds
 # What could be the reason for this?
+# With the sparse builder ("use_sparse_builder" below), "elastic" and "iis" solve a
+# failing window again with penalized slacks and print which components and
+# timesteps needed them.
 
 # Generate data
 data = get_data(
     price_starttime="2022-01-01",
     demand_starttime="2022-01-01",
-    length=24*4,  # number of hours
-    freq="15min",  # hourly data
+    length=24 * 4 * 4,  # number of periods (4 days of 15 minutes)
+    freq="15min",  # quarter-hourly data
     save_to_csv=False,
 )
 
-# Load model
-model = get_model()
-
 # Solver options
 solver_options = {}  # Here you can define solver specific options (e.g. time limits, tolerances, etc.)
 dispatch_opts = {
     "optimizer_type": "default",
-    "builder_type": BuilderType.PYOMO,  # Currently only Pyomo is supported
+    "builder_type": BuilderType.PYOMO,  # model_to_flex Pyomo builder
     "solver": SolverType.CBC,
     "solver_options": solver_options,
     "dispatch_type": DispatchType.MONTHLY,
@@ -42,6 +43,24 @@ dispatch_opts = {
     # "contr_hor": 24,
 }
 
+# Opt-in: rolling horizon with the in-process sparse builder (HiGHS) instead
+use_sparse_builder = False
+if use_sparse_builder:
+    dispatch_opts.update(
+        {
+            "builder_type": BuilderType.SPARSE,
+            "solver": SolverType.HIGHS,
+            "dispatch_type": None,  # rolling horizon
+            "pred_hor": 36,
+            "contr_hor": 24,
+            "persistent_solver": True,  # keep the HiGHS model between windows
+            "warm_start": True,  # start each window from the shifted previous solution
+            "elastic": True,  # diagnose infeasible windows instead of failing
+            "iis": True,  # and extract an irreducible infeasible subsystem
+            "precheck": "flag",  # report periods the input data makes infeasible
+        }
+    )
+
 # efficiencies are relative to gas LHV
 # capacities are in MW and MW_hhv
 gas_turbine_minload_electricity_capacity = 7.5
@@ -82,16 +101,26 @@ params = {
     "gas_turbine_minload_heat_efficiency": gas_turbine_minload_heat_efficiency,
     "gas_turbine_maxload_heat_efficiency": gas_turbine_maxload_heat_efficiency,
     "hrsg_efficiency": hrsg_efficiency,
+    "gas_turbine_heat_efficiency": gas_turbine_minload_heat_efficiency,
+    "gas_turbine_electricity_efficiency": gas_turbine_minload_electricity_efficiency,
     "maximum capacity of balloon": maximum_capacity_of_balloon,
 }
 
+# Load the model, presolved for these parameters and data
+plant = presolve_plant("core.model_biogas", params, data)
+
 # Dispatch the model
-kpis, results = dispatch(
-    model,
-    params,
-    data,
-    **dispatch_opts,
-)
+solved = dispatch(plant, **dispatch_opts)
+kpis, results = solved.KPIs, solved.results
+for window in kpis.get("window_stats", []):
+    print(
+        f"window {window['start']}: {window['solve_time']:.3f} s"
+        + (" (warm start)" if window["warm_started"] else "")
+    )
+for diagnosis in kpis.get("diagnoses", []):
+    print(diagnosis.slacks)
+    if diagnosis.iis is not None:
+        print(diagnosis.iis)
 
 
 # Create timestamp for filenames
@@ -0,0 +1,363 @@
+"""
+Vectorized feasibility pre-check of the input data of a run.
+
+Before any window is built or solved, the per-period equations of the plant
+(summations, splitters, conversions and the static CHP rows) are propagated as
+intervals over all periods at once: starting from the bounds in the data
+(demands, capacities, policy fixings, contract bounds), every variable's range is
+narrowed by what the other variables of its rows allow, until nothing changes. A
+period in which some range becomes empty is infeasible for sure, e.g. heat demand
+above the sum of boiler, aux firing, CHP and e-boiler capacity, or a CHP forced on
+at a minimum load whose heat or electricity cannot be taken off.
+
+Storage and start-up rows couple periods and are not propagated, so the check
+only finds what is infeasible period by period; a window it passes can still be
+infeasible through storage levels.
+
+It also reports the supply envelope of every demand: the least and most the plant
+can deliver to it per period, with the demand itself left open.
+
+Example:
+    >>> report = check_inputs(plant)
+    >>> print(report.summary())
+    >>> windows = shorten_windows(dispatch_windows(...), report.infeasible)
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.presolve import PresolvedPlant
+from core.sparse_builder import (
+    INF,
+    SparseBuilder,
+    chp_coefficients,
+    component_ports,
+    window_values,
+)
+
+# Relative tolerance of an empty range
+TOLERANCE = 1e-6
+
+# Propagation passes over all rows (stops earlier when nothing changes)
+MAX_PASSES = 20
+
+
+@dataclass
+class PrecheckReport:
+    """
+    Outcome of `check_inputs`.
+
+    Attributes:
+        index (pd.Index): Periods of the run
+        envelopes (pd.DataFrame): Per demand `<demand>_demand`, `<demand>_min_supply`
+            and `<demand>_max_supply`
+        violations (pd.DataFrame): Variables with an empty range: "time",
+            "component", "variable", "lower", "upper"
+    """
+
+    index: pd.Index
+    envelopes: pd.DataFrame
+    violations: pd.DataFrame
+
+    @property
+    def infeasible(self) -> np.ndarray:
+        """Mask of the periods that cannot be dispatched"""
+        return self.index.isin(self.violations["time"])
+
+    @property
+    def feasible(self) -> bool:
+        return self.violations.empty
+
+    def summary(self) -> str:
+        if self.feasible:
+            return f"Pre-check: all {len(self.index)} periods feasible"
+        first = self.violations.iloc[0]
+        nodes = self.violations[["component", "variable"]].drop_duplicates()
+        return (
+            f"Pre-check: {int(self.infeasible.sum())} of {len(self.index)} periods "
+            f"infeasible (first {first['time']}: {first['component']}.{first['variable']} "
+            f"needs [{first['lower']:.4g}, {first['upper']:.4g}]); variables with "
+            f"empty ranges: "
+            + ", ".join(f"{c}.{v}" for c, v in nodes.itertuples(index=False))
+        )
+
+
+def _rows(builder: SparseBuilder, T: int) -> List[tuple]:
+    """Per-period rows of the plant: ([(variable, coefficients)], lower, upper)"""
+    window = slice(0, T)
+
+    def param(component, name, default=None):
+        value = component.params.get(name, default)
+        return None if value is None else window_values(value, window, T)
+
+    rows = []
+    for spec in builder.topology.components:
+        name, component = spec.name, builder.component_data[spec.name]
+        if spec.type in ("Summation", "Splitter"):
+            total, prefix = (
+                ("output", "input") if spec.type == "Summation" else ("input", "output")
+            )
+            terms = [((name, total), 1.0)] + [
+                ((name, f"{prefix}{i}"), -1.0) for i in range(spec.args[0])
+            ]
+            rows.append((terms, 0.0, 0.0))
+        elif spec.type == "Conversion":
+            factor = param(component, "conversion_factor", 1.0)
+            rows.append(([((name, "output"), 1.0), ((name, "input"), -factor)], 0, 0))
+        elif spec.type == "CHP":
+            chp = chp_coefficients(component, param)
+            on, increment = (name, "is_on"), (name, "electricity_increment")
+            rows += [
+                (
+                    [
+                        ((name, "gas_in"), 1.0),
+                        ((name, "gas_to_turbine"), -1.0),
+                        ((name, "gas_to_aux_firing"), -1.0),
+                    ],
+                    0.0,
+                    0.0,
+                ),
+                (
+                    [
+                        ((name, "electricity_output"), 1.0),
+                        (on, -chp["p_min"]),
+                        (increment, -1.0),
+                    ],
+                    0.0,
+                    0.0,
+                ),
+                (
+                    [
+                        (increment, 1.0),
+                        (on, -np.maximum(chp["p_max"] - chp["p_min"], 0)),
+                    ],
+                    -INF,
+                    0.0,
+                ),
+                (
+                    [
+                        ((name, "gas_to_turbine"), 1.0),
+                        (on, -chp["min_heat_rate"]),
+                        (increment, -chp["incremental_heat_rate"]),
+                    ],
+                    0.0,
+                    0.0,
+                ),
+                (
+                    [
+                        ((name, "thermal_output"), 1.0),
+                        ((name, "gas_to_turbine"), -chp["thermal"]),
+                        ((name, "gas_to_aux_firing"), -chp["aux"]),
+                    ],
+                    0.0,
+                    0.0,
+                ),
+                ([((name, "is_off"), 1.0), (on, 1.0)], 1.0, 1.0),
+            ]
+    return rows
+
+
+def _term_range(coef, lower, upper) -> Tuple[np.ndarray, np.ndarray]:
+    """Range of coef * x for x in [lower, upper] (0 where coef is 0)"""
+    coef = np.broadcast_to(np.asarray(coef, dtype=float), lower.shape)
+    with np.errstate(invalid="ignore"):
+        a, b = coef * lower, coef * upper
+    low, high = np.minimum(a, b), np.maximum(a, b)
+    zero = coef == 0
+    return np.where(zero, 0.0, low), np.where(zero, 0.0, high)
+
+
+def propagate(
+    rows: List[tuple],
+    lower: Dict[tuple, np.ndarray],
+    upper: Dict[tuple, np.ndarray],
+    integer: Sequence[tuple] = (),
+) -> int:
+    """
+    Narrow variable ranges in place until the rows allow no further narrowing.
+
+    Args:
+        rows (List[tuple]): ([(variable, coefficients)], lower, upper) per row
+        lower (Dict[tuple, np.ndarray]): Lower bound per variable and period
+        upper (Dict[tuple, np.ndarray]): Upper bound per variable and period
+        integer (Sequence[tuple], optional): Integer variables, whose ranges are
+            rounded inwards. Defaults to none.
+
+    Returns:
+        int: Passes made
+    """
+    for passes in range(1, MAX_PASSES + 1):
+        changed = False
+        for terms, row_lower, row_upper in rows:
+            ranges = [_term_range(c, lower[v], upper[v]) for v, c in terms]
+            for k, (variable, coef) in enumerate(terms):
+                # coef * x in [row_lower - others_high, row_upper - others_low]
+                with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+                    others_low = sum(r[0] for j, r in enumerate(ranges) if j != k)
+                    others_high = sum(r[1] for j, r in enumerate(ranges) if j != k)
+                    low = row_lower - others_high
+                    high = row_upper - others_low
+                    coef = np.broadcast_to(np.asarray(coef, dtype=float), low.shape)
+                    a, b = low / coef, high / coef
+                    active = (coef != 0) & ~np.isnan(a) & ~np.isnan(b)
+                    new_low = np.where(active, np.where(coef > 0, a, b), -INF)
+                    new_high = np.where(active, np.where(coef > 0, b, a), INF)
+                    # Unbounded new bounds compare as NaN, i.e. never tighter
+                    tighter_low = new_low > lower[variable] + TOLERANCE * (
+                        1 + np.abs(new_low)
+                    )
+                    tighter_high = new_high < upper[variable] - TOLERANCE * (
+                        1 + np.abs(new_high)
+                    )
+                if tighter_low.any() or tighter_high.any():
+                    lower[variable] = np.where(tighter_low, new_low, lower[variable])
+                    upper[variable] = np.where(tighter_high, new_high, upper[variable])
+                    ranges[k] = _term_range(coef, lower[variable], upper[variable])
+                    changed = True
+        for variable in integer:
+            low = np.ceil(lower[variable] - TOLERANCE)
+            high = np.floor(upper[variable] + TOLERANCE)
+            if (low > lower[variable]).any() or (high < upper[variable]).any():
+                lower[variable] = np.maximum(lower[variable], low)
+                upper[variable] = np.minimum(upper[variable], high)
+                changed = True
+        if not changed:
+            break
+    return passes
+
+
+def _ranges(builder: SparseBuilder, T: int, demands: bool):
+    """Initial ranges of all variables, with or without the demand fixings"""
+    window = slice(0, T)
+    lower, upper = {}, {}
+    for node in builder.nodes:
+        natural, lb, ub, _ = builder.node_bounds(node, window, T)
+        if not demands and builder.specs[node[0]].type == "Demand":
+            lb, ub = natural
+        root = builder.root[node]
+        lower[root] = np.maximum(lower.get(root, lb), lb)
+        upper[root] = np.minimum(upper.get(root, ub), ub)
+    for spec in builder.topology.components:
+        if spec.type == "CHP":
+            lower[(spec.name, "electricity_increment")] = np.zeros(T)
+            upper[(spec.name, "electricity_increment")] = np.full(T, INF)
+    return lower, upper
+
+
+def check_inputs(plant: PresolvedPlant) -> PrecheckReport:
+    """
+    Check the input data of a run for periods that cannot be dispatched.
+
+    Args:
+        plant (PresolvedPlant): Presolved plant with its data
+
+    Returns:
+        PrecheckReport: Supply envelopes of the demands and the variables with an
+            empty range per period
+    """
+    builder = SparseBuilder(
+        plant.topology,
+        plant.data_bindings,
+        plant.parameter_bindings,
+        plant.params,
+        plant.data,
+        break_symmetry=False,
+    )
+    T = len(plant.data)
+    index = plant.data.index
+
+    def rooted(rows):
+        return [
+            ([(builder.root.get(v, v), c) for v, c in terms], low, high)
+            for terms, low, high in rows
+        ]
+
+    rows = rooted(_rows(builder, T))
+    integer = {
+        builder.root[node]
+        for node in builder.nodes
+        if component_ports(builder.specs[node[0]])[node[1]][2]
+    }
+
+    # Supply envelopes: what the plant can deliver with the demands left open
+    lower, upper = _ranges(builder, T, demands=False)
+    propagate(rows, lower, upper, integer)
+    envelopes = {}
+    for spec in builder.topology.components:
+        if spec.type != "Demand":
+            continue
+        node = builder.root[(spec.name, "supply")]
+        demand = builder.component_data[spec.name].params.get("demand")
+        if demand is not None:
+            envelopes[f"{spec.name}_demand"] = window_values(demand, slice(0, T), T)
+        envelopes[f"{spec.name}_min_supply"] = lower[node]
+        envelopes[f"{spec.name}_max_supply"] = upper[node]
+
+    # Violations: ranges that become empty with the demands fixed
+    lower, upper = _ranges(builder, T, demands=True)
+    propagate(rows, lower, upper, integer)
+    names = {}
+    for node in builder.nodes:
+        names.setdefault(builder.root[node], node)
+    frames = []
+    for variable in lower:
+        empty = lower[variable] > upper[variable] + TOLERANCE * (
+            1 + np.abs(upper[variable])
+        )
+        if empty.any():
+            component, port = names.get(variable, variable)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "time": index[empty],
+                        "component": component,
+                        "variable": port,
+                        "lower": lower[variable][empty],
+                        "upper": upper[variable][empty],
+                    }
+                )
+            )
+    violations = (
+        pd.concat(frames, ignore_index=True).sort_values("time", kind="stable")
+        if frames
+        else pd.DataFrame(columns=["time", "component", "variable", "lower", "upper"])
+    )
+    return PrecheckReport(
+        index=index,
+        envelopes=pd.DataFrame(envelopes, index=index),
+        violations=violations.reset_index(drop=True),
+    )
+
+
+def shorten_windows(windows: List[tuple], infeasible: np.ndarray) -> List[tuple]:
+    """
+    Cut infeasible periods out of dispatch windows.
+
+    Every window is split into its runs of feasible periods; infeasible periods
+    are not dispatched and are missing from the results. For overlapping
+    (rolling) windows, the periods kept are cut at the first infeasible period.
+
+    Args:
+        windows (List[tuple]): (slice, periods kept) per window
+        infeasible (np.ndarray): Mask of infeasible periods (see
+            `PrecheckReport.infeasible`)
+
+    Returns:
+        List[tuple]: (slice, periods kept) per feasible run
+    """
+    shortened = []
+    for window, n_keep in windows:
+        keep_stop = window.start + n_keep
+        start = None
+        for t in range(window.start, window.stop + 1):
+            if t < window.stop and not infeasible[t]:
+                if start is None:
+                    start = t
+                continue
+            if start is not None and start < keep_stop:
+                shortened.append((slice(start, t), min(t, keep_stop) - start))
+            start = None
+    return shortened
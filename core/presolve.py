@@ -0,0 +1,510 @@
+"""
+Structural presolve between parameter/data binding and the model builder.
+
+The presolve looks at the parameters and input data of one run before the model is
+handed to the builder, and shrinks the model that reaches the solver:
+
+    - Zero-capacity assets: a conversion whose output upper bound is zero in every
+      period (e.g. `e_boiler_capacity: 0`) is removed from the topology, together
+      with the splitter/summation ports it was connected to.
+    - Observer markets: a market without quantity bounds that only mirrors CHP state
+      or decision variables (e.g. a penalty market) is removed when its price is zero.
+    - Fixed flows: a variable whose lower and upper bound are equal in every period
+      is turned into a parameter with those values instead of a bounded variable.
+    - Bound tightening: a conversion with an output upper bound and a known
+      conversion factor also gets the implied upper bound on its input. A CHP gets
+      the upper bounds on `gas_to_turbine` and `gas_in` implied by its electricity
+      capacities and efficiencies (capacity columns) and its aux firing bound
+      (`pc_max_gas`).
+
+Example:
+    >>> plant = presolve_plant("core.model_bis", params, data)
+    >>> print(plant.report.summary())
+    >>> model = plant.build()
+"""
+
+import importlib
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.binding import Binding, bind_data, bind_parameters, binding_values
+from core.model_factory import get_model_factory
+from core.topology import NUMBERED_PORTS, Topology, compile_topology, load_topology
+
+# Prefix of the input columns added by the presolve
+PRESOLVE_COLUMN_PREFIX = "presolve_"
+
+# CHP variables that carry energy flows to other components
+CHP_FLOW_PORTS = ("gas_in", "thermal_output", "electricity_output")
+
+
+@dataclass
+class PresolveReport:
+    """What the presolve changed"""
+
+    removed: List[str] = field(default_factory=list)
+    removed_columns: List[str] = field(default_factory=list)
+    folded: List[str] = field(default_factory=list)
+    tightened: List[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (
+            f"Presolve: removed {self.removed or 'nothing'}, "
+            f"folded {len(self.folded)} fixed flows, "
+            f"tightened {len(self.tightened)} bounds"
+        )
+
+
+def _connected_ports(topology: Topology, index: int) -> List[Tuple[int, str]]:
+    """Endpoints (component index, variable) on the other side of a component's connections"""
+    ports = []
+    for source_index, source_var, target_index, target_var in topology.connections:
+        if source_index == index:
+            ports.append((target_index, target_var))
+        elif target_index == index:
+            ports.append((source_index, source_var))
+    return ports
+
+
+def _is_observer(topology: Topology, index: int) -> bool:
+    """A market without quantity bounds that only observes CHP state or decision variables"""
+    spec = topology.components[index]
+    if spec.type != "Market" or spec.kwargs:
+        return False
+    ports = _connected_ports(topology, index)
+    return bool(ports) and all(
+        topology.components[other_index].type == "CHP" and var not in CHP_FLOW_PORTS
+        for other_index, var in ports
+    )
+
+
+def _is_removable(topology: Topology, index: int) -> bool:
+    """A component can be removed if it only connects to numbered splitter/summation ports"""
+    for other_index, var in _connected_ports(topology, index):
+        other = topology.components[other_index]
+        if other.type not in NUMBERED_PORTS or not other.args:
+            return False
+        if not var.startswith(NUMBERED_PORTS[other.type][0]):
+            return False
+    return True
+
+
+_reduced: Dict[Tuple[str, Tuple[str, ...]], Topology] = {}
+
+
+def remove_components(topology: Topology, names: Tuple[str, ...]) -> Topology:
+    """
+    Remove components from a topology and renumber the ports they were connected to.
+
+    Args:
+        topology (Topology): Compiled topology
+        names (Tuple[str, ...]): Names of the components to remove. Connections to
+            numbered splitter/summation ports free those ports; other connections
+            are dropped.
+
+    Returns:
+        Topology: Compiled, reduced topology (cached per topology and names)
+    """
+    key = (topology.digest, tuple(sorted(names)))
+    if key in _reduced:
+        return _reduced[key]
+
+    removed = {i for i, spec in enumerate(topology.components) if spec.name in names}
+
+    # Ports freed on the splitters/summations, per component index
+    freed: Dict[int, set] = {}
+    for index in removed:
+        for other_index, var in _connected_ports(topology, index):
+            other = topology.components[other_index]
+            if other.type not in NUMBERED_PORTS or not other.args:
+                continue
+            prefix = NUMBERED_PORTS[other.type][0]
+            if var.startswith(prefix) and var[len(prefix) :].isdigit():
+                freed.setdefault(other_index, set()).add(int(var[len(prefix) :]))
+
+    # Old port number -> new port number of every affected component
+    renumber: Dict[int, Dict[int, int]] = {}
+    components = []
+    for i, spec in enumerate(topology.components):
+        if i in removed:
+            continue
+        if i in freed:
+            kept = [p for p in range(spec.args[0]) if p not in freed[i]]
+            renumber[i] = {old: new for new, old in enumerate(kept)}
+            spec = replace(spec, args=(len(kept),) + tuple(spec.args[1:]))
+        components.append(spec)
+
+    def endpoint(index: int, var: str) -> str:
+        spec = topology.components[index]
+        if index in renumber:
+            prefix = NUMBERED_PORTS[spec.type][0]
+            if var.startswith(prefix) and var[len(prefix) :].isdigit():
+                var = f"{prefix}{renumber[index][int(var[len(prefix):])]}"
+        return f"{spec.name}.{var}"
+
+    connections = [
+        [endpoint(s, sv), endpoint(t, tv)]
+        for s, sv, t, tv in topology.connections
+        if s not in removed and t not in removed
+    ]
+
+    raw = {
+        "name": topology.name,
+        "description": topology.description,
+        "components": [
+            {
+                "name": spec.name,
+                "type": spec.type,
+                "args": list(spec.args),
+                "kwargs": spec.kwargs,
+                "variable_types": spec.variable_types,
+                "values": spec.values,
+            }
+            for spec in components
+        ],
+        "connections": connections,
+        "identical_units": [
+            [name for name in group if name not in names]
+            for group in topology.identical_units
+            if sum(name not in names for name in group) >= 2
+        ],
+        "chp_formulation": topology.chp_formulation,
+    }
+    digest = f"{topology.digest}-{'-'.join(key[1])}"
+    _reduced[key] = compile_topology(raw, digest)
+    return _reduced[key]
+
+
+def _chp_gas_ubounds(
+    component: str, bindings: List[Binding], params: Dict[str, Any], data: pd.DataFrame
+) -> Dict[str, Any]:
+    """
+    Upper bounds on the gas flows of a CHP implied by its bound values.
+
+    At most `min_electricity_output / min_electrical_efficiency` plus
+    `(max_electricity_output - min_electricity_output) / max_electrical_efficiency`
+    goes to the turbine, see the CHP rows in `core.sparse_builder`; `gas_in` adds the
+    aux firing upper bound to that.
+
+    Args:
+        component (str): Name of the CHP
+        bindings (List[Binding]): Data and parameter bindings of the run
+        params (Dict[str, Any]): Parameters of the run
+        data (pd.DataFrame): Input data of the run
+
+    Returns:
+        Dict[str, Any]: Upper bounds by CHP variable, empty if the capacities or
+            efficiencies are not bound
+    """
+
+    def bound(attribute: str, target: str = "value"):
+        binding = next(
+            (
+                b
+                for b in bindings
+                if b.component == component
+                and b.attribute == attribute
+                and b.target == target
+            ),
+            None,
+        )
+        return None if binding is None else binding_values(binding, params, data)
+
+    p_min = bound("min_electricity_output")
+    p_max = bound("max_electricity_output")
+    eff_min = bound("min_electrical_efficiency")
+    if eff_min is None:
+        eff_min = bound("electricity_efficiency")
+    eff_max = bound("max_electrical_efficiency")
+    eff_max = eff_min if eff_max is None else eff_max
+    if p_max is None or eff_min is None:
+        return {}
+    p_min = 0.0 if p_min is None else p_min
+    if np.any(np.asarray(eff_min) <= 0) or np.any(np.asarray(eff_max) <= 0):
+        return {}
+
+    ubounds = {
+        "gas_to_turbine": p_min / eff_min + np.maximum(p_max - p_min, 0.0) / eff_max
+    }
+    aux_ubound = bound("gas_to_aux_firing", "ubound")
+    if aux_ubound is not None:
+        ubounds["gas_in"] = ubounds["gas_to_turbine"] + aux_ubound
+    return ubounds
+
+
+def presolve(
+    topology: Topology,
+    data_bindings: List[Binding],
+    parameter_bindings: List[Binding],
+    params: Dict[str, Any],
+    data: pd.DataFrame,
+) -> Tuple[
+    Topology, List[Binding], List[Binding], Dict[str, Any], pd.DataFrame, PresolveReport
+]:
+    """
+    Presolve one run on the topology and binding tables.
+
+    Args:
+        topology (Topology): Compiled topology of the model
+        data_bindings (List[Binding]): Data binding table of the model
+        parameter_bindings (List[Binding]): Parameter binding table of the model
+        params (Dict[str, Any]): Parameters of the run
+        data (pd.DataFrame): Input data of the run
+
+    Returns:
+        Tuple: Reduced topology, data bindings, parameter bindings, parameters and
+            data (copies, with the presolve columns added) and the report
+    """
+    report = PresolveReport()
+    params = dict(params)
+    data = data.copy(deep=False)
+    types = {spec.name: spec.type for spec in topology.components}
+    index = {spec.name: i for i, spec in enumerate(topology.components)}
+
+    # Zero-capacity conversions
+    removed = []
+    for binding in data_bindings + parameter_bindings:
+        if (
+            types.get(binding.component) != "Conversion"
+            or binding.target not in ("ubound", "fixed")
+            or binding.attribute != "output"
+            or binding.lbound not in (None, 0)
+            or binding.component in removed
+        ):
+            continue
+        values = binding_values(binding, params, data)
+        if values is not None and np.all(np.asarray(values) == 0):
+            if _is_removable(topology, index[binding.component]):
+                removed.append(binding.component)
+                report.removed_columns += [
+                    f"{binding.component}_input",
+                    f"{binding.component}_output",
+                ]
+
+    # Zero-price markets that only observe CHP variables (e.g. unused penalty markets)
+    for binding in data_bindings + parameter_bindings:
+        if (
+            types.get(binding.component) != "Market"
+            or binding.attribute != "prices"
+            or binding.component in removed
+            or not _is_observer(topology, index[binding.component])
+        ):
+            continue
+        values = binding_values(binding, params, data)
+        if values is not None and np.all(np.asarray(values) == 0):
+            removed.append(binding.component)
+            report.removed_columns.append(f"{binding.component}_quantities")
+
+    if removed:
+        topology = remove_components(topology, tuple(removed))
+        report.removed = removed
+
+    data_bindings = [b for b in data_bindings if b.component not in removed]
+    parameter_bindings = [b for b in parameter_bindings if b.component not in removed]
+
+    # Fixed flows
+    def fold(bindings: List[Binding]) -> List[Binding]:
+        folded = []
+        for binding in bindings:
+            values = None
+            if binding.target == "fixed":
+                values = binding_values(binding, params, data)
+            elif binding.target == "ubound" and binding.lbound is not None:
+                values = binding_values(binding, params, data)
+                if values is not None and not np.all(
+                    np.asarray(values) == binding.lbound
+                ):
+                    values = None
+            if values is not None:
+                binding = replace(binding, target="param", lbound=None)
+                report.folded.append(f"{binding.component}.{binding.attribute}")
+            folded.append(binding)
+        return folded
+
+    data_bindings = fold(data_bindings)
+    parameter_bindings = fold(parameter_bindings)
+
+    def add_ubound(component: str, attribute: str, values, lbound=None):
+        name = f"{PRESOLVE_COLUMN_PREFIX}{component}_{attribute}_ubound"
+        if np.ndim(values) == 0:
+            params[name] = float(values)
+            table = parameter_bindings
+        else:
+            data[name] = np.broadcast_to(values, len(data))
+            table = data_bindings
+        table.append(
+            Binding(name, component, attribute, target="ubound", lbound=lbound)
+        )
+        report.tightened.append(f"{component}.{attribute}")
+
+    # Implied input bounds of conversions
+    for binding in data_bindings + parameter_bindings:
+        if (
+            types.get(binding.component) != "Conversion"
+            or binding.target != "ubound"
+            or binding.attribute != "output"
+        ):
+            continue
+        factor = next(
+            (
+                b
+                for b in data_bindings + parameter_bindings
+                if b.component == binding.component and b.target == "conversion_factor"
+            ),
+            None,
+        )
+        if factor is None:
+            continue
+        ubound = binding_values(binding, params, data)
+        factor_values = binding_values(factor, params, data)
+        if (
+            ubound is None
+            or factor_values is None
+            or np.any(np.asarray(factor_values) <= 0)
+        ):
+            continue
+
+        add_ubound(binding.component, "input", ubound / factor_values, binding.lbound)
+
+    # Implied gas bounds of CHPs; variables the data or a policy already bounds or
+    # fixes are left alone
+    for spec in topology.components:
+        if spec.type != "CHP":
+            continue
+        bindings = data_bindings + parameter_bindings
+        ubounds = _chp_gas_ubounds(spec.name, bindings, params, data)
+        for attribute, values in ubounds.items():
+            if not any(
+                b.component == spec.name
+                and b.attribute == attribute
+                and b.target in ("ubound", "fixed", "param")
+                for b in bindings
+            ):
+                add_ubound(spec.name, attribute, values)
+
+    return topology, data_bindings, parameter_bindings, params, data, report
+
+
+def policy_bindings(
+    module, policy: Optional[str], params: Dict[str, Any], data: pd.DataFrame
+) -> Tuple[List[Binding], List[Binding], Dict[str, Any], pd.DataFrame]:
+    """
+    Look up the variable fixing of an operating policy in a model module.
+
+    Args:
+        module: Model module with POLICY_BINDINGS, POLICY_CONSTANTS and optionally
+            `policy_data(policy, params, data)`, which adds the columns the policy
+            binds to
+        policy (str, optional): Policy name, None for no policy
+        params (Dict[str, Any]): Parameters of the run
+        data (pd.DataFrame): Input data of the run
+
+    Returns:
+        Tuple: Data bindings, parameter bindings, the parameters extended with the
+            policy constants and the data extended with the policy columns
+    """
+    if policy is None:
+        return [], [], params, data
+    policies = getattr(module, "POLICY_BINDINGS", {})
+    if policy not in policies:
+        raise ValueError(
+            f"Unknown policy '{policy}' for {module.__name__}, "
+            f"expected one of {sorted(policies)}"
+        )
+
+    params = {**params, **getattr(module, "POLICY_CONSTANTS", {})}
+    if hasattr(module, "policy_data"):
+        data = module.policy_data(policy, params, data)
+    data_table = [
+        b for b in policies[policy] if not all(s in params for s in b.sources)
+    ]
+    parameter_table = [
+        b for b in policies[policy] if all(s in params for s in b.sources)
+    ]
+    return data_table, parameter_table, params, data
+
+
+@dataclass
+class PresolvedPlant:
+    """
+    A presolved run: reduced topology, binding tables, parameters and data.
+
+    The sparse builder works on this directly; `build()` returns the equivalent
+    model_to_flex model for the other builders.
+    """
+
+    module_name: str
+    topology: Topology
+    data_bindings: List[Binding]
+    parameter_bindings: List[Binding]
+    params: Dict[str, Any]
+    data: pd.DataFrame
+    report: PresolveReport
+
+    def build(self):
+        """Return a model_to_flex model bound to the presolved tables"""
+        model = get_model_factory(self.module_name, self.topology).create()
+
+        model.set_set_data_method(
+            partial(bind_data, bindings=tuple(self.data_bindings))
+        )
+        model.set_set_parameters_method(
+            partial(bind_parameters, bindings=tuple(self.parameter_bindings))
+        )
+        return model
+
+
+def presolve_plant(
+    module_name: str,
+    params: Dict[str, Any],
+    data: pd.DataFrame,
+    policy: Optional[str] = None,
+) -> PresolvedPlant:
+    """
+    Presolve a run of a model module.
+
+    Args:
+        module_name (str): Model module, e.g. "core.model_bis"
+        params (Dict[str, Any]): Parameters of the run
+        data (pd.DataFrame): Input data of the run
+        policy (str, optional): Operating policy from the module's POLICY_BINDINGS,
+            applied by fixing variables. Defaults to None.
+
+    Returns:
+        PresolvedPlant: The presolved run
+    """
+    module = importlib.import_module(module_name)
+    policy_data, policy_parameters, params, data = policy_bindings(
+        module, policy, params, data
+    )
+    topology, data_bindings, parameter_bindings, params, data, report = presolve(
+        load_topology(module.TOPOLOGY_FILE),
+        list(module.DATA_BINDINGS) + policy_data,
+        list(module.PARAMETER_BINDINGS) + policy_parameters,
+        params,
+        data,
+    )
+    return PresolvedPlant(
+        module_name, topology, data_bindings, parameter_bindings, params, data, report
+    )
+
+
+def fill_removed_results(results: pd.DataFrame, report: PresolveReport) -> pd.DataFrame:
+    """
+    Add zero input/output columns for the components removed by the presolve.
+
+    Args:
+        results (pd.DataFrame): Dispatch results
+        report (PresolveReport): Report of the presolve
+
+    Returns:
+        pd.DataFrame: Results with the same columns as without presolve
+    """
+    for column in report.removed_columns:
+        if column not in results.columns:
+            results[column] = 0.0
+    return results
@@ -0,0 +1,251 @@
+"""
+Persistent HiGHS sessions for the sparse builder.
+
+Consecutive dispatch windows and scenarios mostly produce problems with the same
+structure (same sparsity pattern and integrality) and only different numbers:
+prices, demands, capacities, efficiencies. A `SolverSession` keeps one HiGHS
+instance per structure, updates costs, bounds and matrix coefficients in place,
+and re-solves from the previous basis (LP) or with the previous solution offered
+as incumbent (MILP). A problem with a new structure is passed in full once and
+then kept as well, and so is a problem whose matrix coefficients changed in more
+than `REBUILD_FRACTION` of the entries. The options of each solve are set on the
+kept instance before it runs.
+
+Example:
+    >>> session = get_solver_session()
+    >>> solution = session.solve(problem)
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from core.sparse_builder import (
+    HIGHS_OPTIONS,
+    SolveResult,
+    SparseProblem,
+    needs_retry,
+    read_highs,
+    set_start,
+    solve,
+    to_highs,
+)
+
+# Share of changed matrix coefficients above which a kept instance is rebuilt instead
+# of updated (HiGHS changes coefficients one by one)
+REBUILD_FRACTION = 0.1
+
+
+def structure_key(problem: SparseProblem) -> str:
+    """Hash of the sparsity pattern and integrality of a problem"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.asarray(problem.A.shape, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(problem.A.indptr, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(problem.A.indices, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(problem.integrality, dtype=np.int8).tobytes())
+    return h.hexdigest()
+
+
+@dataclass
+class _Entry:
+    """A HiGHS instance and the problem data it currently holds"""
+
+    highs: Any
+    problem: SparseProblem
+    options: Dict[str, Any]
+    x: Optional[np.ndarray] = None
+
+
+@dataclass
+class SessionStats:
+    """Counters of a session"""
+
+    builds: int = 0
+    updates: int = 0
+    changed_coefficients: int = 0
+
+
+class SolverSession:
+    """
+    HiGHS instances kept in memory between solves, one per problem structure.
+
+    Args:
+        options (Dict[str, Any], optional): HiGHS options applied to every instance.
+            Defaults to None.
+        max_models (int, optional): Number of structures kept (least recently used
+            are dropped). Defaults to 16.
+        warm_start (bool, optional): Offer the previous solution as a MIP start.
+            Defaults to True.
+    """
+
+    def __init__(
+        self,
+        options: Optional[Dict[str, Any]] = None,
+        max_models: int = 16,
+        warm_start: bool = True,
+    ):
+        self.options = dict(options or {})
+        self.max_models = max_models
+        self.warm_start = warm_start
+        self.stats = SessionStats()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Drop all kept instances"""
+        with self._lock:
+            self._entries.clear()
+
+    def _new_entry(self, problem: SparseProblem, options: Dict[str, Any]) -> _Entry:
+        self.stats.builds += 1
+        return _Entry(
+            highs=to_highs(problem, options), problem=problem, options=options
+        )
+
+    def _apply_options(self, entry: _Entry, options: Dict[str, Any]):
+        """Set the options of this solve on a kept instance"""
+        if options == entry.options:
+            return
+        entry.highs.resetOptions()
+        for key, value in {**HIGHS_OPTIONS, **options}.items():
+            entry.highs.setOptionValue(key, value)
+        entry.options = options
+
+    def _update_entry(self, entry: _Entry, problem: SparseProblem):
+        """Push the numbers that differ from the held problem into HiGHS"""
+        h, old = entry.highs, entry.problem
+
+        changed = np.flatnonzero(problem.A.data != old.A.data)
+        if len(changed) > REBUILD_FRACTION * len(problem.A.data):
+            entry.highs = to_highs(problem, entry.options)
+            entry.problem = problem
+            self.stats.builds += 1
+            return
+
+        if len(changed):
+            rows = problem.A.indices[changed].tolist()
+            cols = np.searchsorted(problem.A.indptr, changed, side="right") - 1
+            for row, col, value in zip(
+                rows, cols.tolist(), problem.A.data[changed].tolist()
+            ):
+                h.changeCoeff(row, col, value)
+            self.stats.changed_coefficients += len(changed)
+
+        changed = np.flatnonzero(problem.c != old.c)
+        if len(changed):
+            h.changeColsCost(len(changed), changed, problem.c[changed])
+
+        changed = np.flatnonzero(
+            (problem.col_lower != old.col_lower) | (problem.col_upper != old.col_upper)
+        )
+        if len(changed):
+            h.changeColsBounds(
+                len(changed),
+                changed,
+                problem.col_lower[changed],
+                problem.col_upper[changed],
+            )
+
+        changed = np.flatnonzero(
+            (problem.row_lower != old.row_lower) | (problem.row_upper != old.row_upper)
+        )
+        if len(changed) and hasattr(h, "changeRowsBounds"):
+            h.changeRowsBounds(
+                len(changed),
+                changed,
+                problem.row_lower[changed],
+                problem.row_upper[changed],
+            )
+        elif len(changed):  # highspy 1.7 only changes row bounds one by one
+            for row, lower, upper in zip(
+                changed.tolist(),
+                problem.row_lower[changed].tolist(),
+                problem.row_upper[changed].tolist(),
+            ):
+                h.changeRowBounds(row, lower, upper)
+
+        entry.problem = problem
+        self.stats.updates += 1
+
+    def solve(
+        self,
+        problem: SparseProblem,
+        options: Optional[Dict[str, Any]] = None,
+        start: Optional[np.ndarray] = None,
+    ) -> SolveResult:
+        """
+        Solve a problem, reusing the instance of its structure if there is one.
+
+        Falls back to a one-off `sparse_builder.solve` if highspy is not installed.
+
+        Args:
+            problem (SparseProblem): Problem to solve
+            options (Dict[str, Any], optional): HiGHS options of this solve, on top
+                of the session options. Defaults to None.
+            start (np.ndarray, optional): MIP start. Defaults to the last solution of
+                the instance if `warm_start` is set.
+
+        Returns:
+            SolveResult: Status, solution and objective value
+        """
+        try:
+            import highspy  # noqa: F401
+        except ImportError:
+            return solve(problem, {**self.options, **(options or {})}, start)
+
+        started = time.perf_counter()
+        merged = {**self.options, **(options or {})}
+        key = structure_key(problem)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                entry = self._new_entry(problem, merged)
+            else:
+                self._update_entry(entry, problem)
+                self._apply_options(entry, merged)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_models:
+                self._entries.popitem(last=False)
+
+            h = entry.highs
+            if start is None and self.warm_start:
+                start = entry.x
+            if start is not None and problem.integrality.any():
+                set_start(h, start)
+            h.run()
+            status, x, objective = read_highs(h)
+
+        # Results presolve may have got wrong are solved again one-off without it
+        retried = merged.get("presolve") != "off" and needs_retry(
+            problem, status, objective, start
+        )
+        if retried:
+            retry = solve(problem, {**merged, "presolve": "off"}, start)
+            if retry.x is not None and (x is None or retry.objective <= objective):
+                status, x, objective = retry.status, retry.x, retry.objective
+        if x is not None:
+            entry.x = x
+
+        return SolveResult(
+            status=status,
+            x=x,
+            objective=objective,
+            solve_time=time.perf_counter() - started,
+            presolve_retry=retried,
+        )
+
+
+_default_session: Optional[SolverSession] = None
+
+
+def get_solver_session() -> SolverSession:
+    """Process-wide solver session shared by all scenarios of a run"""
+    global _default_session
+    if _default_session is None:
+        _default_session = SolverSession()
+    return _default_session
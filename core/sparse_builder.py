@@ -0,0 +1,1038 @@
+"""
+Sparse-matrix LP/MILP builder for the plant topologies.
+
+Instead of building Pyomo expression trees and writing an LP file for CBC, this
+builder assembles the constraint matrix of one dispatch window directly as a SciPy
+sparse matrix from a presolved plant (compiled topology plus binding tables) and
+solves it in-process with HiGHS (highspy, or scipy.optimize.milp as a fallback).
+
+Connected variables share one LP column per period. Component formulations
+(per period t, all flows non-negative unless stated otherwise):
+
+    Market:      quantities (free unless bounded); cost prices_t * quantities_t
+    PeakMarket:  peak_m >= quantities_t - base quantities_t, m the calendar month of t;
+                 cost prices * peak_m at the first period of month m in the window
+    Conversion:  output_t = conversion_factor_t * input_t
+    Demand:      supply_t = demand_t
+    Summation:   output_t = sum_i input{i}_t
+    Splitter:    input_t = sum_i output{i}_t
+    Storage:     soc_t = soc_{t-1} + charge_t - discharge_t, 0 <= soc_t <= max_charge
+    CHP:         gas_in = gas_to_turbine + gas_to_aux_firing
+                 electricity_output = min_electricity_output * is_on + increment
+                 0 <= increment <= (max_electricity_output - min_electricity_output) * is_on
+                 gas_to_turbine = min_electricity_output / min_electrical_efficiency * is_on
+                                  + increment / max_electrical_efficiency
+                 thermal_output = thermal_efficiency * gas_to_turbine
+                                  + aux_firing_efficiency * gas_to_aux_firing
+                 is_starting_up_t >= is_on_t - is_on_{t-1}
+                 is_shutting_down_t >= is_on_{t-1} - is_on_t
+                 is_off_t = 1 - is_on_t, with is_on binary
+    CHP, tight (topology `chp_formulation: "tight"`): the start-up and shut-down
+                 rows are replaced by the convex hull of the on/off transition
+                 is_starting_up_t - is_shutting_down_t = is_on_t - is_on_{t-1}
+                 is_starting_up_t <= is_on_t
+                 is_starting_up_t <= 1 - is_on_{t-1}
+    Identical units (topology `identical_units`): is_on of unit i >= is_on of unit i+1
+
+The CHP formulation is our own reading of the model_to_flex CHP component (a
+two-segment heat rate with a binary on/off state); tests/test_sparse_builder.py
+compares both builders (it needs Pyomo and CBC).
+
+HiGHS runs with the presolve rule `PRESOLVE_PARALLEL_ROWS_AND_COLUMNS` off, and
+results presolve may have got wrong are solved again without presolve (`solve`).
+
+Peaks are priced per calendar month within a window, so monthly windows and a single
+window over the horizon charge every month once. Rolling windows that cross a month
+boundary charge a month's peak in every window that covers it; monthly totals of
+such runs come from the results (`core.time_aggregation.full_kpis`).
+
+A variable whose type is PARAM and that has values is fixed to those values.
+Results use the `<component>_<variable>` column names of the model_to_flex results,
+plus `<market>_prices` and `<market>_costs`.
+"""
+
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from core.binding import Binding, binding_values
+from core.topology import CHP_FORMULATIONS, Topology
+
+INF = np.inf
+
+# Connectable variables of each component type: name -> (lower bound, upper bound, integer)
+PORTS = {
+    "Market": {"quantities": (-INF, INF, False)},
+    "PeakMarket": {"quantities": (-INF, INF, False)},
+    "Conversion": {"input": (0, INF, False), "output": (0, INF, False)},
+    "Demand": {"supply": (0, INF, False)},
+    "Storage": {
+        "charge": (0, INF, False),
+        "discharge": (0, INF, False),
+        "soc": (0, INF, False),
+    },
+    "CHP": {
+        "gas_in": (0, INF, False),
+        "gas_to_turbine": (0, INF, False),
+        "gas_to_aux_firing": (0, INF, False),
+        "electricity_output": (0, INF, False),
+        "thermal_output": (0, INF, False),
+        "is_on": (0, 1, True),
+        "is_off": (0, 1, False),
+        "is_starting_up": (0, 1, False),
+        "is_shutting_down": (0, 1, False),
+    },
+}
+
+# Default variable types of the model_to_flex components
+DEFAULT_VARIABLE_TYPES = {"Market": "PARAM", "PeakMarket": "PARAM"}
+
+
+def component_ports(spec) -> Dict[str, Tuple[float, float, bool]]:
+    """Connectable variables of a component spec, including numbered ports"""
+    if spec.type == "Summation":
+        ports = {f"input{i}": (0, INF, False) for i in range(spec.args[0])}
+        ports["output"] = (0, INF, False)
+        return ports
+    if spec.type == "Splitter":
+        ports = {f"output{i}": (0, INF, False) for i in range(spec.args[0])}
+        ports["input"] = (0, INF, False)
+        return ports
+    return PORTS[spec.type]
+
+
+@dataclass
+class ComponentData:
+    """Values bound to one component: parameters, variable bounds and fixings"""
+
+    params: Dict[str, Any] = field(default_factory=dict)
+    lbound: Dict[str, Any] = field(default_factory=dict)
+    ubound: Dict[str, Any] = field(default_factory=dict)
+    values: Dict[str, Any] = field(default_factory=dict)
+    types: Dict[str, str] = field(default_factory=dict)
+
+
+def resolve_component_data(
+    topology: Topology,
+    data_bindings: List[Binding],
+    parameter_bindings: List[Binding],
+    params: Dict[str, Any],
+    data: pd.DataFrame,
+) -> Dict[str, ComponentData]:
+    """
+    Collect what the binding tables would push into each component.
+
+    Args:
+        topology (Topology): Compiled topology
+        data_bindings (List[Binding]): Data binding table
+        parameter_bindings (List[Binding]): Parameter binding table
+        params (Dict[str, Any]): Parameters of the run
+        data (pd.DataFrame): Input data of the run
+
+    Returns:
+        Dict[str, ComponentData]: Bound values per component name
+    """
+    resolved = {}
+    for spec in topology.components:
+        component = ComponentData()
+        component.types = {
+            port: DEFAULT_VARIABLE_TYPES.get(spec.type, "VARIABLE")
+            for port in component_ports(spec)
+        }
+        component.types.update(spec.variable_types)
+        component.params.update(spec.values)
+        if spec.type == "Conversion" and "conversion_factor" in spec.kwargs:
+            component.params["conversion_factor"] = spec.kwargs["conversion_factor"]
+        if spec.type == "Market":
+            if "quantities_lbounds" in spec.kwargs:
+                component.lbound["quantities"] = spec.kwargs["quantities_lbounds"]
+            if "quantities_ubounds" in spec.kwargs:
+                component.ubound["quantities"] = spec.kwargs["quantities_ubounds"]
+        resolved[spec.name] = component
+
+    # Parameters first, then data, in the order of the tables
+    for binding in list(parameter_bindings) + list(data_bindings):
+        if binding.component not in resolved:
+            continue
+        values = binding_values(binding, params, data)
+        if values is None:
+            continue
+        component = resolved[binding.component]
+        attribute = binding.attribute
+        if binding.target == "var":
+            # Values on a variable are parameters (prices, demand) or fixings
+            if attribute in component.types:
+                component.values[attribute] = values
+            else:
+                component.params[attribute] = values
+        elif binding.target == "value":
+            component.params[attribute] = values
+        elif binding.target == "ubound":
+            component.ubound[attribute] = values
+            if binding.lbound is not None:
+                component.lbound[attribute] = binding.lbound
+        elif binding.target == "lbound":
+            component.lbound[attribute] = values
+        elif binding.target == "fixed":
+            component.lbound[attribute] = values
+            component.ubound[attribute] = values
+        elif binding.target == "param":
+            component.types[attribute] = "PARAM"
+            component.values[attribute] = values
+        elif binding.target == "conversion_factor":
+            component.params["conversion_factor"] = values
+        elif binding.target == "max_charge":
+            component.params["max_charge"] = values
+    return resolved
+
+
+@dataclass
+class SparseProblem:
+    """One dispatch window as a sparse MILP: min c'x, row_lower <= A x <= row_upper"""
+
+    c: np.ndarray
+    A: sparse.csc_matrix
+    row_lower: np.ndarray
+    row_upper: np.ndarray
+    col_lower: np.ndarray
+    col_upper: np.ndarray
+    integrality: np.ndarray
+    columns: Dict[Tuple[str, str], np.ndarray]
+    n_periods: int
+    row_component: Optional[np.ndarray] = None  # component that added each row
+    row_period: Optional[np.ndarray] = None  # period of each row within the window
+
+
+class _ProblemAssembler:
+    """Collects columns, rows and objective coefficients of a window"""
+
+    def __init__(self, n_periods: int):
+        self.T = n_periods
+        self.n_cols = 0
+        self.col_lower: List[np.ndarray] = []
+        self.col_upper: List[np.ndarray] = []
+        self.integrality: List[np.ndarray] = []
+        self.rows: List[np.ndarray] = []
+        self.cols: List[np.ndarray] = []
+        self.vals: List[np.ndarray] = []
+        self.row_lower: List[np.ndarray] = []
+        self.row_upper: List[np.ndarray] = []
+        self.n_rows = 0
+        self.cost_cols: List[np.ndarray] = []
+        self.cost_vals: List[np.ndarray] = []
+        self.component = ""  # label of the rows added next
+        self.row_component: List[np.ndarray] = []
+        self.row_period: List[np.ndarray] = []
+
+    def add_columns(self, size: int, lower=0.0, upper=INF, integer=False) -> np.ndarray:
+        index = np.arange(self.n_cols, self.n_cols + size)
+        self.n_cols += size
+        self.col_lower.append(np.broadcast_to(np.asarray(lower, dtype=float), size))
+        self.col_upper.append(np.broadcast_to(np.asarray(upper, dtype=float), size))
+        self.integrality.append(np.full(size, 1 if integer else 0, dtype=np.int8))
+        return index
+
+    def add_rows(self, terms, lower, upper, size: Optional[int] = None):
+        """
+        Add `size` rows: lower <= sum(coef * x[col]) <= upper.
+
+        Args:
+            terms: List of (column indices, coefficients) with one entry per row;
+                a column index of -1 means no term in that row
+            lower: Row lower bounds (scalar or per row)
+            upper: Row upper bounds (scalar or per row)
+            size (int, optional): Number of rows. Defaults to the number of periods.
+        """
+        size = self.T if size is None else size
+        row_index = np.arange(self.n_rows, self.n_rows + size)
+        for cols, coefs in terms:
+            cols = np.broadcast_to(np.asarray(cols), size)
+            coefs = np.broadcast_to(np.asarray(coefs, dtype=float), size)
+            mask = (cols >= 0) & (coefs != 0)
+            self.rows.append(row_index[mask])
+            self.cols.append(cols[mask])
+            self.vals.append(coefs[mask])
+        self.row_lower.append(np.broadcast_to(np.asarray(lower, dtype=float), size))
+        self.row_upper.append(np.broadcast_to(np.asarray(upper, dtype=float), size))
+        self.row_component.append(np.full(size, self.component, dtype=object))
+        self.row_period.append(np.arange(size) if size == self.T else np.zeros(size))
+        self.n_rows += size
+
+    def add_cost(self, cols, coefs):
+        self.cost_cols.append(np.asarray(cols))
+        self.cost_vals.append(
+            np.broadcast_to(np.asarray(coefs, dtype=float), len(cols))
+        )
+
+    def finish(self, columns) -> SparseProblem:
+        c = np.zeros(self.n_cols)
+        if self.cost_cols:
+            np.add.at(c, np.concatenate(self.cost_cols), np.concatenate(self.cost_vals))
+        concat = lambda parts, dtype: (
+            np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype)
+        )
+        A = sparse.csc_matrix(
+            (
+                concat(self.vals, float),
+                (concat(self.rows, np.int64), concat(self.cols, np.int64)),
+            ),
+            shape=(self.n_rows, self.n_cols),
+        )
+        return SparseProblem(
+            c=c,
+            A=A,
+            row_lower=concat(self.row_lower, float),
+            row_upper=concat(self.row_upper, float),
+            col_lower=concat(self.col_lower, float),
+            col_upper=concat(self.col_upper, float),
+            integrality=concat(self.integrality, np.int8),
+            columns=columns,
+            n_periods=self.T,
+            row_component=concat(self.row_component, object),
+            row_period=concat(self.row_period, np.int64),
+        )
+
+
+def calendar_months(index: pd.Index) -> np.ndarray:
+    """
+    Calendar month of every period, numbered 0, 1, ... in order of appearance.
+
+    Args:
+        index (pd.Index): Periods, e.g. the index of a window; an index without
+            timestamps is a single month
+
+    Returns:
+        np.ndarray: Month number per period
+    """
+    if not isinstance(index, pd.DatetimeIndex):
+        return np.zeros(len(index), dtype=int)
+    months = np.asarray(index.year * 12 + index.month)
+    return np.cumsum(np.r_[False, months[1:] != months[:-1]])
+
+
+def window_values(values, window: slice, n_periods: int) -> np.ndarray:
+    """Slice per-period values to the window, broadcasting scalars"""
+    if np.ndim(values) == 0:
+        return np.full(n_periods, float(values))
+    return np.asarray(values, dtype=float)[window]
+
+
+def chp_coefficients(component: ComponentData, param) -> Dict[str, np.ndarray]:
+    """
+    Per-period coefficients of the CHP formulation.
+
+    Args:
+        component (ComponentData): Values bound to the CHP
+        param: `param(component, name, default)` returning window values
+
+    Returns:
+        Dict[str, np.ndarray]: "p_min", "p_max", "min_heat_rate" (gas at minimum
+            load), "incremental_heat_rate" (gas per unit above minimum load),
+            "thermal" and "aux" (thermal efficiencies of turbine gas and aux firing)
+    """
+    p_min = param(component, "min_electricity_output", 0.0)
+    eff_min = param(
+        component,
+        "min_electrical_efficiency",
+        component.params.get("electricity_efficiency"),
+    )
+    eff_max = param(component, "max_electrical_efficiency", None)
+    eff_max = eff_min if eff_max is None else eff_max
+    with np.errstate(divide="ignore", invalid="ignore"):
+        min_heat_rate = np.where(eff_min > 0, p_min / eff_min, 0.0)
+        incremental_heat_rate = np.where(eff_max > 0, 1.0 / eff_max, 0.0)
+    return {
+        "p_min": p_min,
+        "p_max": param(component, "max_electricity_output"),
+        "min_heat_rate": min_heat_rate,
+        "incremental_heat_rate": incremental_heat_rate,
+        "thermal": param(component, "thermal_efficiency"),
+        "aux": param(component, "aux_firing_efficiency", 0.0),
+    }
+
+
+class SparseBuilder:
+    """
+    Builds sparse MILPs of dispatch windows for one presolved plant.
+
+    Args:
+        topology (Topology): Compiled (presolved) topology
+        data_bindings (List[Binding]): Data binding table
+        parameter_bindings (List[Binding]): Parameter binding table
+        params (Dict[str, Any]): Parameters of the run
+        data (pd.DataFrame): Input data of the run
+        break_symmetry (bool, optional): Order the on/off states of the topology's
+            identical units. Defaults to True.
+        chp_formulation (str, optional): "standard" or "tight" CHP formulation.
+            Defaults to the topology's `chp_formulation`.
+    """
+
+    def __init__(
+        self,
+        topology: Topology,
+        data_bindings: List[Binding],
+        parameter_bindings: List[Binding],
+        params: Dict[str, Any],
+        data: pd.DataFrame,
+        break_symmetry: bool = True,
+        chp_formulation: Optional[str] = None,
+    ):
+        self.topology = topology
+        self.chp_formulation = chp_formulation or topology.chp_formulation
+        if self.chp_formulation not in CHP_FORMULATIONS:
+            raise ValueError(f"Unknown CHP formulation '{self.chp_formulation}'")
+        self.data = data
+        self.specs = {spec.name: spec for spec in topology.components}
+        self.component_data = resolve_component_data(
+            topology, data_bindings, parameter_bindings, params, data
+        )
+        self._check()
+        self.symmetry_groups = (
+            [g for g in topology.identical_units if self._identical(g)]
+            if break_symmetry
+            else []
+        )
+
+        # Connected variables share a column: union-find over (component, variable)
+        parent: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+        def find(node):
+            while parent.get(node, node) != node:
+                node = parent[node]
+            return node
+
+        names = [spec.name for spec in topology.components]
+        for source_index, source_var, target_index, target_var in topology.connections:
+            a = find((names[source_index], source_var))
+            b = find((names[target_index], target_var))
+            if a != b:
+                parent[b] = a
+
+        self.nodes = [
+            (spec.name, port)
+            for spec in topology.components
+            for port in component_ports(spec)
+        ]
+        self.root = {node: find(node) for node in self.nodes}
+
+    def _check(self):
+        """Fail early on missing CHP parameters"""
+        for spec in self.topology.components:
+            if spec.type != "CHP":
+                continue
+            chp = self.component_data[spec.name].params
+            missing = []
+            if "max_electricity_output" not in chp:
+                missing.append("max_electricity_output")
+            if not any(
+                k in chp
+                for k in ("min_electrical_efficiency", "electricity_efficiency")
+            ):
+                missing.append("min_electrical_efficiency or electricity_efficiency")
+            if "thermal_efficiency" not in chp:
+                missing.append("thermal_efficiency")
+            if missing:
+                raise ValueError(
+                    f"CHP '{spec.name}' misses parameters for the sparse builder: "
+                    f"{', '.join(missing)}"
+                )
+
+    def _identical(self, group: Tuple[str, ...]) -> bool:
+        """Whether the units of a group received the same bound values"""
+
+        def same(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+            return a.keys() == b.keys() and all(
+                np.array_equal(np.asarray(a[k]), np.asarray(b[k])) for k in a
+            )
+
+        first = self.component_data[group[0]]
+        for name in group[1:]:
+            other = self.component_data[name]
+            if not all(
+                same(getattr(first, kind), getattr(other, kind))
+                for kind in ("params", "lbound", "ubound", "values", "types")
+            ):
+                warnings.warn(
+                    f"Units {group} are declared identical but {name} differs from "
+                    f"{group[0]}; symmetry breaking skipped"
+                )
+                return False
+        return True
+
+    def node_bounds(self, node: Tuple[str, str], window: slice, T: int) -> tuple:
+        """
+        Bounds of one component variable over a window.
+
+        Args:
+            node (Tuple[str, str]): (component, variable)
+            window (slice): Periods of the window
+            T (int): Number of periods of the window
+
+        Returns:
+            tuple: (natural lower, natural upper) bounds of the variable type, lower
+                and upper bounds including the data (demand, capacities, fixings),
+                and whether the variable is integer
+        """
+        name, port = node
+        spec, component = self.specs[name], self.component_data[name]
+        lb, ub, is_int = component_ports(spec)[port]
+        lb, ub = np.full(T, float(lb)), np.full(T, float(ub))
+        natural = (lb, ub)
+        if port in component.lbound:
+            lb = np.maximum(lb, window_values(component.lbound[port], window, T))
+        if port in component.ubound:
+            ub = np.minimum(ub, window_values(component.ubound[port], window, T))
+        if component.types.get(port) == "PARAM" and port in component.values:
+            lb = ub = window_values(component.values[port], window, T)
+        if spec.type == "Demand" and port == "supply" and "demand" in component.params:
+            lb = ub = window_values(component.params["demand"], window, T)
+        if (
+            spec.type == "Storage"
+            and port == "soc"
+            and "max_charge" in component.params
+        ):
+            ub = np.minimum(
+                ub, window_values(component.params["max_charge"], window, T)
+            )
+        return natural, lb, ub, is_int
+
+    def build(
+        self,
+        window: slice,
+        initial_state: Optional[Dict[Tuple[str, str], float]] = None,
+        elastic_penalty: Optional[float] = None,
+    ) -> SparseProblem:
+        """
+        Build the MILP of one window.
+
+        Args:
+            window (slice): Periods of the window (positions in the input data)
+            initial_state (Dict[Tuple[str, str], float], optional): State before the
+                window: (storage, "soc") and (chp, "is_on"). Defaults to empty
+                storages and CHPs that are off.
+            elastic_penalty (float, optional): Elastic mode: bounds from the data
+                (demands, capacities, fixings) become rows with slack columns
+                `(component, "<variable>_shortfall")` and `"<variable>_excess"`,
+                penalized at this price. Defaults to None (hard bounds).
+
+        Returns:
+            SparseProblem: The window's problem
+        """
+        initial_state = initial_state or {}
+        T = len(range(*window.indices(len(self.data))))
+        asm = _ProblemAssembler(T)
+        prev = np.arange(T) - 1  # position of t-1 within the window, -1 for t=0
+
+        # Column bounds per node, intersected per shared column
+        lower: Dict[Tuple[str, str], np.ndarray] = {}
+        upper: Dict[Tuple[str, str], np.ndarray] = {}
+        integer: Dict[Tuple[str, str], bool] = {}
+        elastic: List[Tuple[Tuple[str, str], np.ndarray, np.ndarray]] = []
+        for node in self.nodes:
+            natural, lb, ub, is_int = self.node_bounds(node, window, T)
+            if elastic_penalty is not None:
+                if (lb > natural[0]).any() or (ub < natural[1]).any():
+                    elastic.append((node, lb, ub))
+                lb, ub = natural
+
+            root = self.root[node]
+            lower[root] = np.maximum(lower.get(root, lb), lb)
+            upper[root] = np.minimum(upper.get(root, ub), ub)
+            integer[root] = integer.get(root, False) or is_int
+
+        column_of = {
+            root: asm.add_columns(T, lower[root], upper[root], integer[root])
+            for root in dict.fromkeys(self.root.values())
+        }
+        columns = {node: column_of[self.root[node]] for node in self.nodes}
+
+        # Elastic bounds: lb - shortfall <= x <= ub + excess
+        for (name, port), lb, ub in elastic:
+            asm.component = name
+            x = columns[(name, port)]
+            for kind, bound, sign in (("shortfall", lb, 1.0), ("excess", ub, -1.0)):
+                active = np.isfinite(bound)
+                if not active.any():
+                    continue
+                slack = asm.add_columns(T, 0.0, np.where(active, INF, 0.0))
+                columns[(name, f"{port}_{kind}")] = slack
+                asm.add_cost(slack, np.full(T, float(elastic_penalty)))
+                # x + shortfall >= lb, x - excess <= ub
+                asm.add_rows(
+                    [(x, sign), (slack, 1.0)],
+                    np.where(active, sign * bound, -INF),
+                    INF,
+                )
+
+        def col(name, port):
+            return columns[(name, port)]
+
+        def param(component, name, default=None):
+            value = component.params.get(name, default)
+            return None if value is None else window_values(value, window, T)
+
+        for spec in self.topology.components:
+            name, component = spec.name, self.component_data[spec.name]
+            asm.component = name
+
+            if spec.type == "Market":
+                prices = param(component, "prices", 0.0)
+                asm.add_cost(col(name, "quantities"), prices)
+
+            elif spec.type == "PeakMarket":
+                month = calendar_months(self.data.index[window])
+                peak = asm.add_columns(month[-1] + 1, 0.0, INF)
+                columns[(name, "peak")] = peak
+                base = param(component, "base quantities", 0.0)
+                # peak_m - quantities_t >= -base_t, m the calendar month of t
+                asm.add_rows(
+                    [(peak[month], 1.0), (col(name, "quantities"), -1.0)],
+                    -base,
+                    INF,
+                )
+                prices = param(component, "prices", 0.0)
+                first = np.flatnonzero(np.r_[True, np.diff(month) > 0])
+                asm.add_cost(peak, prices[first])
+
+            elif spec.type == "Conversion":
+                factor = param(component, "conversion_factor", 1.0)
+                asm.add_rows(
+                    [(col(name, "output"), 1.0), (col(name, "input"), -factor)],
+                    0.0,
+                    0.0,
+                )
+
+            elif spec.type in ("Summation", "Splitter"):
+                total, prefix = (
+                    ("output", "input")
+                    if spec.type == "Summation"
+                    else ("input", "output")
+                )
+                terms = [(col(name, total), 1.0)] + [
+                    (col(name, f"{prefix}{i}"), -1.0) for i in range(spec.args[0])
+                ]
+                asm.add_rows(terms, 0.0, 0.0)
+
+            elif spec.type == "Storage":
+                soc = col(name, "soc")
+                soc_prev = np.where(prev >= 0, soc[prev], -1)
+                initial = np.zeros(T)
+                initial[0] = initial_state.get((name, "soc"), 0.0)
+                # soc_t - soc_{t-1} - charge_t + discharge_t = soc_init (t=0 only)
+                asm.add_rows(
+                    [
+                        (soc, 1.0),
+                        (soc_prev, -1.0),
+                        (col(name, "charge"), -1.0),
+                        (col(name, "discharge"), 1.0),
+                    ],
+                    initial,
+                    initial,
+                )
+
+            elif spec.type == "CHP":
+                self._add_chp(
+                    asm, name, component, col, param, prev, initial_state, columns
+                )
+
+        # Identical units: unit i is on whenever unit i+1 is. Any dispatch can be
+        # relabelled this way without extra start-ups, as long as the initial states
+        # are ordered too.
+        for group in self.symmetry_groups:
+            initial = [initial_state.get((name, "is_on"), 0.0) for name in group]
+            if any(a < b for a, b in zip(initial, initial[1:])):
+                continue
+            for first, second in zip(group, group[1:]):
+                asm.component = first
+                asm.add_rows(
+                    [(col(first, "is_on"), 1.0), (col(second, "is_on"), -1.0)],
+                    0.0,
+                    INF,
+                )
+
+        return asm.finish(columns)
+
+    def _add_chp(self, asm, name, component, col, param, prev, initial_state, columns):
+        T = asm.T
+        on = col(name, "is_on")
+        chp = chp_coefficients(component, param)
+        p_min, p_max = chp["p_min"], chp["p_max"]
+        thermal, aux = chp["thermal"], chp["aux"]
+
+        increment = asm.add_columns(T, 0.0, INF)
+        columns[(name, "electricity_increment")] = increment
+
+        # gas_in = gas_to_turbine + gas_to_aux_firing
+        asm.add_rows(
+            [
+                (col(name, "gas_in"), 1.0),
+                (col(name, "gas_to_turbine"), -1.0),
+                (col(name, "gas_to_aux_firing"), -1.0),
+            ],
+            0.0,
+            0.0,
+        )
+        # electricity_output = p_min * is_on + increment
+        asm.add_rows(
+            [(col(name, "electricity_output"), 1.0), (on, -p_min), (increment, -1.0)],
+            0.0,
+            0.0,
+        )
+        # increment <= (p_max - p_min) * is_on
+        asm.add_rows(
+            [(increment, 1.0), (on, -np.maximum(p_max - p_min, 0.0))], -INF, 0.0
+        )
+        # gas_to_turbine = p_min / eff_min * is_on + increment / eff_max
+        asm.add_rows(
+            [
+                (col(name, "gas_to_turbine"), 1.0),
+                (on, -chp["min_heat_rate"]),
+                (increment, -chp["incremental_heat_rate"]),
+            ],
+            0.0,
+            0.0,
+        )
+        # thermal_output = thermal * gas_to_turbine + aux * gas_to_aux_firing
+        asm.add_rows(
+            [
+                (col(name, "thermal_output"), 1.0),
+                (col(name, "gas_to_turbine"), -thermal),
+                (col(name, "gas_to_aux_firing"), -aux),
+            ],
+            0.0,
+            0.0,
+        )
+
+        # Start-up and shut-down: on_{t-1} is the initial state for t=0
+        on_prev = np.where(prev >= 0, on[prev], -1)
+        initial_on = np.zeros(T)
+        initial_on[0] = initial_state.get((name, "is_on"), 0.0)
+        if self.chp_formulation == "tight":
+            # is_starting_up_t - is_shutting_down_t - is_on_t + is_on_{t-1} = 0
+            asm.add_rows(
+                [
+                    (col(name, "is_starting_up"), 1.0),
+                    (col(name, "is_shutting_down"), -1.0),
+                    (on, -1.0),
+                    (on_prev, 1.0),
+                ],
+                -initial_on,
+                -initial_on,
+            )
+            # is_starting_up_t - is_on_t <= 0
+            asm.add_rows([(col(name, "is_starting_up"), 1.0), (on, -1.0)], -INF, 0.0)
+            # is_starting_up_t + is_on_{t-1} <= 1
+            asm.add_rows(
+                [(col(name, "is_starting_up"), 1.0), (on_prev, 1.0)],
+                -INF,
+                1.0 - initial_on,
+            )
+        else:
+            # is_starting_up_t - is_on_t + is_on_{t-1} >= 0
+            asm.add_rows(
+                [(col(name, "is_starting_up"), 1.0), (on, -1.0), (on_prev, 1.0)],
+                -initial_on,
+                INF,
+            )
+            # is_shutting_down_t + is_on_t - is_on_{t-1} >= 0
+            asm.add_rows(
+                [(col(name, "is_shutting_down"), 1.0), (on, 1.0), (on_prev, -1.0)],
+                initial_on,
+                INF,
+            )
+        # is_off_t + is_on_t = 1
+        asm.add_rows([(col(name, "is_off"), 1.0), (on, 1.0)], 1.0, 1.0)
+
+    def results(
+        self, problem: SparseProblem, x: np.ndarray, window: slice
+    ) -> pd.DataFrame:
+        """
+        Results of a solved window in the model_to_flex column layout.
+
+        Args:
+            problem (SparseProblem): The window's problem
+            x (np.ndarray): Solution vector
+            window (slice): Periods of the window
+
+        Returns:
+            pd.DataFrame: One column per component variable, prices and costs
+        """
+        T = problem.n_periods
+        out = {}
+        for spec in self.topology.components:
+            name, component = spec.name, self.component_data[spec.name]
+            for port in component_ports(spec):
+                out[f"{name}_{port}"] = x[problem.columns[(name, port)]]
+            if spec.type == "Market":
+                prices = window_values(component.params.get("prices", 0.0), window, T)
+                out[f"{name}_prices"] = prices
+                out[f"{name}_costs"] = prices * out[f"{name}_quantities"]
+            elif spec.type == "PeakMarket":
+                month = calendar_months(self.data.index[window])
+                out[f"{name}_peak"] = x[problem.columns[(name, "peak")]][month]
+            elif spec.type == "Demand" and "demand" in component.params:
+                out[f"{name}_demand"] = window_values(
+                    component.params["demand"], window, T
+                )
+        return pd.DataFrame(out, index=self.data.index[window])
+
+
+def shift_solution(
+    previous: SparseProblem, x: np.ndarray, shift: int, problem: SparseProblem
+) -> np.ndarray:
+    """
+    Shift the solution of the previous rolling window onto the next window.
+
+    Periods the two windows share take the previous values; periods beyond the end
+    of the previous window repeat its last period. Used as MIP start.
+
+    Args:
+        previous (SparseProblem): Problem of the previous window
+        x (np.ndarray): Solution of the previous window
+        shift (int): Periods between the starts of the two windows
+        problem (SparseProblem): Problem of the next window
+
+    Returns:
+        np.ndarray: Start vector for `problem`
+    """
+    start = np.zeros(problem.A.shape[1])
+    for node, columns in problem.columns.items():
+        old = previous.columns.get(node)
+        if old is None:
+            continue
+        if len(columns) != problem.n_periods or len(old) != previous.n_periods:
+            # Per-window columns, e.g. monthly peaks; extra ones repeat the last
+            start[columns] = x[old][np.minimum(np.arange(len(columns)), len(old) - 1)]
+            continue
+        overlap = old[shift:][: len(columns)]
+        start[columns[: len(overlap)]] = x[overlap]
+        start[columns[len(overlap) :]] = x[old[-1]]
+    return start
+
+
+# HiGHS presolve rule "Parallel rows and columns" (bit 12 of `presolve_rule_off`). On
+# the CHP windows it cuts off optimal solutions (highspy 1.7.2 returns "Optimal" with
+# the CHP never modulating) or declares feasible windows infeasible (highspy 1.15.1);
+# with the rule switched off, every monthly window of the Flex scenarios matches the
+# solution without presolve.
+PRESOLVE_PARALLEL_ROWS_AND_COLUMNS = 1 << 12
+HIGHS_OPTIONS = {
+    "output_flag": False,
+    "presolve_rule_off": PRESOLVE_PARALLEL_ROWS_AND_COLUMNS,
+}
+
+# Statuses after which a window is solved again without presolve
+RETRY_STATUSES = (
+    "Infeasible",
+    "Primal infeasible or unbounded",
+    "Unbounded",
+    "Unknown",
+    "Solve error",
+)
+
+# scipy.optimize.milp status codes as HiGHS model status strings
+SCIPY_MILP_STATUSES = {
+    0: "Optimal",
+    1: "Time limit reached",
+    2: "Infeasible",
+    3: "Unbounded",
+    4: "Unknown",
+}
+
+
+@dataclass
+class SolveResult:
+    """Solution of one sparse problem"""
+
+    status: str
+    x: Optional[np.ndarray]
+    objective: float
+    solve_time: float
+    presolve_retry: bool = False
+
+
+def to_highs(problem: SparseProblem, options: Optional[Dict[str, Any]] = None):
+    """
+    Load a sparse problem into a new HiGHS instance.
+
+    Args:
+        problem (SparseProblem): Problem to load
+        options (Dict[str, Any], optional): HiGHS options, applied on top of
+            `HIGHS_OPTIONS`. Defaults to None.
+
+    Returns:
+        highspy.Highs: HiGHS instance holding the problem
+    """
+    import highspy
+
+    h = highspy.Highs()
+    for key, value in {**HIGHS_OPTIONS, **(options or {})}.items():
+        h.setOptionValue(key, value)
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = problem.A.shape[1]
+    lp.num_row_ = problem.A.shape[0]
+    lp.col_cost_ = problem.c
+    lp.col_lower_ = problem.col_lower
+    lp.col_upper_ = problem.col_upper
+    lp.row_lower_ = problem.row_lower
+    lp.row_upper_ = problem.row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = problem.A.indptr
+    lp.a_matrix_.index_ = problem.A.indices
+    lp.a_matrix_.value_ = problem.A.data
+    if problem.integrality.any():
+        lp.integrality_ = [
+            highspy.HighsVarType.kInteger if i else highspy.HighsVarType.kContinuous
+            for i in problem.integrality
+        ]
+    h.passModel(lp)
+    return h
+
+
+def set_start(h, x: np.ndarray):
+    """Offer a solution vector to HiGHS as MIP start"""
+    import highspy
+
+    start = highspy.HighsSolution()
+    start.col_value = x
+    h.setSolution(start)
+
+
+def read_highs(h) -> Tuple[str, Optional[np.ndarray], float]:
+    """Status, solution (None without a feasible one) and objective of a solved instance"""
+    status = h.modelStatusToString(h.getModelStatus())
+    has_solution = h.getInfo().primal_solution_status == 2  # feasible
+    x = np.asarray(h.getSolution().col_value) if has_solution else None
+    objective = h.getInfo().objective_function_value if has_solution else np.nan
+    return status, x, objective
+
+
+def is_feasible(problem: SparseProblem, x: np.ndarray, tol: float = 1e-6) -> bool:
+    """Whether `x` satisfies the bounds, rows and integrality of `problem`"""
+    if x is None or len(x) != problem.A.shape[1] or not np.isfinite(x).all():
+        return False
+    row = problem.A @ x
+    integral = x[problem.integrality.astype(bool)]
+    return bool(
+        (x >= problem.col_lower - tol).all()
+        and (x <= problem.col_upper + tol).all()
+        and (row >= problem.row_lower - tol).all()
+        and (row <= problem.row_upper + tol).all()
+        and (np.abs(integral - np.round(integral)) <= tol).all()
+    )
+
+
+def needs_retry(
+    problem: SparseProblem,
+    status: str,
+    objective: float,
+    start: Optional[np.ndarray] = None,
+) -> bool:
+    """
+    Whether a HiGHS result is one presolve may have got wrong.
+
+    That is the case when no solution was found with a status from `RETRY_STATUSES`,
+    or when a feasible start is cheaper than the returned "optimum".
+
+    Args:
+        problem (SparseProblem): Solved problem
+        status (str): HiGHS model status
+        objective (float): Objective value, NaN without a solution
+        start (np.ndarray, optional): MIP start offered to the solver.
+            Defaults to None.
+
+    Returns:
+        bool: True if the problem should be solved again without presolve
+    """
+    if status in RETRY_STATUSES:
+        return True
+    if start is None or np.isnan(objective) or not is_feasible(problem, start):
+        return False
+    start_objective = float(problem.c @ start)
+    return start_objective < objective - 1e-6 * max(1.0, abs(objective))
+
+
+def _solve_once(
+    problem: SparseProblem, options: Dict[str, Any], start: Optional[np.ndarray]
+) -> Tuple[str, Optional[np.ndarray], float]:
+    """Solve once with highspy, or scipy.optimize.milp when highspy is missing"""
+    try:
+        import highspy  # noqa: F401
+    except ImportError:
+        from scipy.optimize import Bounds, LinearConstraint, milp
+
+        res = milp(
+            problem.c,
+            constraints=LinearConstraint(
+                problem.A, problem.row_lower, problem.row_upper
+            ),
+            bounds=Bounds(problem.col_lower, problem.col_upper),
+            integrality=problem.integrality,
+            options={
+                "disp": False,
+                "presolve": options.get("presolve", "on") != "off",
+                **{
+                    k: v
+                    for k, v in options.items()
+                    if k in ("time_limit", "mip_rel_gap")
+                },
+            },
+        )
+        status = SCIPY_MILP_STATUSES.get(res.status, "Unknown")
+        return status, res.x, res.fun if res.x is not None else np.nan
+
+    h = to_highs(problem, options)
+    if start is not None and problem.integrality.any():
+        set_start(h, start)
+    h.run()
+    return read_highs(h)
+
+
+def solve(
+    problem: SparseProblem,
+    options: Optional[Dict[str, Any]] = None,
+    start: Optional[np.ndarray] = None,
+) -> SolveResult:
+    """
+    Solve a sparse problem with HiGHS.
+
+    highspy is used when installed; otherwise scipy.optimize.milp, which ships the
+    same HiGHS solver (without MIP starts). Results presolve may have got wrong (see
+    `needs_retry`) are solved again with presolve off; the retried result is kept
+    if it is better.
+
+    Args:
+        problem (SparseProblem): Problem to solve
+        options (Dict[str, Any], optional): HiGHS options, e.g. {"time_limit": 60,
+            "mip_rel_gap": 1e-4}. Defaults to None.
+        start (np.ndarray, optional): MIP start, e.g. the shifted solution of the
+            previous window. Defaults to None.
+
+    Returns:
+        SolveResult: Status, solution and objective value
+    """
+    options = dict(options or {})
+    started = time.perf_counter()
+    status, x, objective = _solve_once(problem, options, start)
+
+    retried = options.get("presolve") != "off" and needs_retry(
+        problem, status, objective, start
+    )
+    if retried:
+        retry = _solve_once(problem, {**options, "presolve": "off"}, start)
+        if retry[1] is not None and (x is None or retry[2] <= objective):
+            status, x, objective = retry
+
+    return SolveResult(
+        status=status,
+        x=x,
+        objective=objective,
+        solve_time=time.perf_counter() - started,
+        presolve_retry=retried,
+    )
@@ -0,0 +1,341 @@
+"""
+Persistent temperature store for Open-Meteo archive data.
+
+The store keeps hourly 2m air temperature for Ghent, Belgium (51.07°N, 3.71°E)
+indexed by UTC hour. On first use it merges every Open-Meteo CSV export found in
+the data directory (read-only seeds) with its own store file, which lives in the
+untracked cache directory. Requests for a window only fetch the hours that are
+still missing, chunked per calendar year, and merge them into the store file.
+Windows are answered by slicing the in-memory series, so nothing is re-parsed
+between calls.
+
+Hours the archive could not supply are remembered as known gaps (in a JSON file
+next to the store file) and not requested again until `GAP_RECHECK_AFTER` has
+passed, since the archive fills in recent days with some delay.
+
+Example:
+    >>> store = get_temperature_store()
+    >>> temp = store.get("2024-01-01", "2024-02-01", fetch=False)
+"""
+
+import glob
+import json
+import os
+from io import StringIO
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+# Open-Meteo historical weather API
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+LATITUDE = 51.07
+LONGITUDE = 3.71
+
+# Merged store file (untracked) and the exports it is seeded from
+STORE_FILE = "data/cache/open-meteo-51.07N3.71E13m_store.csv"
+SEED_PATTERN = "data/open-meteo-51.07N3.71E13m*.csv"
+
+# Known gaps are requested again after this time
+GAP_RECHECK_AFTER = pd.Timedelta(days=7)
+
+# Header of the Open-Meteo CSV exports
+CSV_HEADER = (
+    "latitude,longitude,elevation,utc_offset_seconds,timezone,timezone_abbreviation\n"
+    "51.072056,3.7096772,13.0,0,GMT,GMT\n"
+    "\n"
+)
+TEMPERATURE_COLUMN = "temperature_2m (°C)"
+
+
+def read_open_meteo_csv(source) -> pd.Series:
+    """
+    Read an Open-Meteo CSV export into an hourly temperature series.
+
+    Args:
+        source: Path or file-like object with the CSV export
+
+    Returns:
+        pd.Series: Temperature (°C) indexed by UTC hour
+    """
+    temp = pd.read_csv(source, skiprows=2, encoding="latin-1")
+
+    # The temperature column name depends on the file encoding, so select by position
+    index = pd.to_datetime(temp.iloc[:, 0], format="%Y-%m-%dT%H:%M", utc=True)
+    series = pd.Series(temp.iloc[:, 1].values, index=pd.DatetimeIndex(index))
+    series.name = "temperature"
+    return series
+
+
+def write_open_meteo_csv(series: pd.Series, output_file: str):
+    """
+    Write an hourly temperature series in the Open-Meteo CSV export format.
+
+    Args:
+        series (pd.Series): Temperature (°C) with a timezone-aware index
+        output_file (str): Path of the CSV file to write
+    """
+    series_utc = series.tz_convert("UTC")
+    df_to_save = pd.DataFrame(
+        {
+            "time": series_utc.index.strftime("%Y-%m-%dT%H:%M"),
+            TEMPERATURE_COLUMN: series_utc.values,
+        }
+    )
+
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # Write to a temporary file first so an interrupted write never loses the store
+    tmp_file = f"{output_file}.tmp"
+    with open(tmp_file, "w", newline="", encoding="latin-1") as f:
+        f.write(CSV_HEADER)
+        df_to_save.to_csv(f, index=False)
+    os.replace(tmp_file, output_file)
+
+
+def _hour_range(start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+    """Return the UTC hours covering [start, end]."""
+    return pd.date_range(
+        start=start.tz_convert("UTC").floor("h"),
+        end=end.tz_convert("UTC").ceil("h"),
+        freq="h",
+    )
+
+
+def _split_per_year(
+    start: pd.Timestamp, end: pd.Timestamp
+) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Split the inclusive UTC range [start, end] at calendar year boundaries."""
+    chunks = []
+    while start <= end:
+        year_end = pd.Timestamp(year=start.year, month=12, day=31, hour=23, tz="UTC")
+        chunks.append((start, min(end, year_end)))
+        start = year_end + pd.Timedelta(hours=1)
+    return chunks
+
+
+def _runs(hours: pd.DatetimeIndex) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Split sorted hours into contiguous (first, last) runs."""
+    if hours.empty:
+        return []
+    breaks = hours.to_series().diff() != pd.Timedelta(hours=1)
+    run_id = breaks.cumsum().values
+    return [(hours[run_id == i][0], hours[run_id == i][-1]) for i in pd.unique(run_id)]
+
+
+def _within(gap: tuple, ranges: List[Tuple[pd.Timestamp, pd.Timestamp]]) -> bool:
+    """Whether a known gap lies inside one of the (first, last) ranges."""
+    return any(first <= gap[0] and gap[1] <= last for first, last in ranges)
+
+
+class TemperatureStore:
+    """Hourly temperature store indexed by UTC hour with incremental backfill"""
+
+    def __init__(
+        self,
+        store_file: str = STORE_FILE,
+        seed_pattern: Optional[str] = SEED_PATTERN,
+        url: str = ARCHIVE_URL,
+        latitude: float = LATITUDE,
+        longitude: float = LONGITUDE,
+        timeout: float = 60,
+    ):
+        self.store_file = store_file
+        self.seed_pattern = seed_pattern
+        self.url = url
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timeout = timeout
+        self.series: pd.Series = None
+        # First and last UTC hour of each known gap, and when it was last requested
+        self.gaps: List[Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]] = []
+
+    @property
+    def gaps_file(self) -> str:
+        """JSON file with the known gaps of the store file"""
+        return f"{os.path.splitext(self.store_file)[0]}_gaps.json"
+
+    def source_files(self) -> List[str]:
+        """Seed files and the store file (last, if it exists) the series is read from"""
+        files = sorted(glob.glob(self.seed_pattern)) if self.seed_pattern else []
+
+        # The store file goes last so its (most recent) values take precedence
+        files = [
+            path
+            for path in files
+            if os.path.abspath(path) != os.path.abspath(self.store_file)
+        ]
+        if os.path.exists(self.store_file):
+            files.append(self.store_file)
+        return files
+
+    def load(self) -> pd.Series:
+        """Merge the store file and all seed files into the in-memory series"""
+        parts = [read_open_meteo_csv(path) for path in self.source_files()]
+        if parts:
+            merged = pd.concat(parts)
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        else:
+            merged = pd.Series(
+                dtype=float, index=pd.DatetimeIndex([], tz="UTC"), name="temperature"
+            )
+
+        self.series = merged.dropna()
+
+        self.gaps = []
+        if os.path.exists(self.gaps_file):
+            with open(self.gaps_file, "r") as f:
+                self.gaps = [tuple(map(pd.Timestamp, gap)) for gap in json.load(f)]
+        return self.series
+
+    def _known_gaps(self, now: Optional[pd.Timestamp] = None) -> pd.DatetimeIndex:
+        """UTC hours of the known gaps that are not due for another request"""
+        now = pd.Timestamp.now(tz="UTC") if now is None else now
+        ranges = [
+            pd.date_range(first, last, freq="h")
+            for first, last, checked in self.gaps
+            if now - checked < GAP_RECHECK_AFTER
+        ]
+        if not ranges:
+            return pd.DatetimeIndex([], tz="UTC")
+        return ranges[0].append(ranges[1:])
+
+    def _ensure_loaded(self):
+        if self.series is None:
+            self.load()
+
+    def missing_ranges(
+        self, start: pd.Timestamp, end: pd.Timestamp
+    ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Find the UTC hour ranges in [start, end] that are not in the store (known
+        gaps excepted).
+
+        Args:
+            start (pd.Timestamp): Timezone-aware start of the window
+            end (pd.Timestamp): Timezone-aware end of the window
+
+        Returns:
+            List[Tuple[pd.Timestamp, pd.Timestamp]]: Inclusive (first, last) UTC hours
+                of each contiguous gap
+        """
+        self._ensure_loaded()
+        hours = _hour_range(start, end)
+        missing = hours[~hours.isin(self.series.index)]
+        missing = missing[~missing.isin(self._known_gaps())]
+        if missing.empty:
+            return []
+
+        return _runs(missing)
+
+    def fetch(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        """
+        Download one range from the archive API.
+
+        Args:
+            start (pd.Timestamp): First UTC hour to download
+            end (pd.Timestamp): Last UTC hour to download
+
+        Returns:
+            pd.Series: Temperature (°C) indexed by UTC hour
+        """
+        params = {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+            "hourly": "temperature_2m",
+            "format": "csv",
+        }
+        response = requests.get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return read_open_meteo_csv(StringIO(response.text))
+
+    def backfill(self, start: pd.Timestamp, end: pd.Timestamp) -> int:
+        """
+        Fetch the missing hours of [start, end], one request per year per gap.
+
+        Fetched data is merged into the store and written to the store file. Hours
+        the archive did not return are recorded as known gaps.
+
+        Args:
+            start (pd.Timestamp): Timezone-aware start of the window
+            end (pd.Timestamp): Timezone-aware end of the window
+
+        Returns:
+            int: Number of hours added to the store
+        """
+        gaps = self.missing_ranges(start, end)
+        if not gaps:
+            return 0
+
+        fetched = []
+        for gap_start, gap_end in gaps:
+            for chunk_start, chunk_end in _split_per_year(gap_start, gap_end):
+                print(
+                    f"Fetching temperature data {chunk_start:%Y-%m-%d} to {chunk_end:%Y-%m-%d}"
+                )
+                fetched.append(self.fetch(chunk_start, chunk_end))
+
+        n_before = len(self.series)
+        merged = pd.concat([self.series] + fetched)
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        self.series = merged.dropna()
+
+        # Requested hours still missing: remember them instead of asking every call
+        now = pd.Timestamp.now(tz="UTC")
+        self.gaps = [gap for gap in self.gaps if not _within(gap, gaps)]
+        for first, last in gaps:
+            hours = pd.date_range(first, last, freq="h")
+            still_missing = hours[~hours.isin(self.series.index)]
+            self.gaps += [(a, b, now) for a, b in _runs(still_missing)]
+
+        self.save()
+        return len(self.series) - n_before
+
+    def save(self):
+        """Write the merged series to the store file and the known gaps next to it"""
+        write_open_meteo_csv(self.series, self.store_file)
+        with open(self.gaps_file, "w") as f:
+            json.dump([[t.isoformat() for t in gap] for gap in self.gaps], f, indent=2)
+        print(f"Temperature store saved to {self.store_file}")
+
+    def get(self, starttime, endtime, fetch: bool = True) -> pd.Series:
+        """
+        Return the hourly temperature covering [starttime, endtime].
+
+        The window is extended to whole UTC hours so that callers can interpolate
+        to sub-hourly frequencies at the edges.
+
+        Args:
+            starttime: Timezone-aware start timestamp
+            endtime: Timezone-aware end timestamp
+            fetch (bool, optional): Whether to backfill missing hours from the
+                archive API. Defaults to True.
+
+        Returns:
+            pd.Series: Temperature (°C) indexed by UTC hour. Hours that are not
+                available are absent from the series.
+        """
+        start = pd.Timestamp(starttime)
+        end = pd.Timestamp(endtime)
+
+        self._ensure_loaded()
+        if fetch:
+            self.backfill(start, end)
+
+        hours = _hour_range(start, end)
+        return self.series.loc[hours[0] : hours[-1]]
+
+
+_default_store: Optional[TemperatureStore] = None
+
+
+def get_temperature_store() -> TemperatureStore:
+    """Return the process-wide default temperature store"""
+    global _default_store
+    if _default_store is None:
+        _default_store = TemperatureStore()
+    return _default_store
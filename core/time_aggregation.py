@@ -0,0 +1,339 @@
+"""
+Representative-period time aggregation for screening runs.
+
+The input feature matrix of a run (prices, demands, temperature, capacities) is cut
+into periods of equal length (days or weeks), clustered with k-means, and every
+cluster is represented by its medoid: the actual period closest to the cluster
+centre. Only the k representative periods are dispatched, each as an independent
+window; annual figures are recovered by weighting every representative with the
+number of periods it stands for.
+
+Example:
+    >>> periods = cluster_periods(data, k=12, period_length=24)
+    >>> plant = presolve_plant("core.model_bis", params, periods.data)
+    >>> solved = dispatch_representative(plant, periods)
+    >>> report = aggregation_error(solved.KPIs["annual"], full.KPIs["annual"])
+"""
+
+import warnings
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.cluster.vq import kmeans2
+
+from core.dispatch import PRECHECK_MODES, DispatchResult, dispatch_sparse
+from core.precheck import check_inputs
+from core.presolve import PresolvedPlant
+from core.solver_session import SolverSession
+from core.sparse_builder import resolve_component_data
+
+
+@dataclass
+class RepresentativePeriods:
+    """
+    Representative periods of a feature matrix.
+
+    Attributes:
+        data (pd.DataFrame): Rows of the representative periods, in time order
+        period_length (int): Rows per period
+        representatives (np.ndarray): Index of the original period behind each
+            representative
+        weights (np.ndarray): Number of original periods per representative
+        labels (np.ndarray): Representative (position in `representatives`) of
+            every original period
+        index (pd.Index): Index of the full feature matrix
+    """
+
+    data: pd.DataFrame
+    period_length: int
+    representatives: np.ndarray
+    weights: np.ndarray
+    labels: np.ndarray
+    index: pd.Index
+
+    @property
+    def windows(self) -> List[tuple]:
+        """One dispatch window (slice, periods kept) per representative period"""
+        starts = np.arange(len(self.representatives)) * self.period_length
+        stops = np.minimum(starts + self.period_length, len(self.data))
+        return [(slice(s, e), e - s) for s, e in zip(starts, stops)]
+
+    @property
+    def row_weights(self) -> np.ndarray:
+        """Weight of every row of `data`"""
+        return np.repeat(self.weights, self.period_length)[: len(self.data)]
+
+    def expand(self, results: pd.DataFrame) -> pd.DataFrame:
+        """
+        Approximate full-horizon timeseries: every original period takes the
+        results of its representative.
+
+        Args:
+            results (pd.DataFrame): Results of the representative periods
+
+        Returns:
+            pd.DataFrame: Results on the index of the full feature matrix
+        """
+        positions = (
+            self.labels[:, None] * self.period_length
+            + np.arange(self.period_length)[None, :]
+        ).ravel()[: len(self.index)]
+        positions = np.minimum(positions, len(results) - 1)
+        expanded = results.iloc[positions].copy()
+        expanded.index = self.index
+        return expanded
+
+
+def cluster_periods(
+    data: pd.DataFrame,
+    k: int = 12,
+    period_length: int = 24,
+    columns: Optional[List[str]] = None,
+    seed: int = 0,
+) -> RepresentativePeriods:
+    """
+    Cluster the periods of a feature matrix into k representative periods.
+
+    Columns are scaled to [0, 1] before clustering so prices and demands weigh
+    alike. A trailing incomplete period is kept as its own representative.
+
+    Args:
+        data (pd.DataFrame): Feature matrix of the run, e.g. from `get_data`
+        k (int, optional): Number of representative periods. Defaults to 12.
+        period_length (int, optional): Rows per period, e.g. 24 for days of hourly
+            data or 168 for weeks. Defaults to 24.
+        columns (List[str], optional): Columns to cluster on. Defaults to all
+            numeric columns.
+        seed (int, optional): Seed of the k-means initialisation. Defaults to 0.
+
+    Returns:
+        RepresentativePeriods: Representative periods with weights
+    """
+    if columns is None:
+        columns = list(data.select_dtypes(include="number").columns)
+    n_periods = len(data) // period_length
+    if n_periods == 0:
+        raise ValueError(f"Less than one period of {period_length} rows")
+    k = min(k, n_periods)
+
+    values = data[columns].to_numpy(dtype=np.float64)
+    span = np.ptp(values, axis=0)
+    scaled = (values - values.min(axis=0)) / np.where(span > 0, span, 1.0)
+    features = scaled[: n_periods * period_length].reshape(n_periods, -1)
+
+    centroids, labels = kmeans2(features, k, minit="++", seed=seed)
+    used = np.unique(labels)  # k-means may leave clusters empty
+
+    medoids = []
+    for cluster in used:
+        members = np.flatnonzero(labels == cluster)
+        distances = np.linalg.norm(features[members] - centroids[cluster], axis=1)
+        medoids.append(members[np.argmin(distances)])
+    order = np.argsort(medoids)  # representatives in time order
+    medoids = np.asarray(medoids)[order]
+    position = {cluster: i for i, cluster in enumerate(used[order])}
+    labels = np.array([position[label] for label in labels])
+    weights = np.bincount(labels, minlength=len(medoids)).astype(float)
+
+    rows = [np.arange(m * period_length, (m + 1) * period_length) for m in medoids]
+    if len(data) > n_periods * period_length:
+        # Trailing incomplete period represents itself
+        medoids = np.append(medoids, n_periods)
+        weights = np.append(weights, 1.0)
+        labels = np.append(labels, len(medoids) - 1)
+        rows.append(np.arange(n_periods * period_length, len(data)))
+
+    return RepresentativePeriods(
+        data=data.iloc[np.concatenate(rows)],
+        period_length=period_length,
+        representatives=medoids,
+        weights=weights,
+        labels=labels,
+        index=data.index,
+    )
+
+
+def annual_kpis(
+    plant: PresolvedPlant, periods: RepresentativePeriods, results: pd.DataFrame
+) -> Dict[str, float]:
+    """
+    Scale the costs of the representative periods to the full horizon.
+
+    Market costs and quantities are weighted sums. Peak (capacity tariff) costs are
+    charged per calendar month on the largest peak of the representatives of the
+    periods in that month, at the price of the month's first period (as the
+    builder prices the peaks of a window).
+
+    Args:
+        plant (PresolvedPlant): Plant dispatched on the representative periods
+        periods (RepresentativePeriods): The representative periods
+        results (pd.DataFrame): Results of the representative periods
+
+    Returns:
+        Dict[str, float]: Totals per cost and quantity column, and "total_costs"
+    """
+    weights = periods.row_weights
+    kpis = {
+        column: float(results[column].to_numpy() @ weights)
+        for column in results.columns
+        if column.endswith("_costs") or column.endswith("_quantities")
+    }
+
+    component_data = resolve_component_data(
+        plant.topology,
+        plant.data_bindings,
+        plant.parameter_bindings,
+        plant.params,
+        plant.data,
+    )
+    index = periods.index
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(index)
+    period_month = index[:: periods.period_length].to_period("M")
+    for spec in plant.topology.components:
+        if spec.type != "PeakMarket" or f"{spec.name}_peak" not in results:
+            continue
+        prices = np.broadcast_to(
+            np.ravel(component_data[spec.name].params.get("prices", 0.0)),
+            (len(plant.data),),
+        )
+        peaks = results[f"{spec.name}_peak"].to_numpy()[:: periods.period_length]
+        monthly = (
+            pd.DataFrame(
+                {
+                    "peak": peaks[periods.labels],
+                    "price": prices[:: periods.period_length][periods.labels],
+                }
+            )
+            .groupby(period_month)
+            .agg(peak=("peak", "max"), price=("price", "first"))
+        )
+        kpis[f"{spec.name}_costs"] = float(monthly["peak"] @ monthly["price"])
+
+    kpis["total_costs"] = sum(v for key, v in kpis.items() if key.endswith("_costs"))
+    return kpis
+
+
+def dispatch_representative(
+    plant: PresolvedPlant,
+    periods: RepresentativePeriods,
+    solver_options: Optional[Dict[str, Any]] = None,
+    heuristic_start: bool = True,
+    heuristic_only: bool = False,
+    session: Optional[SolverSession] = None,
+    scaling: bool = False,
+    elastic: bool = False,
+    iis: bool = False,
+    precheck: str = "off",
+) -> DispatchResult:
+    """
+    Dispatch the representative periods as independent windows.
+
+    Args:
+        plant (PresolvedPlant): Plant presolved on `periods.data`
+        periods (RepresentativePeriods): The representative periods
+        solver_options (Dict[str, Any], optional): HiGHS options. Defaults to None.
+        heuristic_start (bool, optional): Merit-order MIP start. Defaults to True.
+        heuristic_only (bool, optional): Merit-order dispatch only. Defaults to False.
+        session (SolverSession, optional): Solver session. Defaults to None.
+        scaling (bool, optional): Scale each window before solving. Defaults to
+            False.
+        elastic (bool, optional): Diagnose infeasible windows with an elastic
+            re-solve instead of failing. Defaults to False.
+        iis (bool, optional): Extract an IIS of every infeasible window. Defaults
+            to False.
+        precheck (str, optional): Input pre-check, see `core.dispatch.dispatch`.
+            "shorten" only flags: representative periods are dispatched whole.
+            Defaults to "off".
+
+    Returns:
+        DispatchResult: Results on the full horizon (each period takes the results of
+            its representative), with annual totals in KPIs["annual"]
+
+    Raises:
+        ValueError: If `precheck` is unknown
+    """
+    if precheck not in PRECHECK_MODES:
+        raise ValueError(f"Unknown precheck mode '{precheck}'")
+    report = None
+    if precheck != "off":
+        report = check_inputs(plant)
+        if not report.feasible:
+            print(report.summary())
+            if precheck == "shorten":
+                warnings.warn(
+                    "Infeasible periods are only flagged: representative periods "
+                    "are dispatched whole"
+                )
+
+    solved = dispatch_sparse(
+        plant,
+        None,
+        solver_options=solver_options,
+        session=session,
+        heuristic_start=heuristic_start,
+        heuristic_only=heuristic_only,
+        windows=periods.windows,
+        carry_state=False,
+        scaling=scaling,
+        elastic=elastic,
+        iis=iis,
+    )
+    kpis = dict(solved.KPIs)
+    kpis["annual"] = annual_kpis(plant, periods, solved.results)
+    kpis["representative_periods"] = len(periods.representatives)
+    if report is not None:
+        kpis["precheck"] = report
+    return DispatchResult(results=periods.expand(solved.results), KPIs=kpis)
+
+
+def full_kpis(plant: PresolvedPlant, results: pd.DataFrame) -> Dict[str, float]:
+    """
+    Totals of a full-horizon run in the layout of `annual_kpis`.
+
+    Peak costs are charged per calendar month on the monthly maximum.
+
+    Args:
+        plant (PresolvedPlant): Plant of the full run
+        results (pd.DataFrame): Results of the full run
+
+    Returns:
+        Dict[str, float]: Totals per cost and quantity column, and "total_costs"
+    """
+    index = results.index
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(index)
+    periods = RepresentativePeriods(
+        data=results,
+        period_length=1,
+        representatives=np.arange(len(results)),
+        weights=np.ones(len(results)),
+        labels=np.arange(len(results)),
+        index=index,
+    )
+    return annual_kpis(plant, periods, results)
+
+
+def aggregation_error(
+    approximate: Dict[str, float], full: Dict[str, float]
+) -> pd.DataFrame:
+    """
+    Compare annual figures of an aggregated run with the full run.
+
+    Args:
+        approximate (Dict[str, float]): KPIs["annual"] of the aggregated run
+        full (Dict[str, float]): Same figures of the full run (see `full_kpis`)
+
+    Returns:
+        pd.DataFrame: Aggregated, full, absolute and relative error per figure
+    """
+    report = pd.DataFrame(
+        {"aggregated": pd.Series(approximate), "full": pd.Series(full)}
+    ).dropna()
+    report["error"] = report["aggregated"] - report["full"]
+    report["relative_error"] = report["error"] / report["full"].abs().where(
+        report["full"] != 0
+    )
+    return report
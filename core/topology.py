@@ -0,0 +1,275 @@
+"""
+Declarative plant topologies.
+
+A topology file (JSON, in `core/topologies`) lists the components of a plant graph
+and the connections between their variables:
+
+    {
+      "name": "model_bis",
+      "description": "...",
+      "components": [
+        {"name": "chp", "type": "CHP"},
+        {"name": "gas_boiler", "type": "Conversion", "kwargs": {"conversion_factor": 1.0}},
+        {"name": "Gas offtake", "type": "Market", "kwargs": {"quantities_lbounds": 0},
+         "variable_types": {"quantities": "VARIABLE"}},
+        {"name": "captar", "type": "PeakMarket", "values": {"base quantities": 0}},
+        {"name": "heat_supply", "type": "Summation", "args": [3]}
+      ],
+      "connections": [["Gas offtake.quantities", "gas_consumption.input"], ...],
+      "identical_units": [["chp1", "chp2"]],
+      "chp_formulation": "tight"
+    }
+
+`identical_units` (optional) lists groups of interchangeable CHPs: same parameters,
+connected alike. The sparse builder orders their on/off states (unit 1 runs
+whenever unit 2 runs, ...) so branch-and-bound does not explore mirror-image
+solutions.
+
+`chp_formulation` (optional) selects the CHP formulation of the sparse builder for
+this model: "standard" (default) or "tight", see `core/sparse_builder.py`.
+
+`load_topology` validates a file and compiles it into a `Topology` with a
+precomputed connection index. Compiled topologies are cached by the SHA-256 of the
+file content, so a file is only parsed and validated again after it changed.
+`build_model_from_topology` instantiates the components and wires them up.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import model_to_flex.component_library as components
+from model_to_flex.core.Model import model
+from model_to_flex.core.enums import VariableType
+
+TOPOLOGY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "topologies")
+
+# Component types that can be used in a topology file
+COMPONENT_TYPES = (
+    "CHP",
+    "Conversion",
+    "Demand",
+    "Market",
+    "PeakMarket",
+    "Splitter",
+    "Storage",
+    "Summation",
+)
+
+# CHP formulations of the sparse builder
+CHP_FORMULATIONS = ("standard", "tight")
+
+# Components with numbered ports: type -> (prefix of the numbered ports, fixed ports)
+NUMBERED_PORTS = {
+    "Summation": ("input", ("output",)),
+    "Splitter": ("output", ("input",)),
+}
+
+
+class TopologyError(ValueError):
+    """Raised when a topology file is invalid"""
+
+
+@dataclass(frozen=True)
+class ComponentSpec:
+    """One component of a topology"""
+
+    name: str
+    type: str
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    variable_types: Dict[str, str] = field(default_factory=dict)
+    values: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class Topology:
+    """
+    Compiled topology.
+
+    `connections` holds (source component index, source variable, target component
+    index, target variable) tuples, with indices into `components`.
+    `identical_units` holds groups of names of interchangeable CHPs.
+    `chp_formulation` is one of `CHP_FORMULATIONS`.
+    """
+
+    name: str
+    digest: str
+    components: Tuple[ComponentSpec, ...]
+    connections: Tuple[Tuple[int, str, int, str], ...]
+    description: str = ""
+    identical_units: Tuple[Tuple[str, ...], ...] = ()
+    chp_formulation: str = "standard"
+
+
+def _parse_endpoint(endpoint: str, index: Dict[str, int]) -> Tuple[int, str]:
+    name, sep, var = endpoint.partition(".")
+    if not sep or not var:
+        raise TopologyError(
+            f"Connection endpoint must be 'component.variable': {endpoint}"
+        )
+    if name not in index:
+        raise TopologyError(f"Connection refers to unknown component: {endpoint}")
+    return index[name], var
+
+
+def _check_port(spec: ComponentSpec, var: str, endpoint: str):
+    """Check numbered ports of summations and splitters against their size"""
+    if spec.type not in NUMBERED_PORTS or not spec.args:
+        return
+    prefix, fixed = NUMBERED_PORTS[spec.type]
+    ports = set(fixed) | {f"{prefix}{i}" for i in range(spec.args[0])}
+    if var not in ports:
+        raise TopologyError(f"{spec.type} '{spec.name}' has no port {var}: {endpoint}")
+
+
+def compile_topology(raw: dict, digest: str = "") -> Topology:
+    """
+    Validate a parsed topology description and compile it.
+
+    Args:
+        raw (dict): Parsed topology file
+        digest (str, optional): Hash of the source file. Defaults to "".
+
+    Returns:
+        Topology: Compiled topology
+
+    Raises:
+        TopologyError: If the description is invalid
+    """
+    if not isinstance(raw.get("components"), list) or not raw["components"]:
+        raise TopologyError("Topology has no components")
+
+    specs = []
+    index: Dict[str, int] = {}
+    for item in raw["components"]:
+        name = item.get("name")
+        if not name or "." in name:
+            raise TopologyError(f"Invalid component name: {name!r}")
+        if name in index:
+            raise TopologyError(f"Duplicate component name: {name}")
+        if item.get("type") not in COMPONENT_TYPES:
+            raise TopologyError(
+                f"Unknown component type for {name}: {item.get('type')}"
+            )
+        for var, var_type in item.get("variable_types", {}).items():
+            if var_type not in VariableType.__members__:
+                raise TopologyError(
+                    f"Unknown variable type for {name}.{var}: {var_type}"
+                )
+
+        index[name] = len(specs)
+        specs.append(
+            ComponentSpec(
+                name=name,
+                type=item["type"],
+                args=tuple(item.get("args", ())),
+                kwargs=dict(item.get("kwargs", {})),
+                variable_types=dict(item.get("variable_types", {})),
+                values=dict(item.get("values", {})),
+            )
+        )
+
+    connections = []
+    for connection in raw.get("connections", []):
+        if len(connection) != 2:
+            raise TopologyError(f"Connection must have two endpoints: {connection}")
+        source, target = connection
+        source_index, source_var = _parse_endpoint(source, index)
+        target_index, target_var = _parse_endpoint(target, index)
+        _check_port(specs[source_index], source_var, source)
+        _check_port(specs[target_index], target_var, target)
+        connections.append((source_index, source_var, target_index, target_var))
+
+    groups = []
+    for group in raw.get("identical_units", []):
+        unknown = [name for name in group if name not in index]
+        if unknown:
+            raise TopologyError(
+                f"Identical units refer to unknown components: {unknown}"
+            )
+        if len(set(group)) < 2 or any(specs[index[n]].type != "CHP" for n in group):
+            raise TopologyError(f"Identical units must be two or more CHPs: {group}")
+        groups.append(tuple(group))
+
+    chp_formulation = raw.get("chp_formulation", "standard")
+    if chp_formulation not in CHP_FORMULATIONS:
+        raise TopologyError(
+            f"Unknown chp_formulation '{chp_formulation}', "
+            f"expected one of {', '.join(CHP_FORMULATIONS)}"
+        )
+
+    return Topology(
+        name=raw.get("name", ""),
+        digest=digest,
+        components=tuple(specs),
+        connections=tuple(connections),
+        description=raw.get("description", ""),
+        identical_units=tuple(groups),
+        chp_formulation=chp_formulation,
+    )
+
+
+_compiled: Dict[str, Topology] = {}
+
+
+def load_topology(path: str) -> Topology:
+    """
+    Load and compile a topology file, reusing the compiled graph if the file is unchanged.
+
+    Args:
+        path (str): Path of the topology file, or a file name in TOPOLOGY_DIR
+
+    Returns:
+        Topology: Compiled topology
+    """
+    if not os.path.exists(path):
+        path = os.path.join(TOPOLOGY_DIR, path)
+    with open(path, "rb") as f:
+        content = f.read()
+
+    digest = hashlib.sha256(content).hexdigest()
+    if digest not in _compiled:
+        try:
+            raw = json.loads(content.decode("utf-8"))
+        except json.JSONDecodeError as e:
+            raise TopologyError(f"Invalid topology file {path}: {e}") from e
+        _compiled[digest] = compile_topology(raw, digest)
+    return _compiled[digest]
+
+
+def build_model_from_topology(topology: Topology) -> model.Model:
+    """
+    Instantiate and wire up the components of a compiled topology.
+
+    Args:
+        topology (Topology): Compiled topology
+
+    Returns:
+        model.Model: Model without data or parameter methods
+    """
+    m = model.Model()
+    instances: List[Any] = []
+    for spec in topology.components:
+        component = getattr(components, spec.type)(spec.name, *spec.args, **spec.kwargs)
+        for var, var_type in spec.variable_types.items():
+            component.vars[var].type = VariableType[var_type]
+        for name, value in spec.values.items():
+            component.set_values(name, value)
+        m.add(component)
+        instances.append(component)
+
+    for source_index, source_var, target_index, target_var in topology.connections:
+        try:
+            source = instances[source_index].vars[source_var]
+            target = instances[target_index].vars[target_var]
+        except KeyError as e:
+            raise TopologyError(
+                f"Unknown variable {e} in connection "
+                f"{topology.components[source_index].name}.{source_var} -> "
+                f"{topology.components[target_index].name}.{target_var}"
+            ) from e
+        m.connect(source, target)
+    return m
@@ -15,6 +15,13 @@ def define_scenarios():
 
     # For each row, create a Scenario and add to manager
     for _, row in df.iterrows():
+        # The CHP policy is not in the Excel sheet unless a `chp_policy` column is added;
+        # otherwise keep the policy of the scenario already defined
+        existing = manager.get_scenario(row["Name"])
+        chp_policy = row.get(
+            "chp_policy", existing.chp_policy if existing else "economic"
+        )
+
         scenario = Scenario(
             name=row["Name"],
             description=row["description"],
@@ -59,6 +66,7 @@ def define_scenarios():
             gas_offtake_contract_param_a=int(row["gas_offtake_contract_param_a"]),
             gas_offtake_contract_param_b=float(row["gas_offtake_contract_param_b"]),
             gas_grid_cost_energy=int(row["gas_grid_cost_energy"]),
+            chp_policy=chp_policy,
         )
         manager.add_scenario(scenario)
 
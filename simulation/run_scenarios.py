@@ -1,48 +1,52 @@
 import os
+import warnings
 
 os.chdir(Path(__file__).parent.parent)
 print(f"Working directory: {os.getcwd()}")
 
 from datetime import datetime
+from typing import Any, Dict, Tuple
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
 from simulation.scenarios import Scenario, ScenarioManager
 from simulation.define_scenarios import define_scenarios
-from core.data_generator import get_data
-from core.model_bis import get_model
+from core.data_generator import compact_frame
+from core.feature_store import get_feature_store
+from core.dispatch import dispatch
+from core.enums import BuilderType
+from core.presolve import fill_removed_results, presolve_plant
+from core.solver_session import get_solver_session
+from core.time_aggregation import cluster_periods, dispatch_representative
+from core.formulation_benchmark import benchmark_formulations, summarize_benchmark
 
 # import kronos
-from model_to_flex.core.dispatch import dispatch
 from model_to_flex.core.io_utils.save_results import save_results
 
 
-def run_scenario(scenario_name: str):
-    """Run a specific scenario"""
-    # Load scenario
-    manager = ScenarioManager()
-    scenario = manager.get_scenario(scenario_name)
+def scenario_inputs(scenario: Scenario) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Input data and parameters of a scenario, ready for `presolve_plant`
 
-    if scenario is None:
-        print(f"Scenario '{scenario_name}' not found!")
-        return
+    Args:
+        scenario (Scenario): The scenario
 
-    print(f"Running scenario: {scenario.name}")
-    print(f"Description: {scenario.description}")
-
-    # Generate data
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, Any]]: Input data and parameters
+    """
+    # Generate data (shared feature matrix, built once per data window)
     print("Generating data...")
-    data = get_data(
+    data = get_feature_store().get_window(
         price_starttime=scenario.price_starttime,
         demand_starttime=scenario.demand_starttime,
         length=scenario.length,
         freq=scenario.freq,
-        save_to_csv=False,
         use_local_data=True,
     )
+    if scenario.compact_dtypes:
+        # float32 values, int64 epoch timestamps, categorical flags
+        data = compact_frame(data)
     print("Data generated")
 
-    # pring all scenario attributes
-    for k, v in scenario.__dict__.items():
-        print(f"{k}: {v}")
-
     data["electricity_offtake_price"] = (
         (
             scenario.elec_offtake_contract_param_a * data["da_price"]
@@ -61,23 +65,6 @@ def run_scenario(scenario_name: str):
         + scenario.gas_offtake_contract_param_b
     ) + scenario.gas_grid_cost_energy
 
-    # Load model
-    print("Loading model...")
-    model = get_model()
-    print("Model loaded")
-
-    # Prepare dispatch options
-    print("Preparing dispatch options...")
-    dispatch_opts = {
-        "optimizer_type": scenario.optimizer_type,
-        "builder_type": scenario.builder_type,
-        "solver": scenario.solver,
-        "dispatch_type": scenario.dispatch_type,
-        "pred_hor": scenario.pred_hor,
-        "contr_hor": scenario.contr_hor,
-    }
-    print("Dispatch options prepared")
-
     # Prepare parameters
     print("Preparing parameters...")
     params = {
@@ -93,7 +80,7 @@ def run_scenario(scenario_name: str):
 
     # Calculate temperature scaling and low demand conditions
 
-    temperature_scaling = (6.550 - 0.045 * (data["temperature"])) / 6.550
+    temperature_scaling = data["temperature_scaling"]
 
     # low_electricity_demand = (
     #     data["electricity_demand"] < scenario.gas_turbine_minload_electricity_capacity
@@ -107,7 +94,9 @@ def run_scenario(scenario_name: str):
     # low_demand = low_electricity_demand | low_heat_demand
     low_demand = low_heat_demand
 
-    data["low_demand"] = low_demand
+    data["low_demand"] = (
+        low_demand.astype("category") if scenario.compact_dtypes else low_demand
+    )
 
     # Set temperature dependent efficiencies
     data["gas_turbine_minload_electricity_efficiency"] = (
@@ -150,45 +139,125 @@ def run_scenario(scenario_name: str):
     #     / data["gas_turbine_maxload_electricity_efficiency"] * params["gas_turbine_maxload_heat_efficiency"]
     # )
 
-    # penalty to prevent the CHP to be used
-    if scenario.name in [
-        "Flex_0",
-        "Flex_4",
-        "Flex_5.1",
-        "Flex_5.11",
-        "Flex_5.2",
-        "Flex_5.3",
-    ]:
-        params["penalty_for_gas_to_turbine"] = -100000
-    else:
-        params["penalty_for_gas_to_turbine"] = 0
-
-    # penalty to prevent the CHP from shutting down; only modulation possible.
-    if scenario.name in [
-        "Flex_0",
-        "Flex_1.1",
-        "Flex_1.2",
-        "Flex_1.3",
-        "Flex_1.4",
-        "Flex_1.5",
-    ]:
-        params["penalty_turbine_no_shutdown"] = -100000
+    # CHP policies are enforced by fixing variables (scenario.chp_policy), so the
+    # penalty markets are unused and removed by the presolve
+    params["penalty_for_gas_to_turbine"] = 0
+    params["penalty_turbine_no_shutdown"] = 0
+
+    return data, params
+
+
+def run_scenario(scenario_name: str, representative_days: int = None):
+    """
+    Run a specific scenario
+
+    Args:
+        scenario_name (str): Name of the scenario
+        representative_days (int, optional): Screening mode: dispatch only this many
+            representative days (sparse builder, or merit order if the scenario
+            uses it, with the scenario's dispatch options) and scale the KPIs to
+            the full horizon. Defaults to None (full horizon).
+    """
+    # Load scenario
+    manager = ScenarioManager()
+    scenario = manager.get_scenario(scenario_name)
+
+    if scenario is None:
+        print(f"Scenario '{scenario_name}' not found!")
+        return
+
+    print(f"Running scenario: {scenario.name}")
+    print(f"Description: {scenario.description}")
+
+    data, params = scenario_inputs(scenario)
+
+    # pring all scenario attributes
+    for k, v in scenario.__dict__.items():
+        print(f"{k}: {v}")
+
+    # Prepare dispatch options
+    print("Preparing dispatch options...")
+    dispatch_opts = {
+        "optimizer_type": scenario.optimizer_type,
+        "builder_type": scenario.builder_type,
+        "solver": scenario.solver,
+        "dispatch_type": scenario.dispatch_type,
+        "pred_hor": scenario.pred_hor,
+        "contr_hor": scenario.contr_hor,
+        "persistent_solver": scenario.persistent_solver,
+        "heuristic_start": scenario.heuristic_start,
+        "workers": scenario.workers,
+        "scaling": scenario.scaling,
+        "elastic": scenario.elastic,
+        "iis": scenario.iis,
+        "precheck": scenario.precheck,
+    }
+    print("Dispatch options prepared")
+
+    if representative_days:
+        # Screening: dispatch representative days only, results mapped back per day
+        rows_per_day = int(
+            pd.Timedelta("1D") / pd.to_timedelta(to_offset(scenario.freq))
+        )
+        periods = cluster_periods(
+            data, k=representative_days, period_length=rows_per_day
+        )
+        plant = presolve_plant(
+            "core.model_bis", params, periods.data, policy=scenario.chp_policy
+        )
+        print(plant.report.summary())
+        builder_type = BuilderType(
+            getattr(scenario.builder_type, "value", scenario.builder_type)
+        )
+        if builder_type == BuilderType.PYOMO:
+            warnings.warn(
+                "Representative days are dispatched with the sparse builder, "
+                "not the scenario's Pyomo builder"
+            )
+        solved_model = dispatch_representative(
+            plant,
+            periods,
+            heuristic_start=scenario.heuristic_start,
+            heuristic_only=builder_type == BuilderType.MERIT_ORDER,
+            session=get_solver_session() if scenario.persistent_solver else None,
+            scaling=scenario.scaling,
+            elastic=scenario.elastic,
+            iis=scenario.iis,
+            precheck=scenario.precheck,
+        )
+        print(f"Annual KPIs from {representative_days} representative days:")
+        for k, v in solved_model.KPIs["annual"].items():
+            print(f"  {k}: {v:,.2f}")
     else:
-        params["penalty_turbine_no_shutdown"] = 0
-
-    # Run dispatch
-    solved_model = dispatch(
-        model,
-        params,
-        data,
-        **dispatch_opts,
-    )
+        # Load model, presolved for the parameters and data of this scenario
+        print("Loading model...")
+        plant = presolve_plant(
+            "core.model_bis", params, data, policy=scenario.chp_policy
+        )
+        data = plant.data
+        print(plant.report.summary())
+        print("Model loaded")
+
+        # Run dispatch (model_to_flex for the Pyomo builder, in-process for the sparse one)
+        solved_model = dispatch(plant, **dispatch_opts)
 
     kpis = solved_model.KPIs
-    results = solved_model.results
+    if "precheck" in kpis and not kpis["precheck"].feasible:
+        # Periods no dispatch can serve, whatever the solver does
+        print(kpis["precheck"].violations.to_string(max_rows=20))
+    if "conditioning" in kpis:
+        print(f"Conditioning (worst window): {kpis['conditioning']}")
+        if "scaled_conditioning" in kpis:
+            print(f"Conditioning after scaling: {kpis['scaled_conditioning']}")
+    for diagnosis in kpis.get("diagnoses", []):
+        # Infeasible windows were solved with penalized slacks; see the diagnosis
+        print(f"Infeasible window: {diagnosis.summary()}")
+    results = fill_removed_results(solved_model.results, plant.report)
 
     # Add low demand data to results
     results["low_demand"] = data["low_demand"]
+    if scenario.compact_dtypes:
+        results = compact_frame(results)
 
     # Create timestamp for results
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -212,8 +281,14 @@ def run_scenario(scenario_name: str):
     return kpis, results
 
 
-def run_all_scenarios():
-    """Run all defined scenarios"""
+def run_all_scenarios(representative_days: int = None):
+    """
+    Run all defined scenarios
+
+    Args:
+        representative_days (int, optional): Screening mode, see `run_scenario`.
+            Defaults to None (full horizon).
+    """
     manager = ScenarioManager()
     scenarios = manager.list_scenarios()
 
@@ -227,7 +302,7 @@ def run_all_scenarios():
     for name in scenarios:
         print(f"\nRunning scenario: {name}")
         try:
-            run_scenario(name)
+            run_scenario(name, representative_days)
             print(f"✓ Scenario '{name}' completed successfully")
         except Exception as e:
             print(f"✗ Scenario '{name}' failed with error: {str(e)}")
@@ -250,6 +325,49 @@ def run_all_scenarios():
         print("All scenarios completed successfully!")
 
 
+def benchmark_chp_formulations(year: int = 2024):
+    """
+    Compare the CHP formulations of the sparse builder (LP-relaxation gap,
+    branch-and-bound nodes, solve time) on the monthly windows of the Flex
+    scenarios of a year. The report is saved to results/benchmarks.
+
+    Args:
+        year (int, optional): Year of the scenario prices. Defaults to 2024.
+    """
+    manager = ScenarioManager()
+    reports = []
+    for name in manager.list_scenarios():
+        scenario = manager.get_scenario(name)
+        if (
+            not name.startswith("Flex")
+            or pd.Timestamp(scenario.price_starttime).year != year
+        ):
+            continue
+        print(f"\nBenchmarking scenario: {name}")
+        data, params = scenario_inputs(scenario)
+        plant = presolve_plant(
+            "core.model_bis", params, data, policy=scenario.chp_policy
+        )
+        report = benchmark_formulations(plant, dispatch_type="monthly")
+        print(summarize_benchmark(report))
+        reports.append(report.assign(scenario=name))
+
+    if not reports:
+        print(f"No Flex scenarios for {year}!")
+        return
+    report = pd.concat(reports, ignore_index=True)
+    print(f"\n{'=' * 50}")
+    print(f"CHP FORMULATIONS, FLEX SCENARIOS {year}")
+    print(f"{'=' * 50}")
+    print(summarize_benchmark(report))
+
+    os.makedirs(os.path.join("results", "benchmarks"), exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join("results", "benchmarks", f"chp_formulations_{timestamp}.csv")
+    report.to_csv(path, index=False)
+    print(f"Report saved to: {path}")
+
+
 if __name__ == "__main__":
     import sys
 
@@ -269,9 +387,22 @@ if __name__ == "__main__":
             type=str,
             help="Name of the scenario to run. If not provided, all scenarios will be run.",
         )
+        parser.add_argument(
+            "--representative-days",
+            type=int,
+            help="Screening run: dispatch only this many representative days.",
+        )
+        parser.add_argument(
+            "--benchmark-chp-formulations",
+            type=int,
+            metavar="YEAR",
+            help="Compare the CHP formulations on the Flex scenarios of a year.",
+        )
         args = parser.parse_args()
 
-        if args.scenario:
-            run_scenario(args.scenario)
+        if args.benchmark_chp_formulations:
+            benchmark_chp_formulations(args.benchmark_chp_formulations)
+        elif args.scenario:
+            run_scenario(args.scenario, args.representative_days)
         else:
-            run_all_scenarios()
+            run_all_scenarios(args.representative_days)
@@ -3,7 +3,20 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 import json
 import os
-from model_to_flex.core.enums import BuilderType, SolverType, DispatchType
+from model_to_flex.core.enums import DispatchType
+
+from core.dispatch import SPARSE_ONLY_OPTIONS
+from core.enums import BuilderType, SolverType
+
+# Sparse builder options left at None follow the builder: these values with the
+# sparse and merit-order builders, the model_to_flex behaviour (SPARSE_ONLY_OPTIONS)
+# with the Pyomo builder, which ignores them
+SPARSE_BUILDER_DEFAULTS = {
+    "persistent_solver": True,
+    "heuristic_start": True,
+    "scaling": True,
+    "elastic": True,
+}
 
 
 @dataclass
@@ -49,12 +62,25 @@ class Scenario:
     dispatch_type: DispatchType = DispatchType.MONTHLY
     pred_hor: int = 24 * 32
     contr_hor: int = 24 * 32
+    persistent_solver: Optional[bool] = None  # sparse builder: keep HiGHS models
+    heuristic_start: Optional[bool] = None  # sparse builder: merit order as MIP start
+    workers: int = 1  # sparse builder: processes solving monthly windows in parallel
+    scaling: Optional[bool] = None  # sparse builder: geometric scaling before solves
+    elastic: Optional[bool] = None  # sparse builder: diagnose infeasible windows
+    iis: bool = False  # sparse builder: extract an IIS of infeasible windows
+    precheck: str = "flag"  # input pre-check: "off", "flag" or "shorten"
+    compact_dtypes: bool = False
+    chp_policy: str = "economic"  # "economic", "off", "must_run" or "full_load"
     created_at: str = None
     results_path: Optional[str] = None
 
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        pyomo = BuilderType(self.builder_type) == BuilderType.PYOMO
+        for name, default in SPARSE_BUILDER_DEFAULTS.items():
+            if getattr(self, name) is None:
+                setattr(self, name, SPARSE_ONLY_OPTIONS[name] if pyomo else default)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert scenario to dictionary for saving"""
@@ -65,6 +91,8 @@ class Scenario:
             "demand_starttime": self.demand_starttime,
             "length": self.length,
             "freq": self.freq,
+            "compact_dtypes": self.compact_dtypes,
+            "chp_policy": self.chp_policy,
             "gas_turbine_minload_electricity_capacity": self.gas_turbine_minload_electricity_capacity,
             "gas_turbine_maxload_electricity_capacity": self.gas_turbine_maxload_electricity_capacity,
             "gas_turbine_minload_electricity_efficiency": self.gas_turbine_minload_electricity_efficiency,
@@ -96,6 +124,13 @@ class Scenario:
                 "dispatch_type": self.dispatch_type.value,
                 "pred_hor": self.pred_hor,
                 "contr_hor": self.contr_hor,
+                "persistent_solver": self.persistent_solver,
+                "heuristic_start": self.heuristic_start,
+                "workers": self.workers,
+                "scaling": self.scaling,
+                "elastic": self.elastic,
+                "iis": self.iis,
+                "precheck": self.precheck,
             },
             "metadata": {
                 "created_at": self.created_at,
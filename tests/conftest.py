@@ -0,0 +1,76 @@
+"""
+Shared fixtures: a small CHP plant of model_bis with two weeks of hourly data.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PERIODS = 24 * 14
+
+
+def _plant_inputs(peak_price: float = 5.0):
+    """Parameters and two weeks of hourly data of a small CHP plant"""
+    rng = np.random.default_rng(1)
+    index = pd.date_range("2024-01-01", periods=PERIODS, freq="h")
+    offtake = rng.random(PERIODS) * 100 + 50
+    data = pd.DataFrame(
+        {
+            "electricity_offtake_price": offtake,
+            "electricity_injection_price": -(offtake - 60),
+            "gas_price": np.full(PERIODS, 40.0),
+            "co2_price": np.full(PERIODS, 80.0),
+            "heat_demand": rng.random(PERIODS) * 10 + 8,
+            "electricity_demand": rng.random(PERIODS) * 3 + 1,
+            "gas_turbine_minload_electricity_capacity": np.full(PERIODS, 2.0),
+            "gas_turbine_maxload_electricity_capacity": np.full(PERIODS, 3.0),
+            "gas_turbine_minload_electricity_efficiency": np.full(PERIODS, 0.3),
+            "gas_turbine_maxload_electricity_efficiency": np.full(PERIODS, 0.35),
+        },
+        index=index,
+    )
+    params = {
+        "gas_turbine_minload_heat_efficiency": 0.46,
+        "gas_boiler_efficiency": 0.85,
+        "gas_boiler_capacity": 24,
+        "e_boiler_efficiency": 1.0,
+        "e_boiler_capacity": 5,
+        "hrsg_efficiency": 1,
+        "elec_grid_cost_power_peak": peak_price,
+        "penalty_for_gas_to_turbine": 0,
+        "penalty_turbine_no_shutdown": 0,
+    }
+    return params, data
+
+
+def _window_problems(policy: str = "economic"):
+    """Problems of the rolling 48/24 windows of the test plant"""
+    from core.dispatch import dispatch_windows
+    from core.presolve import presolve_plant
+    from core.sparse_builder import SparseBuilder
+
+    params, data = _plant_inputs()
+    plant = presolve_plant("core.model_bis", params, data, policy=policy)
+    builder = SparseBuilder(
+        plant.topology,
+        plant.data_bindings,
+        plant.parameter_bindings,
+        plant.params,
+        plant.data,
+    )
+    return [
+        builder.build(window, {})
+        for window, _ in dispatch_windows(plant.data.index, None, 48, 24)
+    ]
+
+
+@pytest.fixture
+def plant_inputs():
+    """Function returning the parameters and data of the test plant"""
+    return _plant_inputs
+
+
+@pytest.fixture
+def window_problems():
+    """Function returning the rolling window problems of the test plant"""
+    return _window_problems
@@ -0,0 +1,72 @@
+"""
+Tests of the feature store keys and source invalidation.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import feature_store, market_data
+
+START = ("2024-01-01", "2022-01-01")
+LENGTH = 24 * 7
+
+
+class RandomProvider(market_data.MarketDataProvider):
+    """Deterministic synthetic prices, so no market data source is needed"""
+
+    def fetch(self, series, starttime, endtime):
+        index = pd.date_range(starttime, endtime, freq="h", tz="CET")
+        values = np.random.default_rng(0).random(len(index))
+        return pd.DataFrame({"timestamp": index, series: values})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Feature store in a temporary directory with one extra source file"""
+    previous = market_data.get_market_data_cache()
+    market_data.configure_market_data(RandomProvider(), cache_dir=None)
+    source = tmp_path / "source.csv"
+    source.write_text("a\n1\n")
+    files = feature_store.source_files
+    monkeypatch.setattr(feature_store, "source_files", lambda: files() + [str(source)])
+    yield feature_store.FeatureStore(str(tmp_path / "features")), source
+    market_data._default_cache = previous
+
+
+def built(store) -> int:
+    return sum(name.endswith(".json") for name in os.listdir(store.cache_dir))
+
+
+def test_use_local_data_is_part_of_the_key(store):
+    store, _ = store
+    store.get_window(*START, LENGTH)
+    meta = store._loaded[(*START, "h", True)][2]
+
+    assert meta["use_local_data"] is True
+    assert store._paths((*START, "h", True)) != store._paths((*START, "h", False))
+
+
+def test_touched_source_keeps_matrix(store):
+    store, source = store
+    store.get_window(*START, LENGTH)
+    os.utime(source, (1, 1))
+
+    reloaded = feature_store.FeatureStore(store.cache_dir)
+    assert reloaded._load((*START, "h", True)) is not None
+    with open(store._paths((*START, "h", True))[2]) as f:
+        assert json.load(f)["sources"][str(source)]["mtime"] == 1
+
+
+def test_changed_source_rebuilds_matrix(store):
+    store, source = store
+    store.get_window(*START, LENGTH)
+    source.write_text("a\n2\n")
+
+    assert store._load((*START, "h", True)) is None
+    store.get_window(*START, LENGTH)
+    assert store._load((*START, "h", True)) is not None
+    assert built(store) == 1
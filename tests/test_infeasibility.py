@@ -0,0 +1,99 @@
+"""
+Tests of the infeasibility triage: slack penalties, the presolve-off retry and the
+irreducibility of the extracted IIS.
+"""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("model_to_flex")
+highspy = pytest.importorskip("highspy")
+
+from core.dispatch import dispatch  # noqa: E402
+from core.infeasibility import INFEASIBLE_STATUSES, elastic_solve  # noqa: E402
+from core.infeasibility import reduce_iis  # noqa: E402
+from core.presolve import presolve_plant  # noqa: E402
+from core.sparse_builder import INF, SparseBuilder, to_highs  # noqa: E402
+
+SPIKE = slice(24 * 5 + 5, 24 * 5 + 8)
+
+
+@pytest.fixture
+def infeasible_plant(plant_inputs):
+    """Test plant with three hours of heat demand above all heat capacities"""
+    params, data = plant_inputs()
+    data["pc_max_gas"] = 5.0
+    data.iloc[SPIKE, data.columns.get_loc("heat_demand")] = 60.0
+    return presolve_plant("core.model_bis", params, data, policy="economic")
+
+
+def builder_of(plant) -> SparseBuilder:
+    return SparseBuilder(
+        plant.topology,
+        plant.data_bindings,
+        plant.parameter_bindings,
+        plant.params,
+        plant.data,
+    )
+
+
+def test_slack_penalty_is_not_in_objective(infeasible_plant):
+    result = dispatch(
+        infeasible_plant, builder_type="sparse", dispatch_type=None, elastic=True
+    )
+    kpis = result.KPIs
+
+    (diagnosis,) = kpis["diagnoses"]
+    assert set(diagnosis.slacks["time"]) == set(infeasible_plant.data.index[SPIKE])
+    assert kpis["slack_penalty"] > 0
+    assert kpis["objective"] < kpis["slack_penalty"]
+
+
+def test_feasible_window_is_not_diagnosed(plant_inputs):
+    params, data = plant_inputs()
+    plant = presolve_plant("core.model_bis", params, data, policy="economic")
+    window = slice(0, len(data))
+
+    problem, solution, diagnosis = elastic_solve(builder_of(plant), window)
+
+    assert diagnosis is None
+    assert solution.presolve_retry
+    assert not any(name.endswith("_shortfall") for _, name in problem.columns)
+
+
+@pytest.mark.skipif(not hasattr(highspy.Highs(), "getIis"), reason="highspy < 1.8")
+def test_iis_is_irreducible(infeasible_plant):
+    window = slice(0, 24 * 7)
+    _, _, diagnosis = elastic_solve(builder_of(infeasible_plant), window, iis=True)
+    assert diagnosis.iis is not None
+    assert 0 < len(diagnosis.iis) < 20
+
+
+def test_reduce_iis_keeps_only_needed_members(infeasible_plant):
+    problem = builder_of(infeasible_plant).build(slice(0, 24 * 7))
+    lp = replace(problem, integrality=np.zeros_like(problem.integrality))
+
+    rows, columns = reduce_iis(lp, np.arange(lp.A.shape[0]), np.arange(lp.A.shape[1]))
+    assert 0 < len(rows) + len(columns) < 20
+
+    # Dropping any single member makes the rest feasible
+    in_rows = np.isin(np.arange(lp.A.shape[0]), rows)
+    in_columns = np.isin(np.arange(lp.A.shape[1]), columns)
+    for kind, k in [("row", r) for r in rows] + [("column", c) for c in columns]:
+        keep_rows, keep_columns = in_rows.copy(), in_columns.copy()
+        (keep_rows if kind == "row" else keep_columns)[k] = False
+        h = to_highs(
+            replace(
+                lp,
+                c=np.zeros_like(lp.c),
+                row_lower=np.where(keep_rows, lp.row_lower, -INF),
+                row_upper=np.where(keep_rows, lp.row_upper, INF),
+                col_lower=np.where(keep_columns, lp.col_lower, -INF),
+                col_upper=np.where(keep_columns, lp.col_upper, INF),
+            ),
+            {"presolve": "off"},
+        )
+        h.run()
+        assert h.modelStatusToString(h.getModelStatus()) not in INFEASIBLE_STATUSES
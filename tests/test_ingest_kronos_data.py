@@ -0,0 +1,43 @@
+"""
+Tests of the KRONOS dataset invalidation when the source workbook changes.
+"""
+
+import os
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+pytest.importorskip("pyarrow")
+
+from analysis.ingest_kronos_data import (  # noqa: E402
+    KRONOS_HEADER_ROW,
+    KRONOS_SHEET,
+    ensure_kronos_dataset,
+    read_kronos_dataset,
+)
+
+
+def write_workbook(path, offset: float):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = KRONOS_SHEET
+    for _ in range(KRONOS_HEADER_ROW - 1):
+        sheet.append([None])
+    sheet.append(["DatumTijd", "value"])
+    for day in range(1, 4):
+        sheet.append([f"2024-01-0{day} 00:00", offset + day])
+    workbook.save(path)
+
+
+def test_dataset_follows_workbook(tmp_path):
+    source, dataset = str(tmp_path / "kronos.xlsx"), str(tmp_path / "dataset")
+    write_workbook(source, 0.0)
+    assert ensure_kronos_dataset(source, dataset)
+    assert not ensure_kronos_dataset(source, dataset)
+
+    # Touching the workbook keeps the dataset, changing it re-ingests
+    os.utime(source, (1, 1))
+    assert not ensure_kronos_dataset(source, dataset)
+    write_workbook(source, 10.0)
+    assert ensure_kronos_dataset(source, dataset)
+    assert read_kronos_dataset(dataset_dir=dataset)["value"].tolist() == [11, 12, 13]
@@ -0,0 +1,65 @@
+"""
+Tests of the market data cache keys and expiry.
+"""
+
+import os
+
+import pandas as pd
+
+from core.market_data import MarketDataCache, RecordedFileProvider
+
+
+def record(directory, value: float):
+    """Recording of one day of flat day-ahead prices"""
+    os.makedirs(directory, exist_ok=True)
+    index = pd.date_range("2024-01-01", periods=24, freq="h", tz="CET")
+    pd.DataFrame({"timestamp": index, "da_price": value}).to_csv(
+        os.path.join(directory, "da_price.csv"), index=False
+    )
+
+
+def prices(cache) -> float:
+    return cache.get("da_price", "2024-01-01", "2024-01-02")["da_price"].iloc[0]
+
+
+def test_recordings_do_not_share_cache_files(tmp_path):
+    record(tmp_path / "a", 1.0)
+    record(tmp_path / "b", 2.0)
+    cache_dir = str(tmp_path / "cache")
+
+    assert prices(MarketDataCache(RecordedFileProvider(tmp_path / "a"), cache_dir)) == 1
+    assert prices(MarketDataCache(RecordedFileProvider(tmp_path / "b"), cache_dir)) == 2
+
+
+def test_changed_recording_is_read_again(tmp_path):
+    record(tmp_path / "a", 1.0)
+    cache = MarketDataCache(RecordedFileProvider(tmp_path / "a"), str(tmp_path / "c"))
+    prices(cache)
+
+    record(tmp_path / "a", 3.0)
+    os.utime(tmp_path / "a" / "da_price.csv", ns=(1, 1))
+    assert prices(cache) == 3
+    assert cache.misses == 2
+
+
+class LiveProvider(RecordedFileProvider):
+    """Recorded data served like a live source, without a file fingerprint"""
+
+    max_age = pd.Timedelta(hours=1)
+
+    def cache_identity(self, series: str) -> str:
+        return type(self).__name__
+
+
+def test_live_data_expires(tmp_path, monkeypatch):
+    record(tmp_path / "a", 1.0)
+    cache_dir = str(tmp_path / "cache")
+    prices(MarketDataCache(LiveProvider(tmp_path / "a"), cache_dir))
+
+    cache = MarketDataCache(LiveProvider(tmp_path / "a"), cache_dir)
+    prices(cache)
+    assert cache.disk_hits == 1
+
+    monkeypatch.setattr(LiveProvider, "max_age", pd.Timedelta(0))
+    prices(cache)
+    assert cache.misses == 1
@@ -0,0 +1,25 @@
+"""
+Tests of the model factory behind presolved plants.
+"""
+
+import pickle
+
+import pytest
+
+pytest.importorskip("model_to_flex")
+
+from core.model_factory import get_model_factory  # noqa: E402
+from core.presolve import presolve_plant  # noqa: E402
+
+
+def test_presolved_plant_builds_from_its_factory(plant_inputs):
+    params, data = plant_inputs()
+    params["e_boiler_capacity"] = 0
+    plant = presolve_plant("core.model_bis", params, data, policy="economic")
+    factory = get_model_factory("core.model_bis", plant.topology)
+
+    first, second = plant.build(), plant.build()
+    assert first is not second
+    assert factory._template is not None
+    assert factory is not get_model_factory("core.model_bis")
+    assert pickle.loads(pickle.dumps(factory)) is factory
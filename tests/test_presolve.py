@@ -0,0 +1,42 @@
+"""
+Tests of the bounds the structural presolve derives.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("model_to_flex")
+
+from core.binding import binding_values  # noqa: E402
+from core.presolve import presolve_plant  # noqa: E402
+
+
+def ubound(plant, component: str, attribute: str) -> np.ndarray:
+    (binding,) = [
+        b
+        for b in plant.data_bindings + plant.parameter_bindings
+        if (b.component, b.attribute, b.target) == (component, attribute, "ubound")
+    ]
+    return binding_values(binding, plant.params, plant.data)
+
+
+def test_chp_gas_bounds_follow_capacities(plant_inputs):
+    params, data = plant_inputs()
+    data["pc_max_gas"] = 4.0
+    plant = presolve_plant("core.model_bis", params, data)
+
+    turbine = (
+        data["gas_turbine_minload_electricity_capacity"]
+        / data["gas_turbine_minload_electricity_efficiency"]
+        + data["gas_turbine_maxload_electricity_capacity"]
+        / data["gas_turbine_maxload_electricity_efficiency"]
+    ).to_numpy()
+    np.testing.assert_allclose(ubound(plant, "chp", "gas_to_turbine"), turbine)
+    np.testing.assert_allclose(ubound(plant, "chp", "gas_in"), turbine + 4.0)
+
+
+def test_fixed_turbine_gas_is_not_bounded(plant_inputs):
+    params, data = plant_inputs()
+    plant = presolve_plant("core.model_bis", params, data, policy="off")
+
+    assert "chp.gas_to_turbine" not in plant.report.tightened
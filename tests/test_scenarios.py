@@ -0,0 +1,39 @@
+"""
+Tests of the scenario defaults that depend on the builder.
+"""
+
+from dataclasses import MISSING, fields
+
+import pytest
+
+pytest.importorskip("model_to_flex")
+
+from core.dispatch import SPARSE_ONLY_OPTIONS  # noqa: E402
+from core.enums import BuilderType  # noqa: E402
+from simulation.scenarios import SPARSE_BUILDER_DEFAULTS, Scenario  # noqa: E402
+
+
+def scenario(**options) -> Scenario:
+    """Scenario with placeholder plant parameters"""
+    values = {field.name: 1.0 for field in fields(Scenario) if field.default is MISSING}
+    values.update(name="test", description="", price_starttime="2024-01-01")
+    values.update(demand_starttime="2022-01-01", length=24)
+    return Scenario(**values, **options)
+
+
+def test_pyomo_scenario_keeps_sparse_options_off():
+    options = scenario(builder_type=BuilderType.PYOMO).to_dict()["dispatch_options"]
+    for name in SPARSE_BUILDER_DEFAULTS:
+        assert options[name] == SPARSE_ONLY_OPTIONS[name]
+
+
+def test_sparse_scenario_turns_sparse_options_on():
+    options = scenario(builder_type=BuilderType.SPARSE).to_dict()["dispatch_options"]
+    for name, default in SPARSE_BUILDER_DEFAULTS.items():
+        assert options[name] == default
+
+
+def test_explicit_option_is_kept_and_round_trips():
+    explicit = scenario(builder_type=BuilderType.PYOMO, elastic=True)
+    assert explicit.elastic is True
+    assert Scenario.from_dict(explicit.to_dict()).elastic is True
@@ -0,0 +1,61 @@
+"""
+Tests of the persistent solver session: in-place updates must give the results of a
+one-off solve, on every supported highspy version.
+"""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("model_to_flex")
+pytest.importorskip("highspy")
+
+from core.solver_session import SolverSession, structure_key  # noqa: E402
+from core.sparse_builder import solve  # noqa: E402
+
+
+def test_updates_match_one_off_solves(window_problems):
+    problems = window_problems("economic")
+    session = SolverSession()
+    for problem in problems:
+        result = session.solve(problem)
+        assert result.objective == pytest.approx(solve(problem).objective, rel=1e-4)
+
+    structures = len({structure_key(problem) for problem in problems})
+    assert session.stats.builds == structures
+    assert session.stats.updates == len(problems) - structures
+
+
+def test_options_apply_to_kept_instance(window_problems):
+    first, second, third = window_problems("economic")[:3]
+    session = SolverSession()
+    session.solve(first)
+    session.solve(second, {"time_limit": 5.0})
+    (entry,) = session._entries.values()
+    assert entry.highs.getOptionValue("time_limit")[1] == 5.0
+
+    session.solve(third)
+    assert entry.highs.getOptionValue("time_limit")[1] == np.inf
+    assert entry.highs.getOptionValue("presolve_rule_off")[1] != 0
+
+
+@pytest.mark.parametrize("share", [0.001, 0.5])
+def test_coefficient_changes(window_problems, share):
+    problem, other = window_problems("economic")[:2]
+    rng = np.random.default_rng(0)
+    A = other.A.copy()
+    changed = rng.random(len(A.data)) < share
+    A.data[changed] *= 1.01
+    changed_problem = replace(other, A=A)
+    assert structure_key(changed_problem) == structure_key(problem)
+
+    session = SolverSession()
+    session.solve(problem)
+    result = session.solve(changed_problem)
+    reference = solve(changed_problem)
+
+    assert result.status == reference.status
+    if reference.x is not None:
+        assert result.objective == pytest.approx(reference.objective, rel=1e-4)
+    assert session.stats.builds == (1 if share < 0.1 else 2)
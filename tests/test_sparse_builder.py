@@ -0,0 +1,122 @@
+"""
+Tests of the sparse builder: HiGHS presolve handling and equivalence with the
+model_to_flex Pyomo builder.
+
+Run from the repository root with `python -m pytest tests`.
+"""
+
+import shutil
+import sys
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("model_to_flex")
+pytest.importorskip("highspy")
+
+from core.dispatch import dispatch  # noqa: E402
+from core.enums import BuilderType, SolverType  # noqa: E402
+from core.presolve import presolve_plant  # noqa: E402
+from core.sparse_builder import is_feasible, needs_retry, solve  # noqa: E402
+
+
+@pytest.mark.parametrize("policy", ["economic", "must_run"])
+def test_default_presolve_matches_no_presolve(window_problems, policy):
+    for problem in window_problems(policy):
+        result = solve(problem)
+        reference = solve(problem, {"presolve": "off"})
+        assert result.status == "Optimal"
+        assert is_feasible(problem, result.x)
+        assert result.objective == pytest.approx(reference.objective, rel=1e-4)
+
+
+def test_retry_when_start_is_cheaper(window_problems):
+    problem = window_problems()[0]
+    reference = solve(problem, {"presolve": "off"})
+    worse = reference.objective + abs(reference.objective) * 0.1 + 1.0
+
+    assert needs_retry(problem, "Optimal", worse, start=reference.x)
+    assert not needs_retry(problem, "Optimal", reference.objective, reference.x)
+    assert needs_retry(problem, "Infeasible", np.nan)
+
+
+def test_no_retry_without_feasible_start(window_problems):
+    problem = window_problems()[0]
+    reference = solve(problem, {"presolve": "off"})
+    infeasible = np.full(problem.A.shape[1], -1.0)
+
+    assert not needs_retry(problem, "Optimal", reference.objective + 1.0, infeasible)
+
+
+def energy_costs(prices: pd.DataFrame, quantities: pd.DataFrame, markets) -> float:
+    """Sum of prices times quantities of the given markets"""
+    return float(
+        sum(
+            (prices[f"{m}_prices"] * quantities[f"{m}_quantities"]).sum()
+            for m in markets
+        )
+    )
+
+
+@pytest.mark.skipif(shutil.which("cbc") is None, reason="CBC not installed")
+@pytest.mark.parametrize("policy", ["economic", "must_run"])
+def test_matches_pyomo_builder(plant_inputs, policy):
+    pytest.importorskip("pyomo")
+    from model_to_flex.core.enums import DispatchType
+
+    # Without peak tariff and penalties both objectives are the energy cost
+    params, data = plant_inputs(peak_price=0.0)
+    plant = presolve_plant("core.model_bis", params, data, policy=policy)
+    sparse = dispatch(
+        plant, builder_type=BuilderType.SPARSE, dispatch_type=DispatchType.MONTHLY
+    ).results
+    pyomo = dispatch(
+        plant,
+        builder_type=BuilderType.PYOMO,
+        solver=SolverType.CBC,
+        dispatch_type=DispatchType.MONTHLY,
+    ).results
+    pyomo.index = sparse.index
+
+    markets = [
+        column[: -len("_prices")]
+        for column in sparse.columns
+        if column.endswith("_prices")
+        and f"{column[: -len('_prices')]}_quantities" in pyomo.columns
+    ]
+    assert markets
+    assert energy_costs(sparse, pyomo, markets) == pytest.approx(
+        energy_costs(sparse, sparse, markets), rel=1e-3
+    )
+
+
+def test_scipy_fallback_reports_highs_statuses(window_problems, monkeypatch):
+    problem = window_problems()[0]
+    monkeypatch.setitem(sys.modules, "highspy", None)  # import fails: scipy milp
+
+    assert solve(problem).status == "Optimal"
+
+    infeasible = solve(replace(problem, col_lower=problem.col_upper + 1.0))
+    assert infeasible.status == "Infeasible"
+    assert infeasible.presolve_retry
+
+
+def test_peak_is_priced_per_calendar_month(plant_inputs):
+    # One window over two weeks across a month boundary
+    params, data = plant_inputs()
+    data.index = pd.date_range("2024-01-25", periods=len(data), freq="h")
+    plant = presolve_plant("core.model_bis", params, data, policy="economic")
+    result = dispatch(plant, builder_type=BuilderType.SPARSE, dispatch_type=None)
+
+    peaks = result.results.groupby(result.results.index.month)["captar_peak"]
+    assert (peaks.nunique() == 1).all()
+    assert peaks.first().to_numpy() == pytest.approx(
+        result.results.groupby(result.results.index.month)[
+            "Electricity offtake_quantities"
+        ]
+        .max()
+        .to_numpy(),
+        abs=1e-6,
+    )
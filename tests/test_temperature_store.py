@@ -0,0 +1,115 @@
+"""
+Tests of the temperature store's fetch path against a local stand-in for the
+Open-Meteo archive API.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import temperature_store
+from core.temperature_store import CSV_HEADER, TEMPERATURE_COLUMN, TemperatureStore
+
+# The stand-in archive has no data from this hour on (publication delay)
+ARCHIVE_END = pd.Timestamp("2024-01-10 12:00", tz="UTC")
+
+
+def temperature(hours: pd.DatetimeIndex) -> np.ndarray:
+    return np.round(5 + 0.001 * (hours.asi8 // 3_600_000_000_000 % 1000), 3)
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Open-Meteo style CSV for whole UTC days, blank after ARCHIVE_END"""
+
+    requests = []
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        type(self).requests.append((query["start_date"], query["end_date"]))
+        hours = pd.date_range(
+            pd.Timestamp(query["start_date"], tz="UTC"),
+            pd.Timestamp(query["end_date"], tz="UTC") + pd.Timedelta(hours=23),
+            freq="h",
+        )
+        values = [
+            "" if hour >= ARCHIVE_END else str(value)
+            for hour, value in zip(hours, temperature(hours))
+        ]
+        body = CSV_HEADER + f"time,{TEMPERATURE_COLUMN}\n"
+        body += "".join(
+            f"{hour:%Y-%m-%dT%H:%M},{value}\n" for hour, value in zip(hours, values)
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def archive():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArchiveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    ArchiveHandler.requests = []
+    yield f"http://127.0.0.1:{server.server_port}/v1/archive", ArchiveHandler.requests
+    server.shutdown()
+
+
+def new_store(tmp_path, url) -> TemperatureStore:
+    return TemperatureStore(
+        store_file=str(tmp_path / "cache" / "store.csv"), seed_pattern=None, url=url
+    )
+
+
+def test_fetches_missing_hours_once(tmp_path, archive):
+    url, requests = archive
+    start = pd.Timestamp("2024-01-05", tz="CET")
+    end = pd.Timestamp("2024-01-07", tz="CET")
+
+    series = new_store(tmp_path, url).get(start, end)
+    assert len(requests) == 1
+    np.testing.assert_allclose(series.values, temperature(series.index))
+
+    # Neither the same instance nor a new one reading the store file asks again
+    new_store(tmp_path, url).get(start, end)
+    store = new_store(tmp_path, url)
+    store.get(start, end)
+    store.get(start, end)
+    assert len(requests) == 1
+
+
+def test_requests_are_split_per_year(tmp_path, archive):
+    url, requests = archive
+    new_store(tmp_path, url).get(
+        pd.Timestamp("2023-12-30", tz="UTC"), pd.Timestamp("2024-01-02", tz="UTC")
+    )
+    assert requests == [("2023-12-30", "2023-12-31"), ("2024-01-01", "2024-01-02")]
+
+
+def test_unavailable_hours_are_known_gaps(tmp_path, archive, monkeypatch):
+    url, requests = archive
+    start = pd.Timestamp("2024-01-09", tz="UTC")
+    end = pd.Timestamp("2024-01-11", tz="UTC")
+
+    series = new_store(tmp_path, url).get(start, end)
+    assert series.index.max() < ARCHIVE_END
+    assert len(requests) == 1
+
+    # Remembered across instances: the missing hours are not requested again
+    store = new_store(tmp_path, url)
+    store.get(start, end)
+    assert len(requests) == 1
+    assert store.gaps[0][0] == ARCHIVE_END
+
+    # Until the gap is due for another try
+    monkeypatch.setattr(temperature_store, "GAP_RECHECK_AFTER", pd.Timedelta(0))
+    store.get(start, end)
+    assert len(requests) == 2
+    assert len(store.gaps) == 1
@@ -0,0 +1,34 @@
+"""
+Tests of the annual KPIs of time aggregation.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("model_to_flex")
+pytest.importorskip("highspy")
+
+from model_to_flex.core.enums import DispatchType  # noqa: E402
+
+from core.dispatch import dispatch  # noqa: E402
+from core.presolve import presolve_plant  # noqa: E402
+from core.time_aggregation import full_kpis  # noqa: E402
+
+
+def test_capacity_tariff_is_priced_per_month(plant_inputs):
+    # Two weeks across a month boundary with a different tariff in each month
+    params, data = plant_inputs()
+    data.index = pd.date_range("2024-01-25", periods=len(data), freq="h")
+    data["elec_grid_cost_power_peak"] = np.where(data.index.month == 2, 9.0, 4.0)
+    del params["elec_grid_cost_power_peak"]
+    plant = presolve_plant("core.model_bis", params, data, policy="economic")
+
+    results = dispatch(
+        plant, builder_type="sparse", dispatch_type=DispatchType.MONTHLY
+    ).results
+    peaks = results.groupby(results.index.month)["captar_peak"].max()
+
+    assert full_kpis(plant, results)["captar_costs"] == pytest.approx(
+        peaks[1] * 4.0 + peaks[2] * 9.0
+    )